@@ -0,0 +1,290 @@
+import ctypes
+import errno
+import select
+import socket
+import struct
+import sys
+
+# E/S de datagramas em lote: vários datagramas por chamada de sistema, para
+# medir quanto da diferença entre UDP e TCP é custo de syscall por pacote.
+#   mmsg - sendmmsg/recvmmsg da libc, via ctypes
+#   gso  - UDP_SEGMENT: um envio com vários datagramas, que o kernel divide
+#   gro  - UDP_GRO: o kernel entrega vários datagramas em uma única recepção
+# Quando o modo pedido não é suportado, volta ao envio/recepção individual.
+SEND_MODES = ("single", "mmsg", "gso")
+RECV_MODES = ("single", "mmsg", "gro")
+
+# Opções de socket do Linux (linux/udp.h)
+SOL_UDP = socket.IPPROTO_UDP
+UDP_SEGMENT = 103
+UDP_GRO = 104
+
+# Limites do kernel para um envio com UDP_SEGMENT
+GSO_MAX_SEGMENTS = 64
+MAX_UDP_PAYLOAD = 65507
+
+# Erros que indicam que o kernel ou a interface não suportam o modo pedido
+UNSUPPORTED = (errno.EINVAL, errno.EIO, errno.ENOPROTOOPT, errno.EOPNOTSUPP)
+
+
+class _IoVec(ctypes.Structure):
+    _fields_ = [("iov_base", ctypes.c_void_p), ("iov_len", ctypes.c_size_t)]
+
+
+class _MsgHdr(ctypes.Structure):
+    _fields_ = [
+        ("msg_name", ctypes.c_void_p),
+        ("msg_namelen", ctypes.c_uint32),
+        ("msg_iov", ctypes.POINTER(_IoVec)),
+        ("msg_iovlen", ctypes.c_size_t),
+        ("msg_control", ctypes.c_void_p),
+        ("msg_controllen", ctypes.c_size_t),
+        ("msg_flags", ctypes.c_int),
+    ]
+
+
+class _MMsgHdr(ctypes.Structure):
+    _fields_ = [("msg_hdr", _MsgHdr), ("msg_len", ctypes.c_uint)]
+
+
+def _load_libc():
+    # Carrega sendmmsg/recvmmsg da libc, ou retorna None se indisponíveis
+    if not sys.platform.startswith("linux"):
+        return None
+    try:
+        libc = ctypes.CDLL(None, use_errno=True)
+        sendmmsg, recvmmsg = libc.sendmmsg, libc.recvmmsg
+    except (OSError, AttributeError, TypeError):
+        return None
+    sendmmsg.argtypes = [ctypes.c_int, ctypes.c_void_p, ctypes.c_uint, ctypes.c_int]
+    sendmmsg.restype = ctypes.c_int
+    recvmmsg.argtypes = [
+        ctypes.c_int,
+        ctypes.c_void_p,
+        ctypes.c_uint,
+        ctypes.c_int,
+        ctypes.c_void_p,
+    ]
+    recvmmsg.restype = ctypes.c_int
+    return libc
+
+
+_LIBC = _load_libc()
+
+
+class _Slab:
+    # Buffer pré-alocado dividido em @count fatias consecutivas de @slot_size
+    # bytes, uma por datagrama, com os vetores de mensagens do sendmmsg/recvmmsg
+
+    def __init__(self, count, slot_size):
+        self.slot_size = slot_size
+        self.buffer = bytearray(count * slot_size)
+        self.view = memoryview(self.buffer)
+        self.slots = [
+            self.view[i * slot_size : (i + 1) * slot_size] for i in range(count)
+        ]
+        base = ctypes.addressof(ctypes.c_char.from_buffer(self.buffer))
+        self.iovecs = (_IoVec * count)()
+        self.msgs = (_MMsgHdr * count)()
+        for i in range(count):
+            self.iovecs[i].iov_base = base + i * slot_size
+            self.iovecs[i].iov_len = slot_size
+            self.msgs[i].msg_hdr.msg_iov = ctypes.pointer(self.iovecs[i])
+            self.msgs[i].msg_hdr.msg_iovlen = 1
+
+
+class SingleSender:
+    # Envio individual: um sendto por datagrama (referência e fallback)
+
+    def __init__(self, sock, addr, slot_size, count, mode="single"):
+        # @sock - socket utilizado para a comunicação
+        # @addr - endereço de destino dos datagramas
+        # @slot_size - tamanho máximo de cada datagrama
+        # @count - número de datagramas preparados por chamada de send()
+        # @mode - nome do modo registrado nas métricas
+        self.sock = sock
+        self.addr = addr
+        self.mode = mode
+        self.slab = _Slab(count, slot_size)
+        self.slots = self.slab.slots
+        self.calls = 0  # Chamadas de sistema de envio
+
+    def send(self, lengths):
+        # Envia as primeiras len(@lengths) fatias, com os tamanhos indicados
+        for slot, length in zip(self.slots, lengths):
+            self.sock.sendto(slot[:length], self.addr)
+        self.calls += len(lengths)
+
+
+class MmsgSender(SingleSender):
+    # Envio em lote com sendmmsg: todas as fatias em uma chamada de sistema
+
+    def __init__(self, sock, addr, slot_size, count):
+        super().__init__(sock, addr, slot_size, count, "mmsg")
+        host, port = addr
+        # sockaddr_in montado à mão: família (ordem nativa), porta e endereço
+        self.name = ctypes.create_string_buffer(
+            struct.pack("=H", socket.AF_INET)
+            + struct.pack("!H", port)
+            + socket.inet_aton(host)
+            + bytes(8),
+            16,
+        )
+        for msg in self.slab.msgs:
+            msg.msg_hdr.msg_name = ctypes.addressof(self.name)
+            msg.msg_hdr.msg_namelen = 16
+
+    def send(self, lengths):
+        for iovec, length in zip(self.slab.iovecs, lengths):
+            iovec.iov_len = length
+        base = ctypes.addressof(self.slab.msgs)
+        sent = 0
+        while sent < len(lengths):
+            result = _LIBC.sendmmsg(
+                self.sock.fileno(),
+                base + sent * ctypes.sizeof(_MMsgHdr),
+                len(lengths) - sent,
+                0,
+            )
+            self.calls += 1
+            if result < 0:
+                code = ctypes.get_errno()
+                if code == errno.EINTR:
+                    continue
+                if code in (errno.EAGAIN, errno.ENOBUFS):
+                    select.select([], [self.sock], [])
+                    continue
+                raise OSError(code, f"sendmmsg: {errno.errorcode.get(code, code)}")
+            sent += result
+
+
+class GsoSender(SingleSender):
+    # Envio segmentado com UDP_SEGMENT: as fatias consecutivas vão em um único
+    # sendmsg e o kernel (ou a placa de rede) divide em datagramas. Todas as
+    # fatias, exceto a última, devem estar cheias.
+
+    def __init__(self, sock, addr, slot_size, count):
+        super().__init__(sock, addr, slot_size, count, "gso")
+        self.control = [(SOL_UDP, UDP_SEGMENT, struct.pack("=H", slot_size))]
+
+    def send(self, lengths):
+        if self.mode != "gso":
+            return super().send(lengths)
+        total = (len(lengths) - 1) * self.slab.slot_size + lengths[-1]
+        try:
+            self.sock.sendmsg([self.slab.view[:total]], self.control, 0, self.addr)
+        except OSError as e:
+            if e.errno not in UNSUPPORTED or self.calls:
+                raise
+            # Interface sem suporte a GSO: segue com envios individuais
+            self.mode = "single (fallback)"
+            return super().send(lengths)
+        self.calls += 1
+
+
+def open_sender(sock, addr, slot_size, mode, batch):
+    # Cria o remetente do modo pedido, ou o envio individual se o modo não é
+    # suportado (o nome em .mode indica o fallback)
+    # @sock - socket utilizado para a comunicação
+    # @addr - endereço de destino dos datagramas
+    # @slot_size - tamanho máximo de cada datagrama (cabeçalho + dados)
+    # @mode - modo pedido (single, mmsg ou gso)
+    # @batch - número máximo de datagramas por chamada de sistema
+    if mode == "mmsg" and _LIBC is not None and sock.family == socket.AF_INET:
+        return MmsgSender(sock, addr, slot_size, batch)
+    if mode == "gso" and hasattr(sock, "sendmsg") and sys.platform.startswith("linux"):
+        count = min(batch, GSO_MAX_SEGMENTS, MAX_UDP_PAYLOAD // slot_size)
+        if count > 1:
+            return GsoSender(sock, addr, slot_size, count)
+    if mode == "single":
+        return SingleSender(sock, addr, slot_size, 1)
+    return SingleSender(sock, addr, slot_size, batch, "single (fallback)")
+
+
+class SingleReceiver:
+    # Recepção individual: um recvfrom_into por datagrama (referência e fallback)
+
+    def __init__(self, sock, slot_size, count, mode="single"):
+        # @sock - socket utilizado para a comunicação (o timeout do socket
+        #         vale para cada chamada de receive())
+        # @slot_size - tamanho máximo de cada datagrama
+        # @count - número máximo de datagramas por chamada de receive()
+        # @mode - nome do modo registrado nas métricas
+        self.sock = sock
+        self.mode = mode
+        self.slab = _Slab(count, slot_size)
+        self.calls = 0  # Chamadas de sistema de recepção
+
+    def receive(self):
+        # Retorna a lista de datagramas recebidos (memoryviews válidas até a
+        # próxima chamada). Levanta socket.timeout se nada chegar a tempo.
+        size, _ = self.sock.recvfrom_into(self.slab.view)
+        self.calls += 1
+        return [self.slab.view[:size]]
+
+
+class MmsgReceiver(SingleReceiver):
+    # Recepção em lote com recvmmsg: aguarda o socket ficar legível e recebe
+    # de uma vez todos os datagramas já enfileirados, até o tamanho do lote
+
+    def __init__(self, sock, slot_size, count):
+        super().__init__(sock, slot_size, count, "mmsg")
+
+    def receive(self):
+        if not select.select([self.sock], [], [], self.sock.gettimeout())[0]:
+            raise socket.timeout("timed out")
+        count = _LIBC.recvmmsg(
+            self.sock.fileno(),
+            ctypes.addressof(self.slab.msgs),
+            len(self.slab.msgs),
+            socket.MSG_DONTWAIT,
+            None,
+        )
+        self.calls += 1
+        if count < 0:
+            code = ctypes.get_errno()
+            if code in (errno.EAGAIN, errno.EINTR):
+                return []
+            raise OSError(code, f"recvmmsg: {errno.errorcode.get(code, code)}")
+        msgs, slots = self.slab.msgs, self.slab.slots
+        return [slots[i][: msgs[i].msg_len] for i in range(count)]
+
+
+class GroReceiver(SingleReceiver):
+    # Recepção agregada com UDP_GRO: o kernel junta datagramas consecutivos do
+    # mesmo fluxo e informa o tamanho de cada segmento em uma mensagem de
+    # controle; a recepção é dividida de volta em datagramas
+
+    def __init__(self, sock, slot_size):
+        super().__init__(sock, max(slot_size, MAX_UDP_PAYLOAD), 1, "gro")
+        self.control_size = socket.CMSG_SPACE(4)
+
+    def receive(self):
+        size, control, _, _ = self.sock.recvmsg_into([self.slab.view], self.control_size)
+        self.calls += 1
+        segment = size
+        for level, kind, data in control:
+            if level == SOL_UDP and kind == UDP_GRO:
+                segment = int.from_bytes(data[:4], sys.byteorder) or size
+        view = self.slab.view
+        return [view[i : min(i + segment, size)] for i in range(0, size, segment)]
+
+
+def open_receiver(sock, slot_size, mode, batch):
+    # Cria o receptor do modo pedido, ou a recepção individual se o modo não
+    # é suportado (o nome em .mode indica o fallback)
+    # @sock - socket utilizado para a comunicação
+    # @slot_size - tamanho máximo de cada datagrama (cabeçalho + dados)
+    # @mode - modo pedido (single, mmsg ou gro)
+    # @batch - número máximo de datagramas por chamada de sistema
+    if mode == "mmsg" and _LIBC is not None:
+        return MmsgReceiver(sock, slot_size, batch)
+    if mode == "gro" and hasattr(sock, "recvmsg_into"):
+        try:
+            sock.setsockopt(SOL_UDP, UDP_GRO, 1)
+            return GroReceiver(sock, slot_size)
+        except OSError:
+            pass
+    if mode == "single":
+        return SingleReceiver(sock, slot_size, 1)
+    return SingleReceiver(sock, slot_size, 1, "single (fallback)")
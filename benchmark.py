@@ -0,0 +1,555 @@
+import csv
+import importlib.util
+import logging
+import math
+import os
+import shlex
+import shutil
+import socket
+import statistics
+import subprocess
+import sys
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from contextlib import contextmanager
+
+import impairment
+import metrics
+import synthetic
+import tuning
+
+# Diretório dos scripts de servidor e cliente
+SCRIPTS_DIR = os.path.dirname(os.path.abspath(__file__))
+
+# Protocolos medidos: (script, argumentos extras do cliente, CSV de métricas)
+PROTOCOLS = {
+    "tcp": ("tcp", [], "metricas_tcp.csv"),
+    "udp": ("udp", [], "metricas_udp.csv"),
+    "udp-reliable": ("udp", ["--reliable"], "metricas_udp.csv"),
+}
+
+# Multiplicadores dos sufixos aceitos em --sizes
+UNITS = {"k": 1024, "m": 1024**2, "g": 1024**3}
+
+# Valores críticos da distribuição t de Student (bicaudal, 95%) por graus de
+# liberdade; acima de 30 usa-se a aproximação normal
+# fmt: off
+T_95 = [
+    12.706, 4.303, 3.182, 2.776, 2.571, 2.447, 2.365, 2.306, 2.262, 2.228,
+    2.201, 2.179, 2.160, 2.145, 2.131, 2.120, 2.110, 2.101, 2.093, 2.086,
+    2.080, 2.074, 2.069, 2.064, 2.060, 2.056, 2.052, 2.048, 2.045, 2.042,
+]
+# fmt: on
+
+# Tempo máximo de uma execução de cliente, em segundos
+CLIENT_TIMEOUT = 600
+
+
+def parse_size(label):
+    # Converte um tamanho como "10M", "1G" ou "4096" em bytes
+    # @label - tamanho com sufixo opcional K, M ou G
+    unit = UNITS.get(label[-1].lower())
+    return int(label[:-1]) * unit if unit else int(label)
+
+
+def file_name(label):
+    # Nome do arquivo de teste de um tamanho (ex.: "100M" -> "100mb.dat")
+    # @label - tamanho informado em --sizes
+    return f"{label.lower()}b.dat"
+
+
+def confidence_interval(samples):
+    # Retorna (média, desvio padrão, meia largura do intervalo de 95%)
+    # @samples - medições das repetições
+    mean = statistics.mean(samples)
+    if len(samples) < 2:
+        return mean, 0.0, 0.0
+    stdev = statistics.stdev(samples)
+    df = len(samples) - 1
+    t = T_95[df - 1] if df <= len(T_95) else 1.96
+    return mean, stdev, t * stdev / math.sqrt(len(samples))
+
+
+class _ReadyHandler(logging.Handler):
+    # Sinaliza quando um servidor executado em uma thread começa a ouvir
+
+    def __init__(self, event):
+        super().__init__()
+        self.event = event
+
+    def emit(self, record):
+        if record.getMessage().startswith("Servidor ouvindo"):
+            self.event.set()
+
+
+class Benchmark:
+    def __init__(
+        self,
+        protocols,
+        sizes,
+        buffers,
+        concurrency,
+        repeat,
+        warmup,
+        workdir,
+        results,
+        server_mode="subprocess",
+        server_args=None,
+        client_args=None,
+        verbose=False,
+        tuning_profile="default",
+        metrics_formats=("csv",),
+        synthetic_data=False,
+        networks=(impairment.DIRECT,),
+    ):
+        # Inicializa o benchmark com os parâmetros fornecidos
+        # @protocols - protocolos medidos (tcp, udp, udp-reliable)
+        # @sizes - tamanhos dos arquivos de teste (ex.: "10M")
+        # @buffers - tamanhos de buffer, em bytes
+        # @concurrency - números de clientes simultâneos
+        # @repeat - repetições medidas de cada combinação
+        # @warmup - execuções descartadas antes das repetições
+        # @workdir - diretório com os arquivos de teste e as métricas brutas
+        # @results - arquivo CSV com o resumo estatístico
+        # @server_mode - servidor como subprocesso ou em uma thread (in-process)
+        # @server_args - argumentos extras do servidor, por script (tcp/udp)
+        # @client_args - argumentos extras do cliente, por script (tcp/udp)
+        # @verbose - nível de detalhamento do log (True para log detalhado)
+        # @tuning_profile - perfil de ajuste dos sockets, igual nos servidores e
+        #                   nos clientes
+        # @metrics_formats - formatos do arquivo de resultados (metrics.FORMATS)
+        # @synthetic_data - pede arquivos sintéticos (gen:<tamanho>) em vez de
+        #                   gerar os arquivos de teste em disco
+        # @networks - condições de rede percorridas, emuladas por um proxy entre
+        #             os clientes e o servidor (impairment.DIRECT: sem proxy)
+        self.protocols = protocols
+        self.sizes = sizes
+        self.buffers = buffers
+        self.concurrency = concurrency
+        self.repeat = repeat
+        self.warmup = warmup
+        self.workdir = os.path.abspath(workdir)
+        self.results = os.path.abspath(results)
+        self.server_mode = server_mode
+        self.server_args = server_args or {}
+        self.client_args = client_args or {}
+        self.verbose = verbose
+        self.tuning = tuning_profile
+        self.metrics = metrics.Metrics(metrics_formats)
+        self.synthetic = synthetic_data
+        self.networks = list(networks)
+        self.servers = {}  # script -> porta do servidor em execução
+        self.proxies = {}  # script -> porta do emulador de rede em uso
+        self.processes = []  # Servidores executados como subprocesso
+        self.logg = logging.getLogger("BENCHMARK")
+
+    def _init_logging(self):
+        # Configura o sistema de logging com o nível adequado
+        level = logging.DEBUG if self.verbose else logging.INFO
+        logging.basicConfig(level=level)
+        self.logg.info(f"Benchmark em {self.workdir}.")
+
+    def _file_name(self, label):
+        # Arquivo solicitado pelos clientes para um tamanho: o arquivo de teste
+        # em disco ou o arquivo sintético do mesmo tamanho
+        # @label - tamanho informado em --sizes
+        if self.synthetic:
+            return synthetic.PREFIX + label
+        return file_name(label)
+
+    def _generate_files(self):
+        # Cria os arquivos de teste com dados aleatórios, reaproveitando os que
+        # já existem com o tamanho correto
+        if self.synthetic:
+            return  # Os servidores geram o conteúdo
+        data_dir = os.path.join(self.workdir, "send_data")
+        os.makedirs(data_dir, exist_ok=True)
+        for label in self.sizes:
+            path = os.path.join(data_dir, file_name(label))
+            size = parse_size(label)
+            if os.path.isfile(path) and os.path.getsize(path) == size:
+                continue
+            self.logg.info(f"Gerando '{path}' ({size} bytes).")
+            with open(path, "wb") as file:
+                remaining = size
+                while remaining:
+                    chunk = min(remaining, 1024 * 1024)
+                    file.write(os.urandom(chunk))
+                    remaining -= chunk
+
+    def _free_port(self):
+        # Escolhe uma porta livre no loopback, para TCP e para UDP
+        with socket.socket(socket.AF_INET, socket.SOCK_STREAM) as tcp:
+            tcp.bind(("127.0.0.1", 0))
+            port = tcp.getsockname()[1]
+        with socket.socket(socket.AF_INET, socket.SOCK_DGRAM) as udp:
+            udp.bind(("127.0.0.1", port))
+        return port
+
+    def _start_server(self, script):
+        # Inicia o servidor do script (tcp ou udp) no loopback e aguarda até
+        # ele estar ouvindo. Retorna a porta utilizada.
+        # @script - prefixo do script do servidor
+        if script in self.servers:
+            return self.servers[script]
+        port = self._free_port()
+        args = ["--host", "127.0.0.1", "--port", str(port), "--tuning", self.tuning]
+        args += self.server_args.get(script, [])
+        ready = threading.Event()
+
+        if self.server_mode == "inprocess":
+            # Carrega o script como módulo (o nome tem ponto) e roda o servidor
+            # em uma thread daemon, encerrada junto com o benchmark
+            path = os.path.join(SCRIPTS_DIR, f"{script}.server.py")
+            spec = importlib.util.spec_from_file_location(f"{script}_server", path)
+            module = importlib.util.module_from_spec(spec)
+            sys.path.insert(0, SCRIPTS_DIR)
+            spec.loader.exec_module(module)
+            logging.getLogger(f"SERVIDOR_{script.upper()}").addHandler(
+                _ReadyHandler(ready)
+            )
+            server = module.create_server(module.parse_args(args))
+            threading.Thread(target=server.run, daemon=True).start()
+        else:
+            command = [sys.executable, os.path.join(SCRIPTS_DIR, f"{script}.server.py")]
+            process = subprocess.Popen(
+                command + args,
+                cwd=self.workdir,
+                stderr=subprocess.PIPE,
+                text=True,
+            )
+            self.processes.append(process)
+
+            def watch():
+                # Repassa o log do servidor e detecta quando ele está ouvindo
+                for line in process.stderr:
+                    if "Servidor ouvindo" in line:
+                        ready.set()
+                    self.logg.debug(line.rstrip())
+
+            threading.Thread(target=watch, daemon=True).start()
+
+        if not ready.wait(10):
+            raise RuntimeError(f"o servidor {script} não iniciou")
+        self.logg.info(f"Servidor {script} ouvindo na porta {port} ({self.server_mode}).")
+        self.servers[script] = port
+        return port
+
+    @contextmanager
+    def _network(self, script, network):
+        # Intercala o emulador de rede entre os clientes e o servidor do script
+        # enquanto durar o bloco
+        # @script - prefixo do script do servidor
+        # @network - condições de rede (impairment.DIRECT: conexão direta)
+        link = impairment.parse(network)
+        if link is None:
+            yield
+            return
+        proxy = impairment.ImpairmentProxy(
+            "127.0.0.1", self.servers[script], link, protocols=(script,)
+        )
+        self.proxies[script] = proxy.start()
+        try:
+            yield
+        finally:
+            del self.proxies[script]
+            proxy.stop()
+
+    def _stop_servers(self):
+        # Encerra os servidores executados como subprocesso
+        for process in self.processes:
+            process.terminate()
+            process.wait()
+
+    def _run_client(self, protocol, label, buffer_size, slot):
+        # Executa um cliente como subprocesso em um diretório próprio e lê a
+        # linha de métricas que ele gravou. Retorna o dicionário da linha, ou
+        # None se o cliente falhou.
+        # @protocol - protocolo medido
+        # @label - tamanho do arquivo solicitado
+        # @buffer_size - tamanho do buffer
+        # @slot - índice do cliente entre os simultâneos
+        script, extra, metrics = PROTOCOLS[protocol]
+        client_dir = os.path.join(self.workdir, "clientes", str(slot))
+        os.makedirs(client_dir, exist_ok=True)
+        metrics_path = os.path.join(client_dir, metrics)
+        if os.path.exists(metrics_path):
+            os.remove(metrics_path)
+
+        command = [
+            sys.executable,
+            os.path.join(SCRIPTS_DIR, f"{script}.client.py"),
+            "--host",
+            "127.0.0.1",
+            "--port",
+            str(self.proxies.get(script, self.servers[script])),
+            "--file",
+            self._file_name(label),
+            "--buffer",
+            str(buffer_size),
+            "--tuning",
+            self.tuning,
+        ]
+        command += extra + self.client_args.get(script, [])
+        try:
+            result = subprocess.run(
+                command,
+                cwd=client_dir,
+                capture_output=True,
+                text=True,
+                timeout=CLIENT_TIMEOUT,
+            )
+        except subprocess.TimeoutExpired:
+            self.logg.error(f"Cliente {slot} excedeu {CLIENT_TIMEOUT} segundos.")
+            return None
+        if not os.path.isfile(metrics_path):
+            self.logg.error(f"Cliente {slot} não gerou métricas:\n{result.stderr}")
+            return None
+        with open(metrics_path, newline="") as file:
+            return list(csv.DictReader(file))[-1]
+
+    def _run_once(self, protocol, label, buffer_size, clients):
+        # Executa @clients clientes simultâneos. Retorna (taxa agregada em
+        # MB/s, tempo médio, bytes perdidos, CPU média dos clientes por GB), ou
+        # None se algum cliente falhou.
+        with ThreadPoolExecutor(max_workers=clients) as pool:
+            rows = list(
+                pool.map(
+                    lambda slot: self._run_client(protocol, label, buffer_size, slot),
+                    range(clients),
+                )
+            )
+        if None in rows:
+            return None
+        throughput = sum(float(row["Taxa de Transferência (MB/s)"]) for row in rows)
+        elapsed = statistics.mean(float(row["Tempo Decorrido (s)"]) for row in rows)
+        lost = sum(int(row["Bytes Perdidos"]) for row in rows)
+        cpu_per_gb = statistics.mean(float(row["CPU por GB (s)"]) for row in rows)
+        return throughput, elapsed, lost, cpu_per_gb
+
+    def _write_result(self, row):
+        # Registra o resumo de uma combinação; os resumos são gravados em lote
+        # no arquivo de resultados (sem extensão, um arquivo por formato)
+        # @row - dicionário com as colunas do resumo
+        name = os.path.splitext(self.results)[0]
+        self.metrics.add(name, list(row), list(row.values()))
+
+    def run(self):
+        # Gera os arquivos, inicia os servidores e percorre todas as combinações
+        # de protocolo, tamanho de arquivo, buffer e concorrência
+        self._init_logging()
+        # Os servidores e clientes executados identificam os seus registros
+        # de métricas com a execução do benchmark
+        os.environ[metrics.SWEEP_ENV] = metrics.RUN_ID
+        os.makedirs(self.workdir, exist_ok=True)
+        os.chdir(self.workdir)  # Os servidores leem os arquivos de send_data/
+        self._generate_files()
+        try:
+            for protocol in self.protocols:
+                script = PROTOCOLS[protocol][0]
+                self._start_server(script)
+                for network in self.networks:
+                    with self._network(script, network):
+                        for label in self.sizes:
+                            for buffer_size in self.buffers:
+                                for clients in self.concurrency:
+                                    self._measure(
+                                        protocol, network, label, buffer_size, clients
+                                    )
+        finally:
+            self._stop_servers()
+            shutil.rmtree(os.path.join(self.workdir, "clientes"), ignore_errors=True)
+            for path in self.metrics.flush():
+                self.logg.info(f"Resultados salvos no arquivo '{path}'.")
+
+    def _measure(self, protocol, network, label, buffer_size, clients):
+        # Executa o aquecimento e as repetições de uma combinação e registra o
+        # resumo estatístico
+        name = (
+            f"{protocol} rede={network} {self._file_name(label)} "
+            f"buffer={buffer_size} clientes={clients}"
+        )
+        for _ in range(self.warmup):
+            self._run_once(protocol, label, buffer_size, clients)
+
+        samples = []
+        failures = 0
+        for _ in range(self.repeat):
+            sample = self._run_once(protocol, label, buffer_size, clients)
+            if sample is None:
+                failures += 1
+            else:
+                samples.append(sample)
+        if not samples:
+            self.logg.error(f"{name}: todas as execuções falharam.")
+            return
+
+        throughputs = [sample[0] for sample in samples]
+        mean, stdev, margin = confidence_interval(throughputs)
+        self.logg.info(f"{name}: {mean:.2f} ± {margin:.2f} MB/s (IC 95%).")
+        self._write_result(
+            {
+                "Protocolo": protocol,
+                "Rede": network,
+                "Arquivo": self._file_name(label),
+                "Tamanho do Arquivo (bytes)": parse_size(label),
+                "Tamanho do Buffer (bytes)": buffer_size,
+                "Clientes": clients,
+                "Perfil de Ajuste": self.tuning,
+                "Repetições": len(samples),
+                "Falhas": failures,
+                "Taxa Média (MB/s)": mean,
+                "Desvio Padrão (MB/s)": stdev,
+                "IC 95% Inferior (MB/s)": mean - margin,
+                "IC 95% Superior (MB/s)": mean + margin,
+                "Tempo Médio (s)": statistics.mean(sample[1] for sample in samples),
+                "Bytes Perdidos (média)": statistics.mean(
+                    sample[2] for sample in samples
+                ),
+                "CPU do Cliente por GB (s)": statistics.mean(
+                    sample[3] for sample in samples
+                ),
+                "Amostras (MB/s)": " ".join(str(value) for value in throughputs),
+            }
+        )
+
+
+def parse_args(args):
+    # Função para analisar os argumentos da linha de comando
+    import argparse
+
+    parser = argparse.ArgumentParser(
+        description="Benchmark TCP/UDP - Execução automatizada dos testes"
+    )
+    parser.add_argument(
+        "--protocols",
+        nargs="+",
+        choices=list(PROTOCOLS),
+        default=["tcp", "udp"],
+        help="Protocolos medidos",
+    )
+    parser.add_argument(
+        "--sizes",
+        nargs="+",
+        default=["1M", "10M", "100M"],
+        help="Tamanhos dos arquivos de teste (sufixos K, M e G)",
+    )
+    parser.add_argument(
+        "--buffers",
+        nargs="+",
+        type=int,
+        default=[1024, 4096, 8192, 16384, 32768],
+        help="Tamanhos de buffer, em bytes",
+    )
+    parser.add_argument(
+        "--concurrency",
+        nargs="+",
+        type=int,
+        default=[1],
+        help="Números de clientes simultâneos",
+    )
+    parser.add_argument(
+        "--repeat", type=int, default=5, help="Repetições medidas de cada combinação"
+    )
+    parser.add_argument(
+        "--warmup", type=int, default=1, help="Execuções descartadas antes das medidas"
+    )
+    parser.add_argument(
+        "--workdir",
+        default="benchmark",
+        help="Diretório dos arquivos de teste (send_data) e das métricas do servidor",
+    )
+    parser.add_argument(
+        "--results",
+        default="resultados_benchmark.csv",
+        help="Arquivo de resultados com média, desvio padrão e intervalo de "
+        "confiança (a extensão segue --metrics-format)",
+    )
+    parser.add_argument(
+        "--metrics-format",
+        nargs="+",
+        choices=metrics.FORMATS,
+        default=["csv"],
+        help="Formatos do arquivo de resultados: CSV, JSON Lines e/ou colunar binário",
+    )
+    parser.add_argument(
+        "--server-mode",
+        choices=("subprocess", "inprocess"),
+        default="subprocess",
+        help="Executar o servidor como subprocesso ou em uma thread deste processo",
+    )
+    for script in ("tcp", "udp"):
+        parser.add_argument(
+            f"--{script}-server-args",
+            default="",
+            help=f"Argumentos extras do servidor {script.upper()} (ex.: \"--engine threads\")",
+        )
+        parser.add_argument(
+            f"--{script}-client-args",
+            default="",
+            help=f"Argumentos extras do cliente {script.upper()} (ex.: \"--recv-into\")",
+        )
+    parser.add_argument(
+        "--tuning",
+        choices=list(tuning.PROFILES),
+        default="default",
+        help="Perfil de ajuste dos sockets, aplicado aos servidores e aos clientes",
+    )
+    parser.add_argument(
+        "--networks",
+        nargs="+",
+        default=[impairment.DIRECT],
+        help="Condições de rede percorridas, emuladas por um proxy em espaço de "
+        "usuário (ex.: none \"delay=20,jitter=5\" \"rate=100,loss=1,reorder=5\"; "
+        "ms, Mbit/s e %%)",
+    )
+    parser.add_argument(
+        "--synthetic",
+        action="store_true",
+        help="Usar arquivos sintéticos (gen:<tamanho>) gerados pelos servidores, "
+        "sem criar os arquivos de teste nem ler o disco",
+    )
+    parser.add_argument(
+        "-v", "--verbose", action="store_true", help="Exibir o log dos servidores"
+    )
+    parsed = parser.parse_args(args)
+    for network in parsed.networks:
+        try:
+            impairment.parse(network)
+        except ValueError as e:
+            parser.error(f"--networks: {e}")
+    return parsed
+
+
+def main():
+    # Função principal que inicializa o benchmark com os argumentos fornecidos
+    args = parse_args(sys.argv[1:])
+    benchmark = Benchmark(
+        args.protocols,
+        args.sizes,
+        args.buffers,
+        args.concurrency,
+        args.repeat,
+        args.warmup,
+        args.workdir,
+        args.results,
+        args.server_mode,
+        {
+            "tcp": shlex.split(args.tcp_server_args),
+            "udp": shlex.split(args.udp_server_args),
+        },
+        {
+            "tcp": shlex.split(args.tcp_client_args),
+            "udp": shlex.split(args.udp_client_args),
+        },
+        args.verbose,
+        args.tuning,
+        args.metrics_format,
+        args.synthetic,
+        args.networks,
+    )
+    benchmark.run()
+
+
+if __name__ == "__main__":
+    main()
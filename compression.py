@@ -0,0 +1,240 @@
+import lzma
+import time
+import zlib
+
+# Compressão negociada das transferências. O cliente pede o algoritmo na
+# requisição (compress=<algoritmo>, level=<nível>) e o servidor o confirma na
+# resposta de prontidão; um servidor que não conhece o algoritmo não o
+# confirma, e os dados seguem sem compressão. No TCP o fluxo inteiro (ou a
+# faixa de cada conexão) é comprimido de forma contínua. No UDP cada bloco é
+# comprimido sozinho, pois os datagramas podem se perder ou chegar fora de
+# ordem; um byte antes dos dados indica se o bloco foi comprimido ou enviado
+# como está, quando a compressão não o reduziria. O tempo de CPU gasto na
+# compressão (servidor) e na descompressão (cliente) é medido à parte, para
+# comparar com o ganho de taxa no fio.
+ALGORITHMS = ("zlib", "lzma")
+
+# Nível de cada algoritmo quando não informado: os mais rápidos, pois a
+# compressão concorre com o envio
+DEFAULT_LEVELS = {"zlib": 1, "lzma": 0}
+
+# Níveis aceitos por algoritmo; zlib aceita também -1 (o padrão da biblioteca)
+LEVELS = {"zlib": range(-1, 10), "lzma": range(0, 10)}
+
+# Bytes acrescentados a cada bloco UDP (indicador de compressão)
+BLOCK_OVERHEAD = 1
+
+# Indicadores do bloco UDP
+RAW = 0
+COMPRESSED = 1
+
+
+def negotiate(options):
+    # Algoritmo e nível pedidos pelo cliente, ou None se não pediu, se o
+    # algoritmo não é suportado ou se o nível não é válido para ele (a
+    # compressão não é confirmada, e os dados seguem sem compressão)
+    # @options - opções da requisição do cliente
+    algorithm = options.get("compress")
+    if algorithm not in ALGORITHMS:
+        return None
+    try:
+        level = int(options.get("level", DEFAULT_LEVELS[algorithm]))
+    except ValueError:
+        return None
+    if level not in LEVELS[algorithm]:
+        return None
+    return algorithm, level
+
+
+def summary_header():
+    # Colunas da compressão acrescentadas ao CSV de métricas
+    return [
+        "Compressão",
+        "Bytes Originais",
+        "Bytes no Fio",
+        "Razão de Compressão",
+        "CPU da Compressão (s)",
+    ]
+
+
+def merge(codecs):
+    # Soma a contabilidade de várias conexões (mesmo algoritmo) em uma só
+    # @codecs - compressões ou descompressões de cada conexão
+    total = _Codec(codecs[0].algorithm)
+    for codec in codecs:
+        total.raw_bytes += codec.raw_bytes
+        total.wire_bytes += codec.wire_bytes
+        total.cpu_time += codec.cpu_time
+    return total
+
+
+class _Codec:
+    # Contabilidade comum: bytes originais, bytes no fio e tempo de CPU. O
+    # tempo é o de CPU da thread (time.thread_time), que não conta a espera
+    # por outras threads nem pelo socket.
+
+    def __init__(self, algorithm):
+        # @algorithm - algoritmo negociado (um de ALGORITHMS)
+        self.algorithm = algorithm
+        self.raw_bytes = 0
+        self.wire_bytes = 0
+        self.cpu_time = 0.0
+
+    def summary(self):
+        # Valores das colunas de summary_header
+        ratio = self.raw_bytes / self.wire_bytes if self.wire_bytes else 0.0
+        return [
+            self.algorithm,
+            self.raw_bytes,
+            self.wire_bytes,
+            ratio,
+            self.cpu_time,
+        ]
+
+    def describe(self):
+        # Descrição para o log
+        ratio = self.raw_bytes / self.wire_bytes if self.wire_bytes else 0.0
+        return (
+            f"{self.algorithm}: {self.raw_bytes} bytes originais, "
+            f"{self.wire_bytes} no fio (razão {ratio:.2f}), "
+            f"CPU {self.cpu_time:.3f} s"
+        )
+
+
+class StreamCompressor(_Codec):
+    # Fonte do servidor TCP com a interface de arquivo: read() lê a faixa
+    # pedida do arquivo e devolve os bytes comprimidos, até o fim da faixa
+
+    def __init__(self, file, length, algorithm, level):
+        # @file - arquivo aberto, posicionado no primeiro byte da faixa
+        # @length - bytes da faixa
+        # @algorithm - algoritmo negociado
+        # @level - nível de compressão
+        super().__init__(algorithm)
+        self.file = file
+        self.remaining = length
+        self.done = False
+        if algorithm == "lzma":
+            self.compressor = lzma.LZMACompressor(preset=level)
+        else:
+            self.compressor = zlib.compressobj(level)
+
+    def read(self, size):
+        # Retorna os próximos bytes comprimidos, lendo até @size bytes do
+        # arquivo por vez (vazio no fim da faixa)
+        while not self.done:
+            raw = self.file.read(min(size, self.remaining)) if self.remaining else b""
+            start = time.thread_time()
+            if raw:
+                self.remaining -= len(raw)
+                self.raw_bytes += len(raw)
+                data = self.compressor.compress(raw)
+            else:
+                data = self.compressor.flush()
+                self.done = True
+            self.cpu_time += time.thread_time() - start
+            if data:
+                self.wire_bytes += len(data)
+                return data
+        return b""
+
+    def close(self):
+        self.file.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+
+class StreamDecompressor(_Codec):
+    # Descompressão contínua no cliente TCP
+
+    def __init__(self, algorithm):
+        # @algorithm - algoritmo negociado
+        super().__init__(algorithm)
+        if algorithm == "lzma":
+            self.decompressor = lzma.LZMADecompressor()
+        else:
+            self.decompressor = zlib.decompressobj()
+
+    def decompress(self, data):
+        # Retorna os bytes originais contidos em @data (possivelmente vazio)
+        # @data - bytes ou memoryview recebidos
+        start = time.thread_time()
+        raw = self.decompressor.decompress(data)
+        self.cpu_time += time.thread_time() - start
+        self.wire_bytes += len(data)
+        self.raw_bytes += len(raw)
+        return raw
+
+
+class BlockCompressor(_Codec):
+    # Fonte do servidor UDP com a interface de arquivo: cada read(tamanho) lê
+    # um bloco do arquivo e devolve o indicador seguido do bloco comprimido
+    # (ou do bloco original, se a compressão não o reduzir)
+
+    def __init__(self, file, algorithm, level):
+        # @file - arquivo aberto para leitura
+        # @algorithm - algoritmo negociado
+        # @level - nível de compressão
+        super().__init__(algorithm)
+        self.file = file
+        self.level = level
+
+    def read(self, size):
+        # Retorna o próximo bloco de @size bytes do arquivo, codificado
+        raw = self.file.read(size)
+        if not raw:
+            return b""
+        start = time.thread_time()
+        if self.algorithm == "lzma":
+            data = lzma.compress(raw, format=lzma.FORMAT_ALONE, preset=self.level)
+        else:
+            data = zlib.compress(raw, self.level)
+        if len(data) < len(raw):
+            block = bytes((COMPRESSED,)) + data
+        else:
+            block = bytes((RAW,)) + raw
+        self.cpu_time += time.thread_time() - start
+        self.raw_bytes += len(raw)
+        self.wire_bytes += len(block)
+        return block
+
+    def readinto(self, buffer):
+        # Copia o próximo bloco codificado para @buffer, lendo do arquivo o
+        # que cabe nele após o indicador
+        block = self.read(len(buffer) - BLOCK_OVERHEAD)
+        buffer[: len(block)] = block
+        return len(block)
+
+    def close(self):
+        self.file.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+
+class BlockDecompressor(_Codec):
+    # Decodificação dos blocos UDP no cliente
+
+    def decode(self, block):
+        # Retorna os bytes originais de um bloco recebido
+        # @block - indicador seguido dos dados (bytes ou memoryview)
+        self.wire_bytes += len(block)
+        if block[0] == RAW:
+            data = block[BLOCK_OVERHEAD:]
+        else:
+            start = time.thread_time()
+            payload = block[BLOCK_OVERHEAD:]
+            if self.algorithm == "lzma":
+                data = lzma.decompress(payload, format=lzma.FORMAT_ALONE)
+            else:
+                data = zlib.decompress(payload)
+            self.cpu_time += time.thread_time() - start
+        self.raw_bytes += len(data)
+        return data
@@ -0,0 +1,156 @@
+import mmap
+import os
+import threading
+from collections import OrderedDict
+
+# Capacidade padrão do cache de arquivos mapeados, em MB
+DEFAULT_CACHE_MB = 1024
+
+
+class _Mapping:
+    # Um arquivo mapeado em memória e quantas transferências o estão usando
+    __slots__ = ("path", "size", "mtime", "mmap", "view", "users", "evicted")
+
+    def __init__(self, path, stat):
+        # @path - caminho do arquivo
+        # @stat - resultado de os.stat do arquivo
+        self.path = path
+        self.size = stat.st_size
+        self.mtime = stat.st_mtime_ns
+        self.mmap = None
+        self.view = memoryview(b"")  # mmap não aceita arquivos vazios
+        self.users = 0
+        self.evicted = False
+        if self.size:
+            with open(path, "rb") as file:
+                self.mmap = mmap.mmap(file.fileno(), 0, access=mmap.ACCESS_READ)
+            if hasattr(mmap, "MADV_WILLNEED"):
+                # Antecipa a leitura do disco, fora do caminho medido
+                self.mmap.madvise(mmap.MADV_WILLNEED)
+            self.view = memoryview(self.mmap)
+
+    def close(self):
+        # Desfaz o mapeamento. Se ainda houver fatias exportadas, o mapeamento
+        # é liberado pelo coletor de lixo quando elas deixarem de existir.
+        if self.mmap is None:
+            return
+        try:
+            self.view.release()
+            self.mmap.close()
+        except BufferError:
+            pass
+        self.mmap = None
+
+
+class MappedFile:
+    # Leitor com a interface de arquivo (read, readinto, seek) sobre um
+    # mapeamento do cache. read() devolve fatias memoryview do mapeamento,
+    # sem cópia; close() devolve o mapeamento ao cache.
+
+    def __init__(self, cache, mapping):
+        # @cache - cache de onde o mapeamento foi obtido
+        # @mapping - arquivo mapeado
+        self.cache = cache
+        self.mapping = mapping
+        self.view = mapping.view  # Conteúdo inteiro do arquivo
+        self.size = mapping.size
+        self.pos = 0
+        self.closed = False
+
+    def read(self, size=-1):
+        # Retorna a próxima fatia de até @size bytes (vazia no fim do arquivo)
+        end = self.size if size < 0 else min(self.size, self.pos + size)
+        chunk = self.view[self.pos : end]
+        self.pos = max(self.pos, end)
+        return chunk
+
+    def readinto(self, buffer):
+        # Copia os próximos bytes para @buffer e retorna quantos foram copiados
+        chunk = self.read(len(buffer))
+        buffer[: len(chunk)] = chunk
+        return len(chunk)
+
+    def seek(self, pos):
+        self.pos = pos
+
+    def tell(self):
+        return self.pos
+
+    def close(self):
+        if not self.closed:
+            self.closed = True
+            self.view = None
+            self.cache.release(self.mapping)
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+
+class FileCache:
+    # Cache LRU de arquivos mapeados em memória, compartilhado entre as
+    # requisições (e as threads) do servidor. A soma dos tamanhos mapeados é
+    # limitada a @capacity bytes; os menos usados recentemente são desfeitos
+    # quando ninguém mais os utiliza. Arquivos alterados em disco (tamanho ou
+    # data de modificação) são mapeados de novo.
+
+    def __init__(self, capacity):
+        # @capacity - soma máxima dos tamanhos dos arquivos mapeados, em bytes
+        self.capacity = capacity
+        self.mappings = OrderedDict()  # caminho -> _Mapping, do menos recente
+        self.total = 0
+        self.hits = 0
+        self.misses = 0
+        self.lock = threading.Lock()
+
+    def open(self, path):
+        # Retorna um MappedFile para o arquivo, mapeando-o se necessário
+        # @path - caminho do arquivo
+        stat = os.stat(path)
+        with self.lock:
+            mapping = self.mappings.get(path)
+            if mapping is not None and (
+                mapping.size != stat.st_size or mapping.mtime != stat.st_mtime_ns
+            ):
+                self._evict(mapping)  # Arquivo alterado desde o mapeamento
+                mapping = None
+
+            if mapping is None:
+                self.misses += 1
+                mapping = _Mapping(path, stat)
+                if mapping.size <= self.capacity:
+                    self.mappings[path] = mapping
+                    self.total += mapping.size
+                    self._shrink()
+                else:
+                    mapping.evicted = True  # Grande demais: usado uma vez só
+            else:
+                self.hits += 1
+                self.mappings.move_to_end(path)
+            mapping.users += 1
+        return MappedFile(self, mapping)
+
+    def release(self, mapping):
+        # Devolve um mapeamento ao cache, desfazendo-o se já foi descartado
+        # @mapping - mapeamento obtido por open()
+        with self.lock:
+            mapping.users -= 1
+            if mapping.evicted and not mapping.users:
+                mapping.close()
+
+    def _shrink(self):
+        # Descarta os mapeamentos menos usados até caber na capacidade
+        for mapping in list(self.mappings.values()):
+            if self.total <= self.capacity:
+                break
+            self._evict(mapping)
+
+    def _evict(self, mapping):
+        # Remove o mapeamento do cache; ele é desfeito quando não tiver usuários
+        del self.mappings[mapping.path]
+        self.total -= mapping.size
+        mapping.evicted = True
+        if not mapping.users:
+            mapping.close()
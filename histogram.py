@@ -0,0 +1,129 @@
+import csv
+import math
+import os
+from array import array
+
+# Precisão do histograma: cada potência de 2 é dividida em 2^(SUB_BITS - 1)
+# faixas lineares, o que limita o erro relativo de cada valor a ~3%
+SUB_BITS = 6
+SUB_COUNT = 1 << SUB_BITS
+HALF_COUNT = SUB_COUNT >> 1
+
+# Maior intervalo representável: 2^40 ns (~18 minutos)
+MAX_BITS = 40
+BUCKETS = SUB_COUNT + (MAX_BITS - SUB_BITS) * HALF_COUNT
+
+# Percentis exportados junto com as métricas
+PERCENTILES = (50, 90, 99, 99.9)
+
+
+def _index(value):
+    # Índice da faixa do histograma que contém @value (em nanossegundos)
+    if value < SUB_COUNT:
+        return value
+    shift = value.bit_length() - SUB_BITS
+    return SUB_COUNT + (shift - 1) * HALF_COUNT + (value >> shift) - HALF_COUNT
+
+
+def _bounds(index):
+    # Limites [inferior, superior) da faixa @index, em nanossegundos
+    if index < SUB_COUNT:
+        return index, index + 1
+    shift = (index - SUB_COUNT) // HALF_COUNT + 1
+    lower = ((index - SUB_COUNT) % HALF_COUNT + HALF_COUNT) << shift
+    return lower, lower + (1 << shift)
+
+
+class ArrivalHistogram:
+    # Histograma de intervalos entre chegadas de pacotes, no estilo HDR:
+    # faixas log-lineares em um array pré-alocado, de modo que registrar um
+    # intervalo custa apenas um cálculo de índice e um incremento. Calcula
+    # também o jitter entre chegadas consecutivas (estimador da RFC 3550).
+    # Registra ainda valores medidos diretamente, como o RTT de requisições.
+
+    def __init__(self):
+        self.counts = array("Q", bytes(8 * BUCKETS))
+        self.count = 0
+        self.total = 0  # Soma dos intervalos, em ns
+        self.max = 0
+        self.jitter = 0.0  # Em ns
+        self.previous = None  # Instante da última chegada (time.perf_counter)
+        self.last_interval = None
+
+    def arrival(self, now):
+        # Registra a chegada de um pacote no instante @now (time.perf_counter)
+        previous = self.previous
+        self.previous = now
+        if previous is None:
+            return
+        self.record(int((now - previous) * 1e9))
+
+    def record(self, interval):
+        # Registra um valor avulso, já medido (ex.: o RTT de uma requisição)
+        # @interval - valor em nanossegundos
+        self.counts[_index(min(interval, (1 << MAX_BITS) - 1))] += 1
+        self.count += 1
+        self.total += interval
+        if interval > self.max:
+            self.max = interval
+        if self.last_interval is not None:
+            delta = abs(interval - self.last_interval)
+            self.jitter += (delta - self.jitter) / 16
+        self.last_interval = interval
+
+    def merge(self, other):
+        # Soma ao histograma as amostras de @other (ex.: de outra conexão).
+        # O jitter resultante é a média dos jitters, ponderada pelas amostras.
+        # @other - histograma a ser incorporado
+        if not other.count:
+            return
+        for index, count in enumerate(other.counts):
+            if count:
+                self.counts[index] += count
+        total = self.count + other.count
+        self.jitter = (self.jitter * self.count + other.jitter * other.count) / total
+        self.count = total
+        self.total += other.total
+        self.max = max(self.max, other.max)
+
+    def mean(self):
+        # Média dos valores registrados, em ns (0 se não há amostras)
+        return self.total / self.count if self.count else 0
+
+    def percentile(self, percent):
+        # Intervalo (em ns) abaixo do qual estão @percent % das amostras. Retorna
+        # o ponto médio da faixa correspondente, ou 0 se não há amostras.
+        if not self.count:
+            return 0
+        target = math.ceil(self.count * percent / 100)
+        seen = 0
+        for index, count in enumerate(self.counts):
+            seen += count
+            if count and seen >= target:
+                lower, upper = _bounds(index)
+                return (lower + upper - 1) // 2
+        return self.max
+
+    def summary(self):
+        # Percentis e jitter em microssegundos, na ordem de summary_header()
+        values = [self.percentile(p) / 1000 for p in PERCENTILES]
+        return [round(value, 3) for value in values + [self.jitter / 1000]]
+
+    def export(self, path, labels):
+        # Acrescenta as faixas não vazias do histograma a um arquivo CSV
+        # @path - arquivo de destino
+        # @labels - dicionário que identifica a execução (ex.: arquivo, buffer)
+        file_exists = os.path.isfile(path)
+        with open(path, mode="a", newline="") as file:
+            writer = csv.writer(file)
+            if not file_exists:
+                header = ["Início da Faixa (ns)", "Fim da Faixa (ns)", "Pacotes"]
+                writer.writerow(list(labels) + header)
+            for index, count in enumerate(self.counts):
+                if count:
+                    writer.writerow(list(labels.values()) + [*_bounds(index), count])
+
+
+def summary_header():
+    # Colunas das métricas de chegada acrescentadas ao CSV de métricas
+    return [f"Intervalo p{p} (us)" for p in PERCENTILES] + ["Jitter (us)"]
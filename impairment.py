@@ -0,0 +1,553 @@
+import asyncio
+import logging
+import random
+import socket
+import sys
+import threading
+
+# Emulação de rede em espaço de usuário. No loopback o UDP quase não perde
+# pacotes e o RTT é praticamente zero, o que não reproduz um enlace real. Um
+# proxy asyncio fica entre o cliente e o servidor e encaminha o tráfego nos
+# dois sentidos através de um enlace emulado (Link), que aplica atraso,
+# variação do atraso (jitter), limite de banda, perdas e reordenação, como o
+# netem do Linux, mas sem root nem tc. O proxy atende TCP e UDP na mesma
+# porta. No TCP o proxy termina as conexões, por isso só o atraso, o jitter e
+# a banda se aplicam (sem perdas nem reordenação, e sem reordenar os bytes);
+# a banda limitada e a fila cheia viram controle de fluxo do TCP.
+
+# Parâmetros aceitos na descrição do enlace (ex.: "delay=20,jitter=5,loss=1"):
+#   delay   - atraso em cada sentido, em ms
+#   jitter  - variação uniforme do atraso (+/-), em ms
+#   rate    - banda de cada sentido, em Mbit/s (0: ilimitada)
+#   loss    - perda aleatória de datagramas UDP, em %
+#   reorder - datagramas UDP enviados sem o atraso, passando à frente dos
+#             anteriores, em % (exige delay, como no netem)
+#   limit   - datagramas UDP na fila do enlace; acima disso são descartados
+PARAMETERS = ("delay", "jitter", "rate", "loss", "reorder", "limit")
+
+# Descrição que dispensa o proxy (conexão direta ao servidor)
+DIRECT = "none"
+
+# Fila do enlace UDP quando não informada, em datagramas (como no netem)
+DEFAULT_LIMIT = 1000
+
+# Tamanho das leituras do proxy TCP
+READ_SIZE = 64 * 1024
+
+# Leituras TCP aguardando a entrega em cada sentido, antes de o proxy parar
+# de ler e o controle de fluxo do TCP segurar o remetente
+TCP_QUEUE = 256
+
+# Buffers dos sockets UDP do proxy, em bytes: o servidor envia em rajadas
+# mais rápido do que o proxy encaminha, e o excesso seria perdido no socket do
+# proxy em vez de passar pelo enlace emulado
+SOCKET_BUFFER = 8 * 1024 * 1024
+
+# Silêncio após o qual uma sessão UDP do proxy é encerrada, em segundos
+SESSION_TIMEOUT = 30.0
+
+
+class Impairment:
+    # Condições do enlace emulado, iguais nos dois sentidos
+
+    def __init__(
+        self,
+        delay=0.0,
+        jitter=0.0,
+        rate=0.0,
+        loss=0.0,
+        reorder=0.0,
+        limit=DEFAULT_LIMIT,
+    ):
+        # @delay - atraso, em ms
+        # @jitter - variação do atraso, em ms
+        # @rate - banda, em Mbit/s (0: ilimitada)
+        # @loss - perda de datagramas UDP, em %
+        # @reorder - datagramas UDP reordenados, em %
+        # @limit - datagramas UDP na fila do enlace
+        if reorder and not delay:
+            raise ValueError("reorder exige delay")
+        self.delay = delay / 1000
+        self.jitter = jitter / 1000
+        self.rate = rate * 1e6 / 8  # bytes/s
+        self.loss = loss / 100
+        self.reorder = reorder / 100
+        self.limit = int(limit)
+        self.label = (
+            ",".join(
+                f"{name}={value:g}"
+                for name, value in zip(
+                    PARAMETERS, (delay, jitter, rate, loss, reorder, limit)
+                )
+                if value and not (name == "limit" and value == DEFAULT_LIMIT)
+            )
+            or "delay=0"
+        )
+
+    def __str__(self):
+        return self.label
+
+
+def _enlarge_buffers(sock):
+    # Aumenta os buffers de um socket UDP do proxy (até o limite do sistema)
+    # @sock - socket UDP
+    for option in (socket.SO_RCVBUF, socket.SO_SNDBUF):
+        try:
+            sock.setsockopt(socket.SOL_SOCKET, option, SOCKET_BUFFER)
+        except OSError:
+            pass
+
+
+def parse(spec):
+    # Converte a descrição de um enlace (ex.: "delay=20,jitter=5,rate=100") em
+    # um Impairment, ou None para DIRECT
+    # @spec - parâmetros nome=valor separados por vírgula
+    if spec.strip().lower() == DIRECT:
+        return None
+    values = {}
+    for item in filter(None, (part.strip() for part in spec.split(","))):
+        name, sep, value = item.partition("=")
+        if not sep or name not in PARAMETERS:
+            raise ValueError(
+                f"parâmetro inválido '{item}' (use {', '.join(PARAMETERS)})"
+            )
+        try:
+            values[name] = float(value)
+        except ValueError:
+            raise ValueError(f"valor inválido em '{item}'") from None
+        if values[name] < 0:
+            raise ValueError(f"valor negativo em '{item}'")
+    return Impairment(**values)
+
+
+class Link:
+    # Um sentido do enlace emulado: decide se cada pacote é entregue e quando.
+    # A banda é emulada como a serialização em um enlace: cada pacote ocupa o
+    # enlace por tamanho/banda segundos depois do anterior, e o atraso conta a
+    # partir do fim da serialização.
+
+    def __init__(self, impairment, rng, ordered=False):
+        # @impairment - condições do enlace
+        # @rng - gerador aleatório (com semente, para repetir as perdas)
+        # @ordered - entrega em ordem e sem perdas (sentido de uma conexão TCP)
+        self.impairment = impairment
+        self.rng = rng
+        self.ordered = ordered
+        self.busy_until = 0.0  # Fim da serialização do último pacote
+        self.last = 0.0  # Última entrega agendada (ordered)
+        self.queued = 0  # Pacotes agendados e ainda não entregues
+        self.packets = 0  # Pacotes entregues
+        self.bytes = 0  # Bytes entregues
+        self.lost = 0  # Pacotes descartados pela perda aleatória
+        self.dropped = 0  # Pacotes descartados com a fila cheia
+        self.reordered = 0  # Pacotes enviados sem o atraso
+
+    def schedule(self, size, now):
+        # Instante de entrega de um pacote, ou None se ele for descartado
+        # @size - bytes do pacote
+        # @now - instante de chegada ao enlace (relógio do laço asyncio)
+        impairment = self.impairment
+        if not self.ordered:
+            if self.queued >= impairment.limit:
+                self.dropped += 1
+                return None
+            if impairment.loss and self.rng.random() < impairment.loss:
+                self.lost += 1
+                return None
+        start = now
+        if impairment.rate:
+            start = max(now, self.busy_until) + size / impairment.rate
+            self.busy_until = start
+        delay = impairment.delay
+        if impairment.jitter:
+            jitter = impairment.jitter
+            delay = max(0.0, delay + self.rng.uniform(-jitter, jitter))
+        if (
+            not self.ordered
+            and impairment.reorder
+            and self.rng.random() < impairment.reorder
+        ):
+            delay = 0.0
+            self.reordered += 1
+        deliver = start + delay
+        if self.ordered:
+            # O jitter não pode reordenar os bytes de uma conexão TCP
+            deliver = self.last = max(deliver, self.last)
+        self.queued += 1
+        return deliver
+
+    def delivered(self, size):
+        # Contabiliza a entrega de um pacote agendado
+        self.queued -= 1
+        self.packets += 1
+        self.bytes += size
+
+    def summary(self):
+        # Descrição das contagens do sentido, para o log
+        text = f"{self.packets} pacotes ({self.bytes} bytes) entregues"
+        if not self.ordered:
+            text += (
+                f", {self.lost} perdidos, {self.dropped} descartados com a fila "
+                f"cheia, {self.reordered} reordenados"
+            )
+        return text
+
+
+class _UdpSession(asyncio.DatagramProtocol):
+    # Sessão UDP de um cliente: um socket próprio conectado ao servidor, para
+    # que o servidor veja cada cliente em um endereço diferente
+
+    def __init__(self, proxy, addr):
+        # @proxy - proxy que recebe os datagramas do cliente
+        # @addr - endereço do cliente
+        self.proxy = proxy
+        self.addr = addr
+        self.transport = None
+        self.last_heard = asyncio.get_running_loop().time()
+
+    def connection_made(self, transport):
+        self.transport = transport
+        _enlarge_buffers(transport.get_extra_info("socket"))
+
+    def datagram_received(self, data, addr):
+        # Datagrama do servidor: segue ao cliente pelo enlace de descida
+        self.proxy.forward(self.proxy.downlink, self.proxy.transport, data, self.addr)
+
+    def error_received(self, exc):
+        self.proxy.logg.debug(f"Erro no socket da sessão {self.addr}: {exc}")
+
+
+class _UdpProxy(asyncio.DatagramProtocol):
+    # Lado do proxy UDP voltado aos clientes
+
+    def __init__(self, proxy):
+        # @proxy - ImpairmentProxy com o endereço do servidor e os enlaces
+        self.target = proxy.target
+        self.uplink = proxy.udp_uplink
+        self.downlink = proxy.udp_downlink
+        self.logg = proxy.logg
+        self.transport = None
+        self.sessions = {}  # endereço do cliente -> _UdpSession
+        self.pending = {}  # endereço -> datagramas à espera da sessão
+
+    def connection_made(self, transport):
+        self.transport = transport
+        asyncio.get_running_loop().call_later(SESSION_TIMEOUT, self._expire)
+
+    def datagram_received(self, data, addr):
+        # Datagrama do cliente: segue ao servidor pelo enlace de subida
+        session = self.sessions.get(addr)
+        if session is not None:
+            session.last_heard = asyncio.get_running_loop().time()
+            self.forward(self.uplink, session.transport, data, None)
+        elif addr in self.pending:
+            self.pending[addr].append(data)
+        else:
+            self.pending[addr] = [data]
+            asyncio.ensure_future(self._open_session(addr))
+
+    async def _open_session(self, addr):
+        # Cria a sessão de um cliente novo e encaminha os datagramas que
+        # chegaram enquanto ela era criada
+        loop = asyncio.get_running_loop()
+        _, session = await loop.create_datagram_endpoint(
+            lambda: _UdpSession(self, addr), remote_addr=self.target
+        )
+        self.sessions[addr] = session
+        for data in self.pending.pop(addr):
+            self.forward(self.uplink, session.transport, data, None)
+
+    def forward(self, link, transport, data, addr):
+        # Agenda a entrega de um datagrama pelo enlace
+        # @link - sentido do enlace
+        # @transport - transporte que envia o datagrama
+        # @data - datagrama
+        # @addr - destino (None para o socket conectado ao servidor)
+        loop = asyncio.get_running_loop()
+        deliver = link.schedule(len(data), loop.time())
+        if deliver is None:
+            return
+        if deliver <= loop.time():
+            self._deliver(link, transport, data, addr)
+        else:
+            loop.call_at(deliver, self._deliver, link, transport, data, addr)
+
+    @staticmethod
+    def _deliver(link, transport, data, addr):
+        link.delivered(len(data))
+        if not transport.is_closing():
+            transport.sendto(data, addr)
+
+    def _expire(self):
+        # Encerra as sessões em silêncio há mais de SESSION_TIMEOUT
+        loop = asyncio.get_running_loop()
+        now = loop.time()
+        for addr, session in list(self.sessions.items()):
+            if now - session.last_heard > SESSION_TIMEOUT:
+                session.transport.close()
+                del self.sessions[addr]
+        loop.call_later(SESSION_TIMEOUT, self._expire)
+
+    def close(self):
+        for session in self.sessions.values():
+            session.transport.close()
+        self.transport.close()
+
+
+class ImpairmentProxy:
+    # Proxy TCP e UDP com o enlace emulado entre os clientes e o servidor.
+    # Executa em uma thread própria (start/stop), para ser usado pelo
+    # benchmark, ou no laço asyncio do chamador (serve).
+
+    def __init__(
+        self,
+        target_host,
+        target_port,
+        impairment,
+        protocols=("tcp", "udp"),
+        host="127.0.0.1",
+        port=0,
+        seed=None,
+    ):
+        # @target_host - endereço do servidor
+        # @target_port - porta do servidor
+        # @impairment - condições do enlace (Impairment)
+        # @protocols - protocolos encaminhados (tcp e/ou udp)
+        # @host - endereço onde o proxy ouve
+        # @port - porta onde o proxy ouve, para TCP e UDP (0: escolhe uma livre)
+        # @seed - semente das perdas, do jitter e da reordenação
+        self.target = (target_host, target_port)
+        self.impairment = impairment
+        self.protocols = protocols
+        self.host = host
+        self.port = port
+        self.rng = random.Random(seed)
+        self.udp_uplink = Link(impairment, self.rng)
+        self.udp_downlink = Link(impairment, self.rng)
+        self.tcp_uplink = Link(impairment, self.rng, ordered=True)
+        self.tcp_downlink = Link(impairment, self.rng, ordered=True)
+        self.connections = 0  # Conexões TCP atendidas
+        self.loop = None
+        self.stopped = None
+        self.thread = None
+        self.logg = logging.getLogger("EMULADOR_REDE")
+
+    def _bind(self):
+        # Liga os sockets TCP e UDP do proxy à mesma porta
+        tcp = socket.socket(socket.AF_INET, socket.SOCK_STREAM)
+        udp = socket.socket(socket.AF_INET, socket.SOCK_DGRAM)
+        try:
+            tcp.setsockopt(socket.SOL_SOCKET, socket.SO_REUSEADDR, 1)
+            tcp.bind((self.host, self.port))
+            self.port = tcp.getsockname()[1]
+            udp.bind((self.host, self.port))
+            _enlarge_buffers(udp)
+        except BaseException:
+            tcp.close()
+            udp.close()
+            raise
+        return tcp, udp
+
+    async def serve(self, ready=None):
+        # Atende até stop() (ou o cancelamento do laço)
+        # @ready - evento sinalizado quando o proxy está ouvindo
+        self.loop = asyncio.get_running_loop()
+        self.stopped = asyncio.Event()
+        tcp, udp = self._bind()
+        server = udp_proxy = None
+        try:
+            if "tcp" in self.protocols:
+                server = await asyncio.start_server(self._handle_tcp, sock=tcp)
+            else:
+                tcp.close()
+            if "udp" in self.protocols:
+                _, udp_proxy = await self.loop.create_datagram_endpoint(
+                    lambda: _UdpProxy(self), sock=udp
+                )
+            else:
+                udp.close()
+            self.logg.info(
+                f"Emulador de rede ouvindo em {self.host}:{self.port} "
+                f"({'/'.join(self.protocols)} -> {self.target[0]}:{self.target[1]}, "
+                f"{self.impairment})"
+            )
+            if ready is not None:
+                ready.set()
+            await self.stopped.wait()
+        finally:
+            if server is not None:
+                server.close()
+            if udp_proxy is not None:
+                udp_proxy.close()
+            self._log_summary()
+
+    async def _handle_tcp(self, client_reader, client_writer):
+        # Encaminha uma conexão TCP, com um enlace em cada sentido
+        self.connections += 1
+        try:
+            server_reader, server_writer = await asyncio.open_connection(*self.target)
+        except OSError as e:
+            self.logg.error(f"Servidor inacessível: {e}")
+            client_writer.close()
+            return
+        for writer in (client_writer, server_writer):
+            writer.get_extra_info("socket").setsockopt(
+                socket.IPPROTO_TCP, socket.TCP_NODELAY, 1
+            )
+        try:
+            results = await asyncio.gather(
+                self._pump(client_reader, server_writer, self.tcp_uplink),
+                self._pump(server_reader, client_writer, self.tcp_downlink),
+                return_exceptions=True,
+            )
+            for error in filter(None, results):
+                self.logg.debug(f"Conexão encerrada: {error}")
+        finally:
+            client_writer.close()
+            server_writer.close()
+
+    async def _pump(self, reader, writer, link):
+        # Lê de um lado e entrega ao outro no instante decidido pelo enlace.
+        # A fila limitada entre a leitura e a entrega faz o proxy parar de ler
+        # quando o enlace está saturado.
+        queue = asyncio.Queue(TCP_QUEUE)
+
+        async def deliver():
+            # Após uma falha na escrita, continua esvaziando a fila, para a
+            # leitura não ficar parada com a fila cheia
+            failure = None
+            while (item := await queue.get()) is not None:
+                if failure is not None:
+                    continue
+                when, data = item
+                delay = when - self.loop.time()
+                if delay > 0:
+                    await asyncio.sleep(delay)
+                try:
+                    writer.write(data)
+                    await writer.drain()
+                except (ConnectionError, OSError) as e:
+                    failure = e
+                    continue
+                link.delivered(len(data))
+            if failure is not None:
+                raise failure
+            if writer.can_write_eof():
+                writer.write_eof()  # Repassa o fim do envio (half-close)
+
+        task = asyncio.ensure_future(deliver())
+        try:
+            while data := await reader.read(READ_SIZE):
+                await queue.put((link.schedule(len(data), self.loop.time()), data))
+        finally:
+            await queue.put(None)
+            await task
+
+    def _log_summary(self):
+        # Loga o que o enlace entregou e descartou em cada sentido
+        if "udp" in self.protocols:
+            self.logg.info(f"UDP cliente -> servidor: {self.udp_uplink.summary()}.")
+            self.logg.info(f"UDP servidor -> cliente: {self.udp_downlink.summary()}.")
+        if "tcp" in self.protocols:
+            self.logg.info(
+                f"TCP ({self.connections} conexões) cliente -> servidor: "
+                f"{self.tcp_uplink.summary()}; servidor -> cliente: "
+                f"{self.tcp_downlink.summary()}."
+            )
+
+    def start(self):
+        # Executa o proxy em uma thread daemon. Retorna a porta do proxy.
+        ready = threading.Event()
+        failure = []
+
+        def run():
+            try:
+                asyncio.run(self.serve(ready))
+            except Exception as e:
+                failure.append(e)
+                ready.set()
+
+        self.thread = threading.Thread(target=run, name="emulador", daemon=True)
+        self.thread.start()
+        ready.wait()
+        if failure:
+            raise failure[0]
+        return self.port
+
+    def stop(self):
+        # Encerra o proxy iniciado com start()
+        if self.thread is None:
+            return
+        self.loop.call_soon_threadsafe(self.stopped.set)
+        self.thread.join()
+        self.thread = None
+
+
+def parse_args(args):
+    # Função para analisar os argumentos da linha de comando
+    import argparse
+
+    parser = argparse.ArgumentParser(
+        description="Emulador de rede - proxy TCP/UDP com atraso, jitter, banda, "
+        "perdas e reordenação"
+    )
+    parser.add_argument(
+        "--host", default="127.0.0.1", help="Endereço onde o proxy ouve"
+    )
+    parser.add_argument(
+        "--port", required=True, type=int, help="Porta do proxy (TCP e UDP)"
+    )
+    parser.add_argument(
+        "--target-host", default="127.0.0.1", help="Endereço do servidor"
+    )
+    parser.add_argument(
+        "--target-port", required=True, type=int, help="Porta do servidor"
+    )
+    parser.add_argument(
+        "--protocols",
+        nargs="+",
+        choices=("tcp", "udp"),
+        default=["tcp", "udp"],
+        help="Protocolos encaminhados",
+    )
+    parser.add_argument(
+        "--link",
+        default="delay=0",
+        help="Condições do enlace, ex.: \"delay=20,jitter=5,rate=100,loss=1,"
+        "reorder=5\" (ms, Mbit/s e %%)",
+    )
+    parser.add_argument(
+        "--seed", type=int, help="Semente das perdas, do jitter e da reordenação"
+    )
+    parser.add_argument(
+        "-v", "--verbose", action="store_true", help="Ativar log detalhado"
+    )
+    parsed = parser.parse_args(args)
+    try:
+        parsed.link = parse(parsed.link) or Impairment()
+    except ValueError as e:
+        parser.error(f"--link: {e}")
+    return parsed
+
+
+def main():
+    # Função principal que inicia o proxy com os argumentos fornecidos
+    args = parse_args(sys.argv[1:])
+    logging.basicConfig(level=logging.DEBUG if args.verbose else logging.INFO)
+    proxy = ImpairmentProxy(
+        args.target_host,
+        args.target_port,
+        args.link,
+        args.protocols,
+        args.host,
+        args.port,
+        args.seed,
+    )
+    try:
+        asyncio.run(proxy.serve())
+    except KeyboardInterrupt:
+        pass
+
+
+if __name__ == "__main__":
+    main()
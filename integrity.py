@@ -0,0 +1,239 @@
+import hashlib
+import sys
+import threading
+import time
+import zlib
+from array import array
+from collections import OrderedDict
+
+import rudp
+import synthetic
+
+# Verificação de integridade de ponta a ponta. O servidor anuncia na resposta
+# de prontidão o resumo do que vai enviar, e o cliente calcula o mesmo resumo
+# sobre os dados recebidos, à medida que chegam. No UDP, cada datagrama leva
+# também o CRC32 do seu bloco (após o cabeçalho), o que localiza os blocos
+# corrompidos; o resumo anunciado é então calculado sobre a lista dos CRCs
+# dos blocos, em ordem, pois os blocos podem chegar fora de ordem.
+ALGORITHMS = ("crc32", "blake2b", "sha256")
+
+# Tamanho das leituras ao calcular o resumo de um arquivo no servidor
+READ_SIZE = 1024 * 1024
+
+# Resumos e tabelas de CRCs mantidos em cache pelo servidor
+CACHE_ENTRIES = 64
+
+
+class _Crc32:
+    # CRC32 do zlib com a interface incremental do hashlib
+
+    def __init__(self):
+        self.value = 0
+
+    def update(self, data):
+        self.value = zlib.crc32(data, self.value)
+
+    def hexdigest(self):
+        return f"{self.value:08x}"
+
+
+def new_hash(algorithm):
+    # Cria o resumo incremental do algoritmo pedido
+    # @algorithm - nome do algoritmo (um de ALGORITHMS)
+    if algorithm == "crc32":
+        return _Crc32()
+    return hashlib.new(algorithm)
+
+
+class StreamDigest:
+    # Resumo calculado sobre os dados à medida que chegam (bytes ou
+    # memoryviews, sem cópia). O tempo gasto no cálculo é acumulado à parte,
+    # para ser descontado da taxa de transferência.
+
+    def __init__(self, algorithm):
+        # @algorithm - nome do algoritmo (um de ALGORITHMS)
+        self.algorithm = algorithm
+        self.hash = new_hash(algorithm)
+        self.time = 0.0  # Segundos gastos no cálculo
+
+    def update(self, data):
+        start = time.perf_counter()
+        self.hash.update(data)
+        self.time += time.perf_counter() - start
+
+    def hexdigest(self):
+        return self.hash.hexdigest()
+
+
+def table_digest(algorithm, crcs):
+    # Resumo da lista de CRCs dos blocos, em ordem e em big-endian, usado
+    # como resumo do arquivo no UDP
+    # @algorithm - nome do algoritmo (um de ALGORITHMS)
+    # @crcs - array("I") com o CRC32 de cada bloco
+    table = array("I", crcs)
+    if sys.byteorder == "little":
+        table.byteswap()
+    digest = new_hash(algorithm)
+    digest.update(table)
+    return digest.hexdigest()
+
+
+class ChunkVerifier:
+    # Verificação dos blocos do UDP no cliente: compara o CRC32 calculado
+    # sobre cada bloco com o que veio no datagrama e guarda o CRC calculado
+    # na posição do bloco, para conferir o resumo do arquivo ao final
+
+    def __init__(self, total_chunks):
+        # @total_chunks - número de blocos anunciado pelo servidor
+        self.crcs = array("I", bytes(4 * total_chunks))
+        self.corrupted = []  # Blocos com CRC divergente, na ordem de chegada
+        self.time = 0.0  # Segundos gastos no cálculo
+
+    def check(self, seq, datagram):
+        # Verifica o bloco de um datagrama DATA. Retorna True se o CRC confere;
+        # blocos corrompidos devem ser descartados (como se fossem perdidos).
+        # @seq - número de sequência do bloco
+        # @datagram - datagrama completo (cabeçalho, CRC e dados)
+        start = time.perf_counter()
+        (expected,) = rudp.CHECKSUM.unpack_from(datagram, rudp.HEADER.size)
+        crc = zlib.crc32(datagram[rudp.CHECKED_HEADER_SIZE :])
+        self.time += time.perf_counter() - start
+        if crc != expected:
+            self.corrupted.append(seq)
+            return False
+        if seq < len(self.crcs):
+            self.crcs[seq] = crc
+        return True
+
+    def hexdigest(self, algorithm):
+        # Resumo do arquivo calculado a partir dos blocos recebidos
+        start = time.perf_counter()
+        digest = table_digest(algorithm, self.crcs)
+        self.time += time.perf_counter() - start
+        return digest
+
+    def corrupted_ranges(self, buffer_size):
+        # Faixas de bytes [início, fim) dos blocos corrompidos, agrupadas
+        # @buffer_size - tamanho dos dados de cada bloco
+        ranges = []
+        for seq in sorted(set(self.corrupted)):
+            start = seq * buffer_size
+            if ranges and ranges[-1][1] == start:
+                ranges[-1][1] = start + buffer_size
+            else:
+                ranges.append([start, start + buffer_size])
+        return ranges
+
+
+class DigestCache:
+    # Resumos calculados pelo servidor, mantidos entre as requisições (as
+    # repetições de um benchmark pedem sempre os mesmos arquivos). Um arquivo
+    # alterado em disco (tamanho ou data de modificação) é recalculado.
+
+    def __init__(self):
+        self.entries = OrderedDict()  # chave -> resumo ou tabela de CRCs
+        self.lock = threading.Lock()
+        self.time = 0.0  # Segundos gastos calculando resumos
+
+    def _get(self, key, compute):
+        # Retorna o valor em cache de @key, calculando-o com @compute se
+        # necessário. O cálculo é feito fora da trava.
+        with self.lock:
+            if key in self.entries:
+                self.entries.move_to_end(key)
+                return self.entries[key]
+        start = time.perf_counter()
+        value = compute()
+        with self.lock:
+            self.time += time.perf_counter() - start
+            self.entries[key] = value
+            while len(self.entries) > CACHE_ENTRIES:
+                self.entries.popitem(last=False)
+        return value
+
+    def digest(self, path, algorithm, offset, length):
+        # Resumo dos @length bytes de @path a partir de @offset
+        # @path - caminho do arquivo (ou nome de um arquivo sintético)
+        # @algorithm - nome do algoritmo (um de ALGORITHMS)
+        # @offset - primeiro byte
+        # @length - número de bytes
+        key = (path, *synthetic.stat_key(path), algorithm, offset, length)
+
+        def compute():
+            digest = new_hash(algorithm)
+            view = memoryview(bytearray(READ_SIZE))
+            with synthetic.open_source(path) as file:
+                file.seek(offset)
+                remaining = length
+                while remaining:
+                    size = file.readinto(view[: min(READ_SIZE, remaining)])
+                    if not size:
+                        break
+                    digest.update(view[:size])
+                    remaining -= size
+            return digest.hexdigest()
+
+        return self._get(key, compute)
+
+    def chunk_crcs(self, path, buffer_size):
+        # Tabela com o CRC32 de cada bloco de @buffer_size bytes de @path
+        # @path - caminho do arquivo
+        # @buffer_size - tamanho dos dados de cada datagrama
+        key = (path, *synthetic.stat_key(path), "chunks", buffer_size)
+
+        def compute():
+            crcs = array("I")
+            view = memoryview(bytearray(buffer_size))
+            with synthetic.open_source(path) as file:
+                while size := file.readinto(view):
+                    crcs.append(zlib.crc32(view[:size]))
+            return crcs
+
+        return self._get(key, compute)
+
+
+def summary_header():
+    # Colunas da verificação de integridade acrescentadas ao CSV de métricas
+    return [
+        "Algoritmo de Resumo",
+        "Resumo Esperado",
+        "Resumo Calculado",
+        "Blocos Corrompidos",
+        "Tempo de Verificação (s)",
+        "Taxa sem Verificação (MB/s)",
+    ]
+
+
+class Verification:
+    # Resultado da verificação de uma transferência, registrado nas métricas
+
+    def __init__(self, algorithm, expected, calculated, verify_time, corrupted=None):
+        # @algorithm - algoritmo do resumo
+        # @expected - resumo anunciado pelo servidor
+        # @calculated - resumo calculado pelo cliente
+        # @verify_time - segundos gastos calculando resumos e CRCs
+        # @corrupted - blocos descartados por CRC divergente (None no TCP)
+        self.algorithm = algorithm
+        self.expected = expected
+        self.calculated = calculated
+        self.time = verify_time
+        self.corrupted = corrupted
+
+    @property
+    def passed(self):
+        return self.expected == self.calculated and not self.corrupted
+
+    def summary(self, total, elapsed):
+        # Valores das colunas de summary_header
+        # @total - bytes recebidos
+        # @elapsed - tempo da transferência, incluindo a verificação
+        net = elapsed - self.time
+        rate = total / net / (1024 * 1024) if net > 0 else 0.0
+        return [
+            self.algorithm,
+            self.expected,
+            self.calculated,
+            "" if self.corrupted is None else self.corrupted,
+            self.time,
+            rate,
+        ]
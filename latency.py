@@ -0,0 +1,79 @@
+import socket
+
+from histogram import PERCENTILES
+
+# Modo de requisição/resposta (ping-pong): em vez de baixar um arquivo, o
+# cliente envia mensagens pequenas de tamanho fixo (o tamanho do buffer) e o
+# servidor devolve cada uma assim que a recebe. O cliente mantém até
+# "pipeline" mensagens sem resposta em cada conexão e mede o RTT de cada uma,
+# reproduzindo o tráfego de RPCs em vez da transferência em massa.
+
+# Nome enviado no campo do arquivo da requisição; o servidor não abre arquivos
+ECHO_FILE = "echo"
+
+# Requisições por conexão quando não informado
+DEFAULT_REQUESTS = 10000
+
+# Tamanho das leituras do servidor TCP ao devolver as mensagens
+ECHO_BUFFER = 64 * 1024
+
+# Silêncio após o qual as requisições UDP sem resposta são dadas como perdidas,
+# em segundos
+ECHO_TIMEOUT = 0.5
+
+
+def nodelay(sock):
+    # Desativa o algoritmo de Nagle: com várias mensagens pequenas em trânsito,
+    # ele seguraria as seguintes até a confirmação da primeira. Remove também
+    # o TCP_CORK do perfil throughput, que seguraria cada resposta pequena até
+    # o temporizador do kernel (cerca de 200 ms).
+    # @sock - socket TCP conectado
+    sock.setsockopt(socket.IPPROTO_TCP, socket.TCP_NODELAY, 1)
+    cork = getattr(socket, "TCP_CORK", None)
+    if cork is not None:
+        sock.setsockopt(socket.IPPROTO_TCP, cork, 0)
+
+
+def summary_header():
+    # Colunas das métricas do modo de requisição/resposta
+    return (
+        [
+            "Tamanho da Mensagem (bytes)",
+            "Profundidade do Pipeline",
+            "Conexões",
+            "Requisições",
+            "Respostas",
+            "Requisições Perdidas",
+            "Tempo Decorrido (s)",
+            "Requisições por Segundo",
+            "RTT Médio (us)",
+        ]
+        + [f"RTT p{p} (us)" for p in PERCENTILES]
+        + ["RTT Máximo (us)", "Jitter do RTT (us)"]
+    )
+
+
+def summary(message_size, pipeline, connections, requests, rtts, lost, elapsed):
+    # Valores das colunas de summary_header
+    # @message_size - tamanho de cada mensagem, em bytes
+    # @pipeline - mensagens sem resposta permitidas por conexão
+    # @connections - conexões simultâneas
+    # @requests - requisições enviadas, somando todas as conexões
+    # @rtts - histograma dos RTTs de todas as conexões (ArrivalHistogram)
+    # @lost - requisições sem resposta (sempre 0 no TCP)
+    # @elapsed - tempo entre a primeira requisição e a última resposta
+    *percentiles, jitter = rtts.summary()
+    return [
+        message_size,
+        pipeline,
+        connections,
+        requests,
+        rtts.count,
+        lost,
+        elapsed,
+        rtts.count / elapsed if elapsed else 0.0,
+        rtts.mean() / 1000,
+        *percentiles,
+        rtts.max / 1000,
+        jitter,
+    ]
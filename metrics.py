@@ -0,0 +1,437 @@
+import atexit
+import csv
+import io
+import json
+import logging
+import os
+import platform
+import struct
+import sys
+import threading
+import time
+import uuid
+from array import array
+from datetime import datetime, timezone
+
+try:
+    import fcntl
+except ImportError:  # Sem trava entre processos (ex.: Windows)
+    fcntl = None
+
+# Pipeline de métricas compartilhado pelos clientes, servidores e benchmark.
+# Cada linha de métricas vira um registro (Record) com a identificação da
+# execução, o host e o instante, com precisão de microssegundos. Os registros
+# são acumulados em memória e gravados em lote, sem arredondamento, em cada
+# formato pedido:
+#   csv   - o formato de sempre, com o cabeçalho na primeira gravação
+#   jsonl - um objeto JSON por linha, com os metadados completos do host
+#   bin   - blocos colunares binários, lidos com read_binary
+FORMATS = ("csv", "jsonl", "bin")
+
+# Registros acumulados, ou segundos desde a última gravação, que disparam a
+# gravação do lote
+FLUSH_RECORDS = 256
+FLUSH_INTERVAL = 5.0
+
+# Identificação da execução (processo) que gerou os registros
+RUN_ID = uuid.uuid4().hex[:12]
+
+# Variável de ambiente com a identificação da varredura do benchmark, herdada
+# pelos servidores e clientes que ele executa
+SWEEP_ENV = "METRICAS_VARREDURA"
+
+# Colunas de identificação que precedem as colunas de cada registro
+META_COLUMNS = ["Execução", "Varredura", "Host", "Instante"]
+
+_host = None
+
+
+def host_metadata():
+    # Metadados do host, calculados uma vez por processo
+    global _host
+    if _host is None:
+        _host = {
+            "hostname": platform.node(),
+            "platform": platform.platform(),
+            "python": platform.python_version(),
+            "cpus": os.cpu_count(),
+        }
+    return _host
+
+
+class Record:
+    # Uma linha de métricas: colunas e valores, com o instante em que foi
+    # registrada
+    __slots__ = ("columns", "values", "sweep", "timestamp")
+
+    def __init__(self, columns, values):
+        # @columns - nomes das colunas
+        # @values - valores, na ordem das colunas (sem arredondamento)
+        self.columns = list(columns)
+        self.values = list(values)
+        self.sweep = os.environ.get(SWEEP_ENV, "")
+        self.timestamp = time.time()
+
+    def header(self):
+        return META_COLUMNS + self.columns
+
+    def row(self):
+        instant = datetime.fromtimestamp(self.timestamp, timezone.utc)
+        return [
+            RUN_ID,
+            self.sweep,
+            host_metadata()["hostname"],
+            instant.isoformat(timespec="microseconds"),
+        ] + self.values
+
+    def as_dict(self):
+        return dict(zip(self.header(), self.row()))
+
+
+# Colunas comuns das transferências recebidas pelos clientes TCP e UDP
+RECEPTION_COLUMNS = [
+    "Total de Bytes Recebidos",
+    "Tempo Decorrido (s)",
+    "Número de Pacotes",
+    "Taxa de Transferência (MB/s)",
+    "Tamanho Esperado (bytes)",
+    "Bytes Perdidos",
+    "Integridade dos Dados",
+    "Tamanho do Buffer (bytes)",
+    "Pacotes Esperados",
+    "Pacotes Fora de Ordem",
+    "Pacotes Duplicados",
+]
+
+
+class Row:
+    # Linha de métricas montada por seções de colunas. Os recursos opcionais
+    # (histograma, verificação, compressão...) contribuem com as suas colunas
+    # também quando inativos, com valores vazios, para que todas as linhas de
+    # um arquivo tenham as mesmas colunas.
+
+    def __init__(self, columns=(), values=()):
+        # @columns - nomes das colunas iniciais
+        # @values - valores, na ordem das colunas
+        self.columns = list(columns)
+        self.values = list(values)
+
+    def add(self, columns, values=None):
+        # Acrescenta uma seção de colunas
+        # @columns - nomes das colunas
+        # @values - valores, na ordem das colunas (None preenche com vazios)
+        self.columns += columns
+        self.values += [""] * len(columns) if values is None else values
+        return self
+
+    def section(self, columns, source, *args):
+        # Acrescenta as colunas de um recurso opcional: os valores de
+        # source.summary(*args), ou vazios se o recurso está inativo
+        # @columns - nomes das colunas (summary_header() do recurso)
+        # @source - estado do recurso, com summary() (None se inativo)
+        # @args - argumentos de summary()
+        return self.add(columns, None if source is None else source.summary(*args))
+
+    def value(self, column):
+        # Valor de uma coluna da linha
+        return self.values[self.columns.index(column)]
+
+
+def reception_row(
+    total_received,
+    elapsed_time,
+    packet_count,
+    throughput,
+    expected_size,
+    expected_packets,
+    buffer_size,
+    out_of_order=0,
+    duplicates=0,
+    verification=None,
+):
+    # Linha com as colunas comuns (RECEPTION_COLUMNS) de uma transferência
+    # recebida por um cliente. A integridade falha se faltaram bytes ou se a
+    # verificação do resumo não confere.
+    # @total_received - total de bytes recebidos durante a transferência
+    # @elapsed_time - tempo entre o primeiro e o último byte recebido
+    # @packet_count - número de pacotes recebidos
+    # @throughput - taxa de transferência em MB/s
+    # @expected_size - tamanho do arquivo anunciado pelo servidor
+    # @expected_packets - número de blocos anunciado pelo servidor
+    # @buffer_size - tamanho do buffer da transferência
+    # @out_of_order - pacotes que chegaram depois de um pacote posterior
+    # @duplicates - pacotes recebidos mais de uma vez
+    # @verification - resultado da verificação de integridade (None se não pedida)
+    bytes_lost = expected_size - total_received
+    status = "Aprovada" if bytes_lost == 0 else "Falhou"
+    if verification is not None and not verification.passed:
+        status = "Falhou"
+    return Row(
+        RECEPTION_COLUMNS,
+        [
+            total_received,
+            elapsed_time,
+            packet_count,
+            throughput,
+            expected_size,
+            bytes_lost,
+            status,
+            buffer_size,
+            expected_packets,
+            out_of_order,
+            duplicates,
+        ],
+    )
+
+
+def _append(path, records, encode, matches=None):
+    # Acrescenta um lote ao arquivo em uma única escrita com O_APPEND, sob uma
+    # trava exclusiva, para que processos trabalhadores gravando no mesmo
+    # arquivo não intercalem linhas nem repitam o cabeçalho. Se o arquivo
+    # existente tem outras colunas (de uma versão anterior), ele é renomeado
+    # e o lote começa um arquivo novo, em vez de desalinhar as colunas.
+    # @path - arquivo de destino
+    # @records - registros do lote
+    # @encode - função (registros, arquivo vazio) -> bytes do lote
+    # @matches - função (descritor, registros) -> o arquivo não vazio aceita
+    #            os registros (None: sempre aceita)
+    while True:
+        fd = os.open(path, os.O_RDWR | os.O_CREAT | os.O_APPEND, 0o644)
+        try:
+            if fcntl is not None:
+                fcntl.flock(fd, fcntl.LOCK_EX)
+            if not _is_current(fd, path):
+                continue  # Renomeado por outro processo enquanto aguardava
+            empty = os.fstat(fd).st_size == 0
+            if not empty and matches is not None and not matches(fd, records):
+                _rotate(path)
+                continue
+            view = memoryview(encode(records, empty))
+            while view:
+                view = view[os.write(fd, view) :]
+            return
+        finally:
+            os.close(fd)  # Libera também a trava
+
+
+def _is_current(fd, path):
+    # Verifica se o descritor aberto ainda é o arquivo em @path
+    try:
+        return os.path.samestat(os.fstat(fd), os.stat(path))
+    except FileNotFoundError:
+        return False
+
+
+def _rotate(path):
+    # Renomeia um arquivo de métricas com colunas diferentes das atuais para
+    # "<nome>.<instante><extensão>", preservando as linhas já gravadas
+    # @path - arquivo de métricas
+    root, extension = os.path.splitext(path)
+    stamp = datetime.now().strftime("%Y%m%d-%H%M%S")
+    target = f"{root}.{stamp}{extension}"
+    suffix = 1
+    while os.path.exists(target):
+        suffix += 1
+        target = f"{root}.{stamp}-{suffix}{extension}"
+    os.rename(path, target)
+    logging.getLogger("METRICAS").warning(
+        f"Colunas de '{path}' diferentes das atuais: arquivo renomeado para "
+        f"'{target}'."
+    )
+
+
+def _read_first_line(fd):
+    # Primeira linha do arquivo aberto, com a quebra de linha
+    # @fd - descritor aberto para leitura
+    line = b""
+    while b"\n" not in line:
+        if hasattr(os, "pread"):
+            chunk = os.pread(fd, 4096, len(line))
+        else:
+            os.lseek(fd, len(line), os.SEEK_SET)
+            chunk = os.read(fd, 4096)
+        if not chunk:
+            break
+        line += chunk
+    return line.partition(b"\n")[0] + b"\n"
+
+
+def _csv_header(records):
+    # Cabeçalho CSV do lote, como gravado por _encode_csv
+    buffer = io.StringIO()
+    csv.writer(buffer).writerow(records[0].header())
+    return buffer.getvalue().encode()
+
+
+def _csv_matches(fd, records):
+    # Verifica se o cabeçalho do arquivo CSV é o dos registros
+    return _read_first_line(fd) == _csv_header(records)
+
+
+def _encode_csv(records, empty):
+    buffer = io.StringIO()
+    writer = csv.writer(buffer)
+    if empty:
+        writer.writerow(records[0].header())
+    writer.writerows(record.row() for record in records)
+    return buffer.getvalue().encode()
+
+
+def _encode_jsonl(records, empty):
+    lines = []
+    for record in records:
+        item = record.as_dict()
+        item["host"] = host_metadata()
+        lines.append(json.dumps(item, ensure_ascii=False) + "\n")
+    return "".join(lines).encode()
+
+
+# Bloco do formato binário: assinatura e tamanho do descritor JSON, seguido
+# dos dados de cada coluna, na ordem do descritor. Colunas inteiras e reais
+# são arrays de 8 bytes; colunas de texto são um array de tamanhos ("I")
+# seguido dos textos em UTF-8, concatenados.
+MAGIC = b"MTRC"
+BLOCK = struct.Struct("!4sI")
+
+
+def _column_type(values):
+    # Tipo de uma coluna: "q" (inteiros), "d" (reais) ou "s" (texto)
+    if all(type(value) is int for value in values):
+        return "q"
+    if all(type(value) in (int, float) for value in values):
+        return "d"
+    return "s"
+
+
+def _encode_binary(records, empty):
+    header = records[0].header()
+    rows = [record.row() for record in records]
+    columns = list(zip(*rows))
+    types = []
+    chunks = []
+    for values in columns:
+        kind = _column_type(values)
+        types.append(kind)
+        if kind == "s":
+            encoded = [str(value).encode() for value in values]
+            chunks.append(array("I", map(len, encoded)).tobytes())
+            chunks.append(b"".join(encoded))
+        else:
+            chunks.append(array(kind, values).tobytes())
+    descriptor = json.dumps(
+        {
+            "columns": header,
+            "types": types,
+            "rows": len(rows),
+            "byteorder": sys.byteorder,
+            "host": host_metadata(),
+        },
+        ensure_ascii=False,
+    ).encode()
+    return BLOCK.pack(MAGIC, len(descriptor)) + descriptor + b"".join(chunks)
+
+
+def read_binary(path):
+    # Lê os registros de um arquivo no formato binário, como dicionários
+    # @path - arquivo gravado com o formato "bin"
+    with open(path, "rb") as file:
+        data = memoryview(file.read())
+    position = 0
+    while position < len(data):
+        magic, size = BLOCK.unpack_from(data, position)
+        if magic != MAGIC:
+            raise ValueError(f"bloco inválido na posição {position}")
+        position += BLOCK.size
+        descriptor = json.loads(bytes(data[position : position + size]))
+        position += size
+        rows = descriptor["rows"]
+        swap = descriptor["byteorder"] != sys.byteorder
+        columns = []
+        for kind in descriptor["types"]:
+            numbers = array("I" if kind == "s" else kind)
+            end = position + rows * numbers.itemsize
+            numbers.frombytes(data[position:end])
+            if swap:
+                numbers.byteswap()
+            position = end
+            if kind == "s":
+                values = []
+                for length in numbers:
+                    values.append(bytes(data[position : position + length]).decode())
+                    position += length
+                columns.append(values)
+            else:
+                columns.append(numbers.tolist())
+        for values in zip(*columns):
+            yield dict(zip(descriptor["columns"], values))
+
+
+# Extensão, codificação e conferência das colunas de cada formato (jsonl e
+# bin descrevem as colunas de cada registro ou bloco e aceitam qualquer uma)
+SINKS = {
+    "csv": (".csv", _encode_csv, _csv_matches),
+    "jsonl": (".jsonl", _encode_jsonl, None),
+    "bin": (".bin", _encode_binary, None),
+}
+
+
+class Metrics:
+    # Registros pendentes de gravação de um processo, por arquivo de métricas.
+    # Os lotes são gravados ao atingir FLUSH_RECORDS registros ou
+    # FLUSH_INTERVAL segundos, em flush() e ao encerrar o processo.
+
+    def __init__(self, formats=("csv",), directory="."):
+        # @formats - formatos gravados (FORMATS)
+        # @directory - diretório dos arquivos de métricas
+        self.formats = list(formats)
+        self.directory = directory
+        self.pending = {}  # nome do arquivo (sem extensão) -> [Record]
+        self.count = 0
+        self.last_flush = time.monotonic()
+        self.lock = threading.Lock()
+        atexit.register(self.flush)
+
+    def paths(self, name):
+        # Caminhos dos arquivos de métricas de @name, um por formato
+        # @name - nome do arquivo, sem extensão
+        return [
+            os.path.join(self.directory, name + SINKS[kind][0]) for kind in self.formats
+        ]
+
+    def add(self, name, columns, values):
+        # Registra uma linha de métricas
+        # @name - nome do arquivo de destino, sem extensão (ex.: "metricas_tcp")
+        # @columns - nomes das colunas
+        # @values - valores, na ordem das colunas
+        record = Record(columns, values)
+        with self.lock:
+            self.pending.setdefault(name, []).append(record)
+            self.count += 1
+            due = (
+                self.count >= FLUSH_RECORDS
+                or time.monotonic() - self.last_flush >= FLUSH_INTERVAL
+            )
+        if due:
+            self.flush()
+
+    def add_row(self, name, row):
+        # Registra uma linha montada por seções
+        # @name - nome do arquivo de destino, sem extensão
+        # @row - linha de métricas (Row)
+        self.add(name, row.columns, row.values)
+
+    def flush(self):
+        # Grava os registros pendentes em todos os formatos. Retorna os
+        # caminhos dos arquivos gravados.
+        with self.lock:
+            pending, self.pending = self.pending, {}
+            self.count = 0
+            self.last_flush = time.monotonic()
+        if pending and self.directory:
+            os.makedirs(self.directory, exist_ok=True)
+        written = []
+        for name, records in pending.items():
+            for kind, path in zip(self.formats, self.paths(name)):
+                _append(path, records, *SINKS[kind][1:])
+                written.append(path)
+        return written
@@ -0,0 +1,121 @@
+# Ritmo de envio do modo UDP sem confirmação:
+#   none  - envia o mais rápido possível (sem relatórios do cliente)
+#   fixed - balde de fichas com taxa fixa
+#   aimd  - taxa adaptativa: aumento aditivo a cada relatório sem perdas e
+#           redução multiplicativa quando o cliente relata perdas
+PACING_MODES = ("none", "fixed", "aimd")
+
+# Rajada máxima acumulada pelo balde, em segundos de envio à taxa atual
+BURST_TIME = 0.002
+
+# Blocos recebidos entre relatórios do cliente
+REPORT_EVERY = 64
+
+# Fator de redução da taxa adaptativa ao detectar perdas, e taxa mínima (bytes/s)
+BACKOFF = 0.7
+MIN_RATE = 1024 * 1024
+
+# Fração da taxa que o remetente precisa alcançar para a taxa adaptativa crescer
+APP_LIMITED = 0.8
+
+
+class Pacer:
+    # Balde de fichas: cada envio consome fichas (bytes) que se recompõem à
+    # taxa configurada, até o limite da rajada. O saldo pode ficar negativo,
+    # e o próximo envio espera até ele voltar a zero, o que mantém a taxa
+    # média mesmo com esperas imprecisas. Também acompanha os relatórios do
+    # cliente para medir a maior taxa sem perdas.
+
+    def __init__(self, rate):
+        # @rate - taxa de envio, em bytes por segundo
+        self.rate = rate
+        self.initial_rate = rate
+        self.tokens = 0.0
+        self.stamp = None  # Instante da última recomposição
+        self.max_clean_rate = 0.0  # Maior taxa de um intervalo sem perdas
+        self.reports = 0
+        self.lossy_reports = 0  # Relatórios que indicaram perdas
+        self.last_highest = 0
+        self.last_received = 0
+        self.poll_seq = 0  # Bloco a partir do qual o remetente lê os relatórios
+        self.sent = 0  # Bytes enviados
+        self.last_sent = 0
+        self.last_report = None  # Instante do relatório anterior
+        self.measured = 0.0  # Taxa de envio efetiva medida entre relatórios
+
+    def delay(self, now):
+        # Segundos de espera antes do próximo envio (0 se pode enviar agora)
+        # @now - instante atual (time.perf_counter)
+        if self.stamp is not None:
+            burst = self.rate * BURST_TIME
+            self.tokens = min(burst, self.tokens + (now - self.stamp) * self.rate)
+        self.stamp = now
+        return -self.tokens / self.rate if self.tokens < 0 else 0.0
+
+    def consume(self, size):
+        # Desconta @size bytes enviados do saldo do balde
+        self.tokens -= size
+        self.sent += size
+
+    def on_report(self, highest, received, next_seq, now):
+        # Processa um relatório do cliente. Retorna o número de blocos perdidos
+        # desde o relatório anterior. A taxa sem perdas registrada é a menor
+        # entre a configurada e a efetivamente alcançada pelo remetente.
+        # @highest - maior bloco recebido pelo cliente + 1
+        # @received - total de blocos recebidos pelo cliente
+        # @next_seq - próximo bloco a ser enviado
+        # @now - instante atual (time.perf_counter)
+        if highest < self.last_highest:
+            return 0  # Relatório atrasado, já superado por outro
+        lost = max(0, (highest - self.last_highest) - (received - self.last_received))
+        self.last_highest = highest
+        self.last_received = received
+        if self.last_report is not None and now > self.last_report:
+            # Média móvel, pois os relatórios chegam em intervalos irregulares
+            sample = (self.sent - self.last_sent) / (now - self.last_report)
+            self.measured += (sample - self.measured) / 8
+        self.last_sent = self.sent
+        self.last_report = now
+        self.reports += 1
+        if lost:
+            self.lossy_reports += 1
+        else:
+            clean_rate = min(self.rate, self.measured)
+            self.max_clean_rate = max(self.max_clean_rate, clean_rate)
+        return lost
+
+
+class AimdPacer(Pacer):
+    # Taxa adaptativa (AIMD) guiada pelos relatórios do cliente: soma @step a
+    # cada relatório sem perdas e multiplica por BACKOFF quando há perdas. Após
+    # uma redução, os relatórios de blocos enviados antes dela são ignorados,
+    # pois ainda refletem a taxa antiga. A taxa só cresce enquanto o remetente
+    # consegue acompanhá-la, para não se afastar do que de fato é enviado.
+
+    def __init__(self, rate, step):
+        # @rate - taxa inicial, em bytes por segundo
+        # @step - aumento aditivo por relatório sem perdas, em bytes por segundo
+        super().__init__(rate)
+        self.step = step
+        self.recover = 0  # Relatórios anteriores a este bloco não reduzem a taxa
+
+    def on_report(self, highest, received, next_seq, now):
+        lost = super().on_report(highest, received, next_seq, now)
+        if lost and highest > self.recover:
+            self.rate = max(MIN_RATE, self.rate * BACKOFF)
+            self.recover = next_seq
+        elif not lost and self.measured >= APP_LIMITED * self.rate:
+            self.rate += self.step
+        return lost
+
+
+def create_pacer(mode, rate, step):
+    # Cria o controlador de ritmo do modo pedido, ou None sem controle
+    # @mode - modo de ritmo (none, fixed ou aimd)
+    # @rate - taxa fixa ou inicial, em MB/s
+    # @step - aumento aditivo do modo aimd, em MB/s
+    if mode == "fixed":
+        return Pacer(rate * 1024 * 1024)
+    if mode == "aimd":
+        return AimdPacer(rate * 1024 * 1024, step * 1024 * 1024)
+    return None
@@ -0,0 +1,209 @@
+import multiprocessing
+import os
+import queue
+import signal
+import socket
+import sys
+import threading
+import time
+
+# Modo pré-fork: o processo principal cria um processo trabalhador por
+# núcleo, e cada um liga o seu próprio socket à mesma porta com SO_REUSEPORT.
+# O kernel distribui as conexões TCP (e, no UDP, os endereços de origem) entre
+# os sockets, de modo que cada trabalhador atende os seus clientes com o seu
+# próprio GIL. Ao encerrar, os trabalhadores devolvem as suas estatísticas ao
+# processo principal, que registra a taxa de cada um e a agregada.
+
+# Tempo máximo de espera pelas estatísticas de um trabalhador, em segundos
+STATS_TIMEOUT = 5
+
+
+def worker_count(processes):
+    # Número de trabalhadores: @processes, ou um por núcleo se for 0
+    return processes or os.cpu_count() or 1
+
+
+def reuse_port(sock):
+    # Permite que vários processos liguem sockets à mesma porta (antes do bind)
+    # @sock - socket do trabalhador
+    if not hasattr(socket, "SO_REUSEPORT"):
+        raise OSError("SO_REUSEPORT não é suportado neste sistema")
+    sock.setsockopt(socket.SOL_SOCKET, socket.SO_REUSEPORT, 1)
+
+
+class WorkerStats:
+    # Totais das transferências atendidas por um processo. Atualizados pelas
+    # threads de atendimento, por isso protegidos por uma trava.
+
+    def __init__(self):
+        self.worker = 0
+        self.pid = os.getpid()
+        self.transfers = 0
+        self.bytes = 0
+        self.busy_time = 0.0  # Soma das durações das transferências
+        self.first_start = None  # Início da primeira transferência (time.time)
+        self.last_end = None  # Fim da última transferência (time.time)
+        self.lock = threading.Lock()
+
+    def add(self, total_sent, elapsed_time):
+        # Contabiliza uma transferência que terminou agora
+        # @total_sent - bytes enviados
+        # @elapsed_time - duração da transferência, em segundos
+        end = time.time()
+        with self.lock:
+            self.transfers += 1
+            self.bytes += total_sent
+            self.busy_time += elapsed_time
+            start = end - elapsed_time
+            if self.first_start is None or start < self.first_start:
+                self.first_start = start
+            self.last_end = end
+
+    def snapshot(self):
+        # Cópia dos totais, serializável para enviar ao processo principal
+        with self.lock:
+            return {
+                "worker": self.worker,
+                "pid": self.pid,
+                "transfers": self.transfers,
+                "bytes": self.bytes,
+                "busy_time": self.busy_time,
+                "first_start": self.first_start,
+                "last_end": self.last_end,
+            }
+
+
+def _rate(total_bytes, elapsed):
+    # Taxa em MB/s (0 sem tempo decorrido)
+    return total_bytes / elapsed / (1024 * 1024) if elapsed else 0.0
+
+
+def exit_on_sigterm():
+    # Converte o SIGTERM em SystemExit, para que os blocos finally executem e
+    # as métricas pendentes sejam gravadas (os servidores são encerrados com
+    # terminate() pelo benchmark)
+    if threading.current_thread() is threading.main_thread():
+        signal.signal(signal.SIGTERM, lambda *_: sys.exit(0))
+
+
+def _worker(server, index, results):
+    # Corpo de um processo trabalhador: atende clientes até ser encerrado e
+    # devolve as estatísticas ao processo principal
+    # @server - servidor copiado do processo principal pelo fork
+    # @index - número do trabalhador
+    # @results - fila das estatísticas dos trabalhadores
+    exit_on_sigterm()
+    server.stats = WorkerStats()
+    server.stats.worker = index
+    server.logg = server.logg.getChild(f"trabalhador{index}")
+    try:
+        server.serve()
+    except KeyboardInterrupt:
+        pass
+    finally:
+        # O processo filho termina com os._exit, sem executar o atexit
+        server.metrics.flush()
+        results.put(server.stats.snapshot())
+
+
+def run(server, name):
+    # Executa o servidor em worker_count(server.processes) processos e, ao
+    # encerrar (Ctrl+C ou SIGTERM), registra as estatísticas de cada um
+    # @server - servidor com o método serve() e os atributos processes e metrics
+    # @name - arquivo de métricas das estatísticas por trabalhador (sem extensão)
+    count = worker_count(server.processes)
+    context = multiprocessing.get_context("fork")
+    results = context.Queue()
+    workers = [
+        context.Process(target=_worker, args=(server, index, results))
+        for index in range(count)
+    ]
+    server.logg.info(f"Iniciando {count} processos trabalhadores (SO_REUSEPORT).")
+    exit_on_sigterm()
+    try:
+        for process in workers:
+            process.start()
+        for process in workers:
+            process.join()
+    except (KeyboardInterrupt, SystemExit):
+        pass
+    finally:
+        for process in workers:
+            if process.is_alive():
+                process.terminate()
+        stats = []
+        for _ in workers:
+            try:
+                stats.append(results.get(timeout=STATS_TIMEOUT))
+            except queue.Empty:
+                break
+        for process in workers:
+            process.join()
+        _report(server, sorted(stats, key=lambda s: s["worker"]), name)
+
+
+def _report(server, stats, name):
+    # Loga e salva a taxa de cada trabalhador e a agregada. A taxa agregada é
+    # o total de bytes dividido pelo intervalo entre o início da primeira e o
+    # fim da última transferência, em qualquer trabalhador.
+    # @server - servidor, com o logger e o pipeline de métricas
+    # @stats - estatísticas devolvidas pelos trabalhadores
+    # @name - arquivo de métricas das estatísticas por trabalhador (sem extensão)
+    logg = server.logg
+    header = [
+        "Trabalhador",
+        "PID",
+        "Transferências",
+        "Total de Bytes Enviados",
+        "Tempo Ocupado (s)",
+        "Taxa Média (MB/s)",
+        "Intervalo Ativo (s)",
+        "Taxa no Intervalo (MB/s)",
+    ]
+    rows = []
+    for s in stats:
+        active = (s["last_end"] - s["first_start"]) if s["transfers"] else 0.0
+        rows.append(
+            [
+                s["worker"],
+                s["pid"],
+                s["transfers"],
+                s["bytes"],
+                s["busy_time"],
+                _rate(s["bytes"], s["busy_time"]),
+                active,
+                _rate(s["bytes"], active),
+            ]
+        )
+        logg.info(
+            f"Trabalhador {s['worker']} (PID {s['pid']}): {s['transfers']} "
+            f"transferências, {s['bytes']} bytes, "
+            f"{_rate(s['bytes'], active):.2f} MB/s no intervalo ativo."
+        )
+
+    busy = [s for s in stats if s["transfers"]]
+    total_bytes = sum(s["bytes"] for s in stats)
+    active = 0.0
+    if busy:
+        active = max(s["last_end"] for s in busy) - min(s["first_start"] for s in busy)
+    rows.append(
+        [
+            "total",
+            "",
+            sum(s["transfers"] for s in stats),
+            total_bytes,
+            sum(s["busy_time"] for s in stats),
+            "",
+            active,
+            _rate(total_bytes, active),
+        ]
+    )
+    logg.info(
+        f"Total de {len(stats)} trabalhadores: {total_bytes} bytes em "
+        f"{active:.2f} segundos. Taxa agregada: {_rate(total_bytes, active):.2f} MB/s"
+    )
+
+    for row in rows:
+        server.metrics.add(name, header, row)
+    for path in server.metrics.flush():
+        logg.info(f"Estatísticas dos trabalhadores salvas no arquivo '{path}'.")
@@ -0,0 +1,242 @@
+import cProfile
+import io
+import os
+import pstats
+import sys
+import threading
+import time
+from collections import Counter
+from contextlib import contextmanager
+
+try:
+    import resource
+except ImportError:  # Sem getrusage (ex.: Windows): só o total de CPU
+    resource = None
+
+# Perfil de execução e contabilidade de CPU das transferências. Cada
+# transferência registra o tempo de CPU de usuário e de sistema gasto durante
+# ela (getrusage) e o custo em segundos de CPU por GB transferido, o que
+# separa o tempo gasto no kernel (chamadas de sistema, cópias) do gasto no
+# interpretador. Com --profile, o processo é também perfilado: "cprofile"
+# mede cada chamada de função das transferências (com custo alto por chamada,
+# que infla o próprio tempo medido), e "sample" registra a pilha de todas as
+# threads a intervalos fixos, com custo baixo e sem alterar o laço, gravando
+# as pilhas no formato "collapsed" dos flame graphs.
+MODES = ("cprofile", "sample")
+
+# Intervalo entre as amostras do modo sample, em segundos
+SAMPLE_INTERVAL = 0.005
+
+# Funções listadas no log ao final do perfil
+TOP_FUNCTIONS = 15
+
+# Extensão do arquivo gravado por modo
+EXTENSIONS = {"cprofile": "prof", "sample": "txt"}
+
+GB = 1024 * 1024 * 1024
+
+
+def cpu_times(scope="process"):
+    # Segundos de CPU (usuário, sistema) consumidos até agora
+    # @scope - "process" (todas as threads) ou "thread" (a thread atual)
+    if resource is None:
+        total = time.thread_time() if scope == "thread" else time.process_time()
+        return total, 0.0
+    who = resource.RUSAGE_SELF
+    if scope == "thread" and hasattr(resource, "RUSAGE_THREAD"):
+        who = resource.RUSAGE_THREAD
+    usage = resource.getrusage(who)
+    return usage.ru_utime, usage.ru_stime
+
+
+def summary_header():
+    # Colunas de CPU acrescentadas ao CSV de métricas
+    return [
+        "Escopo da CPU",
+        "CPU de Usuário (s)",
+        "CPU de Sistema (s)",
+        "CPU por GB (s)",
+    ]
+
+
+def output_path(mode, name, directory=".", pid=False):
+    # Caminho padrão do arquivo do perfil
+    # @mode - modo do perfil (um de MODES)
+    # @name - identificação do script (ex.: "tcp", "servidor_udp")
+    # @directory - diretório das métricas
+    # @pid - acrescenta o PID, para os trabalhadores do modo pré-fork
+    suffix = f"_{os.getpid()}" if pid else ""
+    return os.path.join(directory, f"perfil_{name}{suffix}.{EXTENSIONS[mode]}")
+
+
+class CpuUsage:
+    # CPU gasta em uma transferência, do início (criação) até stop(). No
+    # escopo "thread", conta só a thread que atende a transferência; nos
+    # motores de laço de eventos, essa thread atende também as transferências
+    # simultâneas, cuja CPU é contada em todas elas.
+
+    def __init__(self, scope="process"):
+        # @scope - "process" (todas as threads) ou "thread" (a thread atual)
+        self.scope = scope
+        self.start = cpu_times(scope)
+        self.user = None
+        self.system = None
+
+    def stop(self):
+        # Fixa a CPU gasta até agora; chamadas seguintes não a alteram. Deve
+        # ser chamado na thread que criou a contagem, no escopo "thread".
+        if self.user is None:
+            user, system = cpu_times(self.scope)
+            self.user = user - self.start[0]
+            self.system = system - self.start[1]
+        return self
+
+    def per_gb(self, total_bytes):
+        # Segundos de CPU por GB transferido
+        # @total_bytes - bytes transferidos
+        self.stop()
+        if not total_bytes:
+            return 0.0
+        return (self.user + self.system) / (total_bytes / GB)
+
+    def summary(self, total_bytes):
+        # Valores das colunas de summary_header
+        # @total_bytes - bytes transferidos
+        per_gb = self.per_gb(total_bytes)
+        return [self.scope, self.user, self.system, per_gb]
+
+    def describe(self, total_bytes):
+        # Descrição para o log
+        # @total_bytes - bytes transferidos
+        per_gb = self.per_gb(total_bytes)
+        return (
+            f"CPU de usuário {self.user:.3f} s, de sistema {self.system:.3f} s "
+            f"({per_gb:.2f} s por GB)"
+        )
+
+
+class Profiler:
+    # Perfil de um processo, gravado em arquivo ao final
+
+    def __init__(self, mode, path):
+        # @mode - modo do perfil (um de MODES)
+        # @path - arquivo onde o perfil é gravado
+        self.mode = mode
+        self.path = path
+        self.profile = cProfile.Profile() if mode == "cprofile" else None
+        self.lock = threading.Lock()  # Um só trecho perfilado por vez
+        self.profiled = 0  # Trechos perfilados (modo cprofile)
+        self.skipped = 0  # Trechos simultâneos a outro, não perfilados
+        self.stacks = Counter()  # Pilha "collapsed" -> amostras (modo sample)
+        self.samples = 0
+        self.stopped = threading.Event()
+        self.thread = None
+
+    def start(self):
+        # Inicia a thread de amostragem, no modo sample
+        if self.mode != "sample":
+            return
+        self.stopped.clear()
+        self.thread = threading.Thread(target=self._run, name="perfil", daemon=True)
+        self.thread.start()
+
+    @contextmanager
+    def section(self):
+        # Perfila o bloco no modo cprofile. O cProfile só mede a thread em que
+        # foi ativado, e só uma ativação por vez: trechos simultâneos em outras
+        # threads não são perfilados (use o modo sample). No modo sample, todas
+        # as threads já são amostradas, e o bloco não faz nada.
+        if self.profile is None or not self.lock.acquire(blocking=False):
+            if self.profile is not None:
+                self.skipped += 1
+            yield
+            return
+        self.profiled += 1
+        try:
+            self.profile.enable()
+            try:
+                yield
+            finally:
+                self.profile.disable()
+        finally:
+            self.lock.release()
+
+    def _run(self):
+        # Registra a pilha de cada thread (exceto a própria) a cada intervalo
+        own = threading.get_ident()
+        while not self.stopped.wait(SAMPLE_INTERVAL):
+            names = {thread.ident: thread.name for thread in threading.enumerate()}
+            for ident, frame in sys._current_frames().items():
+                if ident == own:
+                    continue
+                stack = []
+                while frame is not None:
+                    code = frame.f_code
+                    stack.append(
+                        f"{code.co_name} ({os.path.basename(code.co_filename)}"
+                        f":{code.co_firstlineno})"
+                    )
+                    frame = frame.f_back
+                stack.append(names.get(ident, str(ident)))
+                self.stacks[";".join(reversed(stack))] += 1
+            self.samples += 1
+
+    def stop(self):
+        # Encerra o perfil e o grava em self.path
+        if self.thread is not None:
+            self.stopped.set()
+            self.thread.join()
+            self.thread = None
+        os.makedirs(os.path.dirname(self.path) or ".", exist_ok=True)
+        if self.profile is not None:
+            self.profile.dump_stats(self.path)
+            return
+        with open(self.path, "w") as file:
+            for stack, count in self.stacks.most_common():
+                file.write(f"{stack} {count}\n")
+
+    def report(self, limit=TOP_FUNCTIONS):
+        # Texto com as funções mais custosas, para o log: tempo próprio de
+        # cada função (cprofile) ou fração das amostras em que a função estava
+        # no topo da pilha (sample)
+        # @limit - número de funções listadas
+        if self.profile is not None:
+            stream = io.StringIO()
+            stats = pstats.Stats(self.profile, stream=stream)
+            stats.sort_stats(pstats.SortKey.TIME).print_stats(limit)
+            return (
+                f"{self.profiled} trechos perfilados, {self.skipped} simultâneos "
+                f"ignorados.\n{stream.getvalue().strip()}"
+            )
+        leaves = Counter()
+        for stack, count in self.stacks.items():
+            leaves[stack.rsplit(";", 1)[-1]] += count
+        total = sum(leaves.values()) or 1
+        lines = [f"{self.samples} amostras de todas as threads."]
+        lines += [
+            f"{100 * count / total:6.2f}%  {function}"
+            for function, count in leaves.most_common(limit)
+        ]
+        return "\n".join(lines)
+
+
+def create_profiler(mode, path):
+    # Cria e inicia o perfil, ou retorna None se desabilitado
+    # @mode - modo do perfil (um de MODES; None desabilita)
+    # @path - arquivo onde o perfil é gravado
+    if mode is None:
+        return None
+    profiler = Profiler(mode, path)
+    profiler.start()
+    return profiler
+
+
+@contextmanager
+def profiled(profiler):
+    # Perfila o bloco, se houver perfil (ver Profiler.section)
+    # @profiler - perfil do processo (None se desabilitado)
+    if profiler is None:
+        yield
+        return
+    with profiler.section():
+        yield
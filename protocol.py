@@ -0,0 +1,56 @@
+def format_request(file_name, buffer_size, **options):
+    # Monta a requisição enviada pelo cliente: "arquivo,buffer[,chave=valor...]"
+    # @file_name - nome do arquivo a ser solicitado ao servidor
+    # @buffer_size - tamanho do buffer utilizado na transferência
+    # @options - opções adicionais da transferência (ignoradas se None)
+    fields = [file_name, str(buffer_size)]
+    fields += [f"{key}={value}" for key, value in options.items() if value is not None]
+    return ",".join(fields).encode()
+
+
+def parse_request(data):
+    # Interpreta a requisição do cliente, devolvendo (arquivo, buffer, opções).
+    # Clientes antigos enviam apenas "arquivo,buffer" e recebem opções vazias.
+    # @data - bytes recebidos do cliente
+    file_info = data.decode().split(",")
+    file_name, buffer_size = file_info[0], int(file_info[1])
+    options = dict(field.split("=", 1) for field in file_info[2:] if "=" in field)
+    return file_name, buffer_size, options
+
+
+def format_reply(**fields):
+    # Monta a resposta de prontidão do servidor: "READY[,chave=valor...]\n".
+    # A quebra de linha delimita a resposta quando os dados seguem no mesmo fluxo.
+    # @fields - informações anunciadas ao cliente (ex.: size, chunks)
+    items = ["READY"] + [f"{key}={value}" for key, value in fields.items()]
+    return (",".join(items) + "\n").encode()
+
+
+def parse_reply(data):
+    # Interpreta a resposta do servidor, devolvendo o dicionário de campos
+    # anunciados, ou None se o servidor não está pronto (ex.: "ERROR: ...")
+    # @data - resposta recebida, sem os dados que a seguem
+    fields = data.decode(errors="replace").strip().split(",")
+    if fields[0] != "READY":
+        return None
+    return dict(field.split("=", 1) for field in fields[1:] if "=" in field)
+
+
+def chunk_count(size, buffer_size):
+    # Número de blocos de @buffer_size bytes necessários para enviar @size bytes
+    return -(-size // buffer_size)
+
+
+def read_reply(sock):
+    # Lê a resposta do servidor em um fluxo TCP até a quebra de linha.
+    # Retorna (resposta, bytes excedentes), pois os primeiros dados do arquivo
+    # podem chegar no mesmo recv que a resposta.
+    # @sock - socket conectado ao servidor
+    data = b""
+    while b"\n" not in data:
+        chunk = sock.recv(1024)
+        if not chunk:
+            break
+        data += chunk
+    reply, _, pending = data.partition(b"\n")
+    return reply, pending
@@ -0,0 +1,304 @@
+import socket
+import struct
+
+# Cabeçalho de cada datagrama do modo confiável: tipo (1 byte) e número de sequência
+HEADER = struct.Struct("!BI")
+
+# Tipos de datagrama
+DATA = 1  # Bloco do arquivo; seq = índice do bloco
+ACK = 2  # Confirmação; seq = próximo bloco esperado, seguido dos intervalos SACK
+FIN = 3  # Fim da transferência; seq = número total de blocos
+FIN_ACK = 4  # Confirmação do fim da transferência
+REPORT = 5  # Relatório do cliente no modo sem confirmação; seq = maior bloco + 1
+ECHO = 6  # Mensagem do modo de requisição/resposta, devolvida pelo servidor
+
+# CRC32 dos dados, logo após o cabeçalho dos datagramas DATA quando o cliente
+# pede verificação de integridade (integrity.py)
+CHECKSUM = struct.Struct("!I")
+CHECKED_HEADER_SIZE = HEADER.size + CHECKSUM.size
+
+# Corpo do relatório: total de blocos recebidos pelo cliente
+REPORT_BODY = struct.Struct("!I")
+
+# Confirmação seletiva: intervalo [início, fim) de blocos recebidos além do
+# próximo bloco esperado. Cada ACK leva no máximo MAX_SACK_RANGES intervalos.
+SACK = struct.Struct("!II")
+MAX_SACK_RANGES = 64
+
+# Limites do tempo de retransmissão (RTO), em segundos
+MIN_RTO = 0.02
+MAX_RTO = 1.0
+INITIAL_RTO = 0.2
+
+# Atraso máximo de um ACK quando não chegam dados, e silêncio que encerra a
+# transferência por falha, em segundos
+ACK_DELAY = 0.01
+IDLE_TIMEOUT = 2.0
+
+# Quantos envios posteriores precisam ser confirmados antes de um bloco ser
+# considerado perdido, para tolerar pequenas reordenações na rede
+REORDER_THRESHOLD = 3
+
+# Tentativas de envio do FIN antes de desistir da confirmação do cliente
+FIN_RETRIES = 5
+
+
+def pack(kind, seq, payload=b""):
+    # Monta um datagrama com cabeçalho
+    # @kind - tipo do datagrama (DATA, ACK, FIN ou FIN_ACK)
+    # @seq - número de sequência
+    # @payload - conteúdo após o cabeçalho
+    return HEADER.pack(kind, seq) + payload
+
+
+def receive_window(sock, payload_size):
+    # Calcula quantos datagramas cabem com folga no buffer de recepção do
+    # socket. O kernel contabiliza cada datagrama com bem mais que o seu
+    # tamanho (estruturas internas, ~1 KB fixo mais alocação em potência de
+    # 2), por isso a estimativa conservadora de 2 * (tamanho + 1 KB).
+    # @sock - socket do receptor
+    # @payload_size - tamanho dos dados de cada datagrama (sem cabeçalho)
+    rcvbuf = sock.getsockopt(socket.SOL_SOCKET, socket.SO_RCVBUF)
+    return max(1, rcvbuf // (2 * (HEADER.size + payload_size + 1024)))
+
+
+def parse_report(packet):
+    # Retorna (maior bloco recebido + 1, total de blocos recebidos) de um relatório
+    # @packet - datagrama REPORT recebido
+    _, highest = HEADER.unpack_from(packet)
+    (received,) = REPORT_BODY.unpack_from(packet, HEADER.size)
+    return highest, received
+
+
+def is_kind(packet, kind):
+    # Verifica se @packet é um datagrama completo do tipo @kind
+    # @packet - datagrama recebido
+    # @kind - tipo esperado
+    return len(packet) >= HEADER.size and packet[0] == kind
+
+
+class ReliableSender:
+    # Janela deslizante do remetente: controla os blocos em trânsito, processa
+    # ACKs seletivos e decide o que retransmitir. Um bloco é dado como perdido
+    # (NACK) quando blocos enviados depois dele são confirmados; se os ACKs
+    # param de chegar, o bloco mais antigo é reenviado ao expirar o RTO.
+
+    def __init__(self, chunks, window, crcs=None):
+        # @chunks - iterável com os blocos do arquivo, em ordem
+        # @window - número máximo de blocos enviados e ainda não confirmados
+        # @crcs - CRC32 de cada bloco, enviado após o cabeçalho (None não envia)
+        self.chunks = iter(chunks)
+        self.window = window
+        self.crcs = crcs
+        self.base = 0  # Primeiro bloco ainda não confirmado
+        self.next_seq = 0  # Próximo bloco novo a ser enviado
+        self.exhausted = False  # Todos os blocos já foram lidos
+        # seq -> [datagrama, instante do último envio, retransmitido, ordem de envio]
+        self.inflight = {}
+        self.send_order = 0  # Contador de envios (novos e retransmissões)
+        self.delivered_order = -1  # Maior ordem de envio já confirmada
+        self.srtt = None
+        self.rttvar = 0.0
+        self.rto = INITIAL_RTO
+        self.packets_sent = 0
+        self.bytes_sent = 0  # Bytes de dados, sem cabeçalho
+        self.retransmissions = 0
+
+    @property
+    def done(self):
+        # Verdadeiro quando todos os blocos foram enviados e confirmados
+        return self.exhausted and not self.inflight
+
+    @property
+    def can_send(self):
+        # Verdadeiro se há blocos novos a enviar e espaço na janela
+        return not self.exhausted and self.next_seq - self.base < self.window
+
+    def poll(self, now, limit=None):
+        # Retorna os datagramas que devem ser enviados agora: o bloco mais
+        # antigo, se o seu RTO expirou, e blocos novos que cabem na janela
+        # @now - instante atual (time.perf_counter)
+        # @limit - número máximo de blocos novos (None limita só pela janela)
+        packets = []
+        if self.inflight:
+            oldest = min(self.inflight.values(), key=lambda entry: entry[1])
+            if now - oldest[1] >= self.rto:
+                self.rto = min(MAX_RTO, self.rto * 2)  # Recuo exponencial
+                packets.append(self._retransmit(oldest, now))
+
+        room = self.window - (self.next_seq - self.base) if not self.exhausted else 0
+        if limit is not None:
+            room = min(room, limit)
+        for _ in range(room):
+            chunk = next(self.chunks, None)
+            if not chunk:
+                self.exhausted = True
+                break
+            if self.crcs is not None:
+                chunk_crc = CHECKSUM.pack(self.crcs[self.next_seq])
+                packet = pack(DATA, self.next_seq, chunk_crc + chunk)
+            else:
+                packet = pack(DATA, self.next_seq, chunk)
+            self.inflight[self.next_seq] = [packet, now, False, self.send_order]
+            self.send_order += 1
+            self.next_seq += 1
+            self.packets_sent += 1
+            self.bytes_sent += len(chunk)
+            packets.append(packet)
+        return packets
+
+    def on_ack(self, packet, now):
+        # Processa um ACK seletivo e retorna os blocos a retransmitir: os que
+        # continuam sem confirmação embora blocos enviados mais de
+        # REORDER_THRESHOLD envios depois deles já tenham sido confirmados
+        # (NACK implícito)
+        # @packet - datagrama ACK recebido
+        # @now - instante atual (time.perf_counter)
+        _, cumulative = HEADER.unpack_from(packet)
+
+        acked = [seq for seq in self.inflight if seq < cumulative]
+        for start, end in SACK.iter_unpack(packet[HEADER.size :]):
+            acked += [seq for seq in range(start, end) if seq in self.inflight]
+
+        for seq in acked:
+            entry = self.inflight.pop(seq)
+            self.delivered_order = max(self.delivered_order, entry[3])
+            if not entry[2]:
+                self._update_rtt(now - entry[1])  # Algoritmo de Karn
+        if cumulative > self.base:
+            self.base = cumulative
+
+        return [
+            self._retransmit(entry, now)
+            for entry in self.inflight.values()
+            if entry[3] < self.delivered_order - REORDER_THRESHOLD
+        ]
+
+    def wait_time(self, now):
+        # Tempo até a próxima expiração de RTO (0 se há algo a enviar agora)
+        # @now - instante atual (time.perf_counter)
+        if self.can_send:
+            return 0.0
+        if not self.inflight:
+            return self.rto
+        oldest = min(entry[1] for entry in self.inflight.values())
+        return max(0.0, oldest + self.rto - now)
+
+    def _retransmit(self, entry, now):
+        # Marca um bloco em trânsito como retransmitido e retorna seu datagrama
+        # @entry - registro do bloco em self.inflight
+        # @now - instante atual (time.perf_counter)
+        entry[1] = now
+        entry[2] = True
+        entry[3] = self.send_order
+        self.send_order += 1
+        self.retransmissions += 1
+        return entry[0]
+
+    def _update_rtt(self, sample):
+        # Atualiza a estimativa de RTT e o RTO (RFC 6298)
+        # @sample - RTT medido em segundos
+        if self.srtt is None:
+            self.srtt = sample
+            self.rttvar = sample / 2
+        else:
+            self.rttvar = 0.75 * self.rttvar + 0.25 * abs(self.srtt - sample)
+            self.srtt = 0.875 * self.srtt + 0.125 * sample
+        self.rto = min(MAX_RTO, max(MIN_RTO, self.srtt + 4 * self.rttvar))
+
+
+class SequenceTracker:
+    # Contabiliza os blocos recebidos no modo sem confirmação: quantos
+    # faltam, duplicados e fora de ordem (chegaram depois de um bloco
+    # posterior). Usa um byte por bloco, pois as perdas não são recuperadas.
+
+    def __init__(self, total_chunks):
+        # @total_chunks - número de blocos anunciado pelo servidor
+        self.seen = bytearray(total_chunks)
+        self.missing = total_chunks
+        self.highest = -1
+        self.duplicates = 0
+        self.out_of_order = 0
+
+    def on_data(self, seq):
+        # Registra a chegada de um bloco. Retorna True se o bloco é novo.
+        # @seq - número de sequência do bloco
+        if seq >= len(self.seen):
+            return False
+        if self.seen[seq]:
+            self.duplicates += 1
+            return False
+        self.seen[seq] = 1
+        self.missing -= 1
+        if seq < self.highest:
+            self.out_of_order += 1
+        else:
+            self.highest = seq
+        return True
+
+    def report_packet(self):
+        # Monta o relatório de recepção usado pelo servidor para ajustar o ritmo
+        received = len(self.seen) - self.missing
+        return pack(REPORT, self.highest + 1, REPORT_BODY.pack(received))
+
+
+class ReliableReceiver:
+    # Estado do receptor: blocos já recebidos, contagem de duplicados e
+    # fora de ordem, e montagem dos ACKs seletivos
+
+    def __init__(self, ack_every):
+        # @ack_every - número de blocos novos recebidos entre ACKs
+        self.ack_every = ack_every
+        self.cumulative = 0  # Próximo bloco esperado em ordem
+        self.ahead = set()  # Blocos recebidos além de cumulative
+        self.highest = -1  # Maior bloco recebido
+        self.unacked = 0  # Blocos novos desde o último ACK
+        self.duplicates = 0
+        self.out_of_order = 0
+
+    def on_data(self, seq):
+        # Registra a chegada de um bloco. Retorna True se o bloco é novo.
+        # @seq - número de sequência do bloco
+        if seq < self.cumulative or seq in self.ahead:
+            self.duplicates += 1
+            self.unacked = self.ack_every  # Força um ACK: o remetente retransmitiu
+            return False
+
+        if seq < self.highest:
+            self.out_of_order += 1
+        else:
+            self.highest = seq
+
+        if seq == self.cumulative:
+            self.cumulative += 1
+            while self.cumulative in self.ahead:
+                self.ahead.remove(self.cumulative)
+                self.cumulative += 1
+        else:
+            self.ahead.add(seq)
+            self.unacked = self.ack_every  # Lacuna detectada: informa logo (NACK)
+        self.unacked += 1
+        return True
+
+    def should_ack(self):
+        # Verdadeiro quando já se acumularam blocos suficientes para um ACK
+        return self.unacked >= self.ack_every
+
+    def ack_packet(self):
+        # Monta o ACK com o bloco esperado e os intervalos de blocos recebidos
+        # além dele. Se houver intervalos demais, o último (mais recente) é
+        # mantido, pois é ele que revela ao remetente as perdas anteriores.
+        ranges = []
+        for seq in sorted(self.ahead):
+            if ranges and ranges[-1][1] == seq:
+                ranges[-1][1] = seq + 1
+            else:
+                ranges.append([seq, seq + 1])
+        if len(ranges) > MAX_SACK_RANGES:
+            ranges = ranges[: MAX_SACK_RANGES - 1] + ranges[-1:]
+        self.unacked = 0
+        return pack(ACK, self.cumulative, b"".join(SACK.pack(*rng) for rng in ranges))
+
+    def complete(self, total_chunks):
+        # Verdadeiro se todos os @total_chunks blocos foram recebidos
+        return self.cumulative >= total_chunks
@@ -0,0 +1,168 @@
+import sys
+import threading
+import time
+from contextlib import contextmanager
+
+# Amostragem da taxa durante as transferências. O laço de cada transferência
+# apenas soma os bytes e pacotes em um contador (Counter); uma thread à parte
+# lê os contadores a cada intervalo e registra a série temporal (bytes,
+# pacotes e taxa por intervalo), o que mostra o slow start do TCP, o início
+# das perdas por estouro de buffer no UDP e as paradas no meio da transferência.
+# Opcionalmente, a taxa de cada intervalo é exibida ao vivo no terminal.
+
+# Intervalo de amostragem quando não informado, em milissegundos
+DEFAULT_INTERVAL_MS = 100
+
+# Colunas de cada amostra, após as colunas de identificação do chamador
+HEADER = [
+    "Tempo (s)",
+    "Intervalo (s)",
+    "Bytes no Intervalo",
+    "Pacotes no Intervalo",
+    "Taxa no Intervalo (MB/s)",
+    "Pacotes por Segundo",
+    "Total de Bytes",
+    "Total de Pacotes",
+    "Transferências Ativas",
+]
+
+
+class Counter:
+    # Totais de uma transferência. Só a thread da transferência os incrementa;
+    # a thread do amostrador apenas os lê, por isso não há trava.
+    __slots__ = ("bytes", "packets")
+
+    def __init__(self):
+        self.bytes = 0
+        self.packets = 0
+
+    def add(self, size):
+        # Contabiliza um pacote
+        # @size - bytes do pacote
+        self.bytes += size
+        self.packets += 1
+
+
+class Sampler:
+    # Série temporal da taxa de um processo, somando todas as transferências
+    # em andamento. Intervalos sem bytes e sem transferências ativas (servidor
+    # ocioso) não são registrados.
+
+    def __init__(self, metrics, name, interval, labels=None, live=False):
+        # @metrics - pipeline de métricas onde as amostras são registradas
+        # @name - arquivo das amostras, sem extensão
+        # @interval - intervalo de amostragem, em segundos
+        # @labels - colunas de identificação acrescentadas a cada amostra
+        # @live - exibe a taxa de cada intervalo no terminal (stderr)
+        self.metrics = metrics
+        self.name = name
+        self.interval = interval
+        self.labels = dict(labels or {})
+        self.live = live
+        self.counters = []  # Contadores das transferências em andamento
+        self.done_bytes = 0  # Totais das transferências já encerradas
+        self.done_packets = 0
+        self.lock = threading.Lock()
+        self.stopped = threading.Event()
+        self.thread = None
+        self.start_time = None
+        self.last = None  # (instante, bytes, pacotes) da última amostra
+
+    def track(self):
+        # Cria o contador de uma transferência que começa agora
+        counter = Counter()
+        with self.lock:
+            self.counters.append(counter)
+        return counter
+
+    def release(self, counter):
+        # Incorpora aos totais o contador de uma transferência encerrada
+        # @counter - contador devolvido por track()
+        with self.lock:
+            self.counters.remove(counter)
+            self.done_bytes += counter.bytes
+            self.done_packets += counter.packets
+
+    def start(self):
+        # Inicia a thread de amostragem
+        self.start_time = time.perf_counter()
+        self.last = (self.start_time, 0, 0)
+        self.stopped.clear()
+        self.thread = threading.Thread(
+            target=self._run, name="amostrador", daemon=True
+        )
+        self.thread.start()
+
+    def stop(self):
+        # Encerra a thread e registra o último intervalo, possivelmente parcial
+        if self.thread is None:
+            return
+        self.stopped.set()
+        self.thread.join()
+        self.thread = None
+        self._sample(time.perf_counter())
+        if self.live:
+            sys.stderr.write("\n")
+
+    def _run(self):
+        # Amostra nos múltiplos do intervalo a partir do início, sem acumular
+        # atraso; intervalos perdidos (thread atrasada pelo GIL) são pulados
+        while True:
+            elapsed = time.perf_counter() - self.start_time
+            deadline = (int(elapsed / self.interval) + 1) * self.interval
+            if self.stopped.wait(deadline - elapsed):
+                return
+            self._sample(time.perf_counter())
+
+    def _sample(self, now):
+        # Registra o intervalo desde a última amostra
+        # @now - instante da amostra (time.perf_counter)
+        with self.lock:
+            active = len(self.counters)
+            total_bytes = self.done_bytes + sum(c.bytes for c in self.counters)
+            total_packets = self.done_packets + sum(c.packets for c in self.counters)
+        previous, previous_bytes, previous_packets = self.last
+        self.last = (now, total_bytes, total_packets)
+        interval = now - previous
+        size = total_bytes - previous_bytes
+        packets = total_packets - previous_packets
+        if not (size or packets or active) or interval <= 0:
+            return
+
+        rate = size / interval / (1024 * 1024)  # MB/s
+        row = [
+            now - self.start_time,
+            interval,
+            size,
+            packets,
+            rate,
+            packets / interval,
+            total_bytes,
+            total_packets,
+            active,
+        ]
+        self.metrics.add(
+            self.name, list(self.labels) + HEADER, list(self.labels.values()) + row
+        )
+        if self.live:
+            sys.stderr.write(
+                f"\r{now - self.start_time:8.1f} s {rate:10.2f} MB/s "
+                f"{packets / interval:10.0f} pacotes/s {total_bytes / 1e6:10.1f} MB "
+                f"({active} ativas)"
+            )
+            sys.stderr.flush()
+
+
+@contextmanager
+def tracking(sampler):
+    # Mantém o contador de uma transferência enquanto durar o bloco. Produz a
+    # função que contabiliza cada pacote, ou None sem amostragem.
+    # @sampler - amostrador do processo (None se desabilitado)
+    if sampler is None:
+        yield None
+        return
+    counter = sampler.track()
+    try:
+        yield counter.add
+    finally:
+        sampler.release(counter)
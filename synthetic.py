@@ -0,0 +1,193 @@
+import hashlib
+import os
+import time
+
+# Arquivos sintéticos: o nome "gen:<tamanho>" (ex.: "gen:2G", "gen:100M" ou
+# "gen:4096") pede ao servidor um arquivo virtual do tamanho indicado, que não
+# existe em disco. O conteúdo é um padrão determinístico, gerado uma vez por
+# processo e repetido até o tamanho pedido: o servidor envia fatias do padrão
+# sem ler o disco, e o cliente pode conferir cada bloco contra o mesmo padrão
+# sem gravar a saída. Assim a velocidade do disco não entra na medição e os
+# arquivos de teste não ocupam espaço.
+PREFIX = "gen:"
+
+# Multiplicadores dos sufixos aceitos no tamanho (como no --sizes do benchmark)
+UNITS = {"k": 1024, "m": 1024**2, "g": 1024**3}
+
+# Período do padrão. É primo, para que blocos de tamanho potência de 2 em
+# posições diferentes tenham conteúdos diferentes: um bloco entregue na
+# posição errada não passa na conferência.
+PERIOD = 1048573
+
+# Semente do padrão, a mesma no servidor e no cliente
+SEED = b"tcp-udp-benchmark"
+
+# Nome da conferência nas colunas de integridade das métricas
+ALGORITHM = "padrão"
+
+_pattern = None
+
+
+def pattern():
+    # Padrão repetido duas vezes, para que a fatia de até PERIOD bytes a
+    # partir de qualquer posição do período seja contígua
+    global _pattern
+    if _pattern is None:
+        block = hashlib.shake_128(SEED).digest(PERIOD)
+        _pattern = block + block
+    return _pattern
+
+
+def is_synthetic(name):
+    # Verdadeiro se @name pede um arquivo sintético
+    return name.startswith(PREFIX)
+
+
+def parse(name):
+    # Tamanho em bytes do arquivo sintético @name (ex.: "gen:2G")
+    label = name[len(PREFIX) :]
+    unit = UNITS.get(label[-1:].lower())
+    try:
+        size = int(label[:-1]) * unit if unit else int(label)
+    except ValueError:
+        raise ValueError(f"tamanho inválido no arquivo sintético '{name}'") from None
+    if size < 0:
+        raise ValueError(f"tamanho inválido no arquivo sintético '{name}'")
+    return size
+
+
+def exists(path):
+    # Como os.path.isfile, aceitando também arquivos sintéticos
+    if is_synthetic(path):
+        parse(path)
+        return True
+    return os.path.isfile(path)
+
+
+def getsize(path):
+    # Como os.path.getsize, aceitando também arquivos sintéticos
+    if is_synthetic(path):
+        return parse(path)
+    return os.path.getsize(path)
+
+
+def stat_key(path):
+    # (tamanho, data de modificação) que identificam uma versão do arquivo,
+    # para as chaves de cache; arquivos sintéticos nunca mudam
+    if is_synthetic(path):
+        return parse(path), 0
+    stat = os.stat(path)
+    return stat.st_size, stat.st_mtime_ns
+
+
+def open_source(path):
+    # Abre @path para leitura: um SyntheticFile ou o arquivo em disco
+    if is_synthetic(path):
+        return SyntheticFile(parse(path))
+    return open(path, "rb")
+
+
+def expected(offset, length):
+    # Conteúdo (bytes) dos @length bytes do arquivo sintético a partir de
+    # @offset
+    data = pattern()
+    start = offset % PERIOD
+    if length <= PERIOD:
+        return data[start : start + length]
+    parts = [data[start:PERIOD]]
+    remaining = length - len(parts[0])
+    while remaining:
+        parts.append(data[: min(remaining, PERIOD)])
+        remaining -= len(parts[-1])
+    return b"".join(parts)
+
+
+class SyntheticFile:
+    # Arquivo virtual com a interface de arquivo (read, readinto, seek, tell,
+    # close), como o MappedFile do cache. read() devolve fatias memoryview do
+    # padrão, sem cópia, e readinto() copia a fatia para o buffer.
+
+    def __init__(self, size):
+        # @size - tamanho do arquivo, em bytes
+        self.size = size
+        self.view = memoryview(pattern())
+        self.pos = 0
+
+    def read(self, size=-1):
+        # Retorna os próximos @size bytes (vazio no fim do arquivo)
+        end = self.size if size < 0 else min(self.size, self.pos + size)
+        length = max(end - self.pos, 0)
+        start = self.pos % PERIOD
+        if length <= PERIOD:
+            chunk = self.view[start : start + length]
+        else:
+            chunk = expected(self.pos, length)
+        self.pos += length
+        return chunk
+
+    def readinto(self, buffer):
+        # Copia os próximos bytes para @buffer e retorna quantos foram copiados
+        chunk = self.read(len(buffer))
+        buffer[: len(chunk)] = chunk
+        return len(chunk)
+
+    def seek(self, pos):
+        self.pos = pos
+
+    def tell(self):
+        return self.pos
+
+    def close(self):
+        pass
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+
+class PatternVerifier:
+    # Conferência dos dados recebidos de um arquivo sintético contra o padrão,
+    # sem guardá-los. O tempo gasto é acumulado à parte, para ser descontado
+    # da taxa de transferência.
+
+    def __init__(self, offset=0, block_size=0, header_size=0):
+        # @offset - posição do primeiro byte recebido (faixa de um fluxo TCP)
+        # @block_size - tamanho dos dados de cada datagrama (UDP)
+        # @header_size - tamanho do cabeçalho de cada datagrama (UDP)
+        self.position = offset  # Próximo byte esperado, em um fluxo contínuo
+        self.block_size = block_size
+        self.header_size = header_size
+        self.matched = 0  # Bytes que conferem com o padrão
+        self.mismatches = []  # Posições dos blocos divergentes
+        self.time = 0.0  # Segundos gastos na conferência
+
+    def update(self, data):
+        # Confere o próximo trecho de um fluxo contínuo (TCP)
+        # @data - bytes ou memoryview recebidos
+        self.compare(self.position, data)
+        self.position += len(data)
+
+    def check(self, seq, datagram):
+        # Confere o bloco de um datagrama DATA, com a interface do
+        # ChunkVerifier. Retorna True se confere; blocos divergentes devem ser
+        # descartados (como se fossem perdidos).
+        # @seq - número de sequência do bloco
+        # @datagram - datagrama completo (cabeçalho e dados)
+        data = memoryview(datagram)[self.header_size :]
+        return self.compare(seq * self.block_size, data)
+
+    def compare(self, offset, data):
+        # Confere um bloco na sua posição do arquivo. Retorna True se confere.
+        # @offset - posição do primeiro byte do bloco
+        # @data - bytes ou memoryview do bloco
+        start = time.perf_counter()
+        # Comparar bytes usa memcmp; memoryviews são comparadas byte a byte
+        matches = bytes(data) == expected(offset, len(data))
+        self.time += time.perf_counter() - start
+        if matches:
+            self.matched += len(data)
+        else:
+            self.mismatches.append(offset)
+        return matches
@@ -2,23 +2,125 @@ import socket
 import logging
 import sys
 import time
-import csv
 import os
+import selectors
+from collections import deque
+from concurrent.futures import ThreadPoolExecutor
+from contextlib import nullcontext
+from datetime import datetime
+
+import compression
+import integrity
+import latency
+import metrics
+import profiling
+import sampling
+import synthetic
+import tuning
+import writeback
+from histogram import ArrivalHistogram, summary_header
+from protocol import chunk_count, format_request, parse_reply, read_reply
 
 
 class Client:
-    def __init__(self, host, port, buffer_size, file_name, verbose):
+    def __init__(
+        self,
+        host,
+        port,
+        buffer_size,
+        file_name,
+        verbose,
+        recv_into=False,
+        output=None,
+        histogram=None,
+        streams=1,
+        tuning_profile="default",
+        checksum=None,
+        requests=0,
+        pipeline=1,
+        concurrency=1,
+        metrics_formats=("csv",),
+        metrics_dir=".",
+        sample_interval=0,
+        live=False,
+        verify_pattern=False,
+        write_mode="direct",
+        write_queue=writeback.DEFAULT_QUEUE_MB,
+        fsync=False,
+        compress=None,
+        compress_level=None,
+        profile=None,
+        profile_file=None,
+    ):
         # Inicializa o cliente com os parâmetros fornecidos
         # @host - endereço IP do servidor
         # @port - número da porta do servidor
         # @buffer_size - tamanho do buffer utilizado na recepção de pacotes
         # @file_name - nome do arquivo a ser solicitado ao servidor
         # @verbose - nível de detalhamento do log (True para log detalhado)
+        # @recv_into - recebe em um buffer pré-alocado, sem alocar bytes por pacote
+        # @output - caminho onde gravar os dados recebidos (None descarta os dados)
+        # @histogram - arquivo CSV do histograma de intervalos entre chegadas
+        #              (None desabilita a instrumentação por pacote)
+        # @streams - conexões paralelas, cada uma recebendo uma faixa do arquivo
+        # @tuning_profile - perfil de ajuste dos sockets (tuning.PROFILES)
+        # @checksum - algoritmo do resumo verificado (None não verifica)
+        # @requests - requisições por conexão no modo de requisição/resposta,
+        #             em que buffer_size é o tamanho das mensagens (0: baixa o
+        #             arquivo)
+        # @pipeline - mensagens sem resposta permitidas por conexão
+        # @concurrency - conexões simultâneas no modo de requisição/resposta
+        # @metrics_formats - formatos dos arquivos de métricas (metrics.FORMATS)
+        # @metrics_dir - diretório dos arquivos de métricas
+        # @sample_interval - intervalo da amostragem da taxa durante a
+        #                    transferência, em ms (0 desabilita)
+        # @live - exibe a taxa amostrada ao vivo no terminal
+        # @verify_pattern - confere os dados de um arquivo sintético (gen:)
+        #                   contra o padrão, sem gravá-los
+        # @write_mode - gravação da saída na recepção (direct) ou em uma thread
+        #               à parte (behind) (writeback.WRITE_MODES)
+        # @write_queue - tamanho máximo da fila do modo behind, em MB
+        # @fsync - sincroniza a saída com o disco antes de medir o fim a fim
+        # @compress - algoritmo de compressão pedido ao servidor
+        #             (compression.ALGORITHMS; None recebe sem compressão)
+        # @compress_level - nível de compressão (None usa o padrão do algoritmo)
+        # @profile - perfila a execução (profiling.MODES; None desabilita)
+        # @profile_file - arquivo do perfil (None usa o nome padrão)
         self.host = host
         self.port = port
         self.buffer_size = buffer_size
         self.file_name = file_name
         self.verbose = verbose
+        self.recv_into = recv_into
+        self.output = output
+        self.histogram_path = histogram
+        self.histogram = None  # Intervalos entre chegadas, se habilitado
+        self.streams = streams
+        self.tuning = tuning_profile
+        self.socket_info = None  # Ajuste efetivo do socket, lido ao conectar
+        self.checksum = checksum
+        self.digest = None  # Resumo (ou conferência do padrão) durante a recepção
+        self.verify_pattern = verify_pattern
+        self.write_mode = write_mode
+        self.write_queue = write_queue
+        self.fsync = fsync
+        self.writer = None  # Gravação da saída, se pedida
+        self.compress = compress
+        self.compress_level = compress_level
+        self.profile = profile
+        self.profile_file = profile_file
+        self.profiler = None  # Perfil da execução, se pedido
+        self.cpu = None  # CPU gasta na transferência
+        self.decompressor = None  # Descompressão, se confirmada pelo servidor
+        self.verification = None  # Resultado da verificação de integridade
+        self.requests = requests
+        self.pipeline = max(pipeline, 1)
+        self.concurrency = max(concurrency, 1)
+        self.metrics = metrics.Metrics(metrics_formats, metrics_dir)
+        self.sample_interval = sample_interval
+        self.live = live
+        self.sampler = None  # Amostragem da taxa, se habilitada
+        self.counter = None  # Contador da transferência de uma só conexão
         self.logg = logging.getLogger("CLIENTE_TCP")
 
     def _init_logging(self):
@@ -27,103 +129,716 @@ class Client:
         logging.basicConfig(level=level)
         self.logg.info(f"Cliente TCP conectando a {self.host}:{self.port}")
 
-    def _log_metrics_to_csv(
-        self, total_received, elapsed_time, packet_count, throughput, actual_file_size
+    def _log_metrics(
+        self,
+        total_received,
+        elapsed_time,
+        packet_count,
+        throughput,
+        actual_file_size,
+        expected_packets,
+        out_of_order=0,
+        duplicates=0,
+        stream_rates=None,
     ):
-        # Salva métricas da transferência em um arquivo CSV
+        # Registra as métricas da transferência no pipeline de métricas
         # @total_received - total de bytes recebidos durante a transferência
-        # @elapsed_time - tempo total decorrido para a transferência
+        # @elapsed_time - tempo entre o primeiro e o último byte recebido
         # @packet_count - número de pacotes recebidos
         # @throughput - taxa de transferência em MB/s
-        # @actual_file_size - tamanho esperado do arquivo
-        csv_file = "metricas_tcp.csv"
-        file_exists = os.path.isfile(csv_file)
-
-        # Calcular bytes perdidos
-        bytes_lost = actual_file_size - total_received
-        integridade = "Aprovada" if bytes_lost == 0 else "Falhou"
-
-        header = [
-            "Total de Bytes Recebidos",
-            "Tempo Decorrido (s)",
-            "Número de Pacotes",
-            "Taxa de Transferência (MB/s)",
-            "Tamanho Esperado (bytes)",
-            "Bytes Perdidos",
-            "Integridade dos Dados",
-            "Tamanho do Buffer (bytes)",
-        ]
-
-        row = [
+        # @actual_file_size - tamanho do arquivo anunciado pelo servidor
+        # @expected_packets - número de blocos anunciado pelo servidor
+        # @out_of_order - pacotes que chegaram depois de um pacote posterior
+        # @duplicates - pacotes recebidos mais de uma vez
+        # @stream_rates - taxa de cada conexão em MB/s (None: uma só conexão)
+        row = metrics.reception_row(
             total_received,
-            round(elapsed_time, 2),
+            elapsed_time,
             packet_count,
-            round(throughput, 2),
+            throughput,
             actual_file_size,
-            bytes_lost,
-            integridade,
+            expected_packets,
             self.buffer_size,
+            out_of_order,
+            duplicates,
+            self.verification,
+        )
+        stream_rates = stream_rates or [throughput]
+        row.add(
+            ["Conexões", "Taxa por Conexão (MB/s)"],
+            [len(stream_rates), " ".join(str(rate) for rate in stream_rates)],
+        )
+        row.section(summary_header(), self.histogram)
+        row.add(tuning.summary_header(), self.socket_info)
+        row.section(
+            integrity.summary_header(), self.verification, total_received, elapsed_time
+        )
+        row.section(writeback.summary_header(), self.writer)
+        row.section(compression.summary_header(), self.decompressor)
+        row.section(profiling.summary_header(), self.cpu, total_received)
+        self.metrics.add_row("metricas_tcp", row)
+        if self.histogram is not None:
+            self.histogram.export(
+                self.histogram_path,
+                {
+                    "Arquivo": self.file_name,
+                    "Tamanho do Buffer (bytes)": self.buffer_size,
+                    "Execução": datetime.now().isoformat(timespec="milliseconds"),
+                },
+            )
+            self.logg.info(f"Histograma salvo no arquivo CSV '{self.histogram_path}'.")
+        if self.cpu is not None:
+            self.logg.info(f"{self.cpu.describe(total_received)}.")
+        self.logg.info(f"Integridade dos dados: {row.value('Integridade dos Dados')}")
+        self.logg.info(f"Bytes perdidos: {row.value('Bytes Perdidos')}")
+
+    def _save_metrics(self):
+        # Grava as métricas registradas e informa os arquivos gravados
+        for path in self.metrics.flush():
+            self.logg.info(f"Métricas salvas no arquivo '{path}'.")
+
+    def _start_sampler(self):
+        # Inicia a amostragem da taxa durante a transferência, se pedida
+        if not self.sample_interval:
+            return
+        self.sampler = sampling.Sampler(
+            self.metrics,
+            "amostras_tcp",
+            self.sample_interval / 1000,
+            {"Arquivo": self.file_name, "Tamanho do Buffer (bytes)": self.buffer_size},
+            self.live,
+        )
+        self.sampler.start()
+
+    def _stop_sampler(self):
+        # Registra o último intervalo amostrado e encerra a amostragem
+        if self.sampler is not None:
+            self.sampler.stop()
+
+    def _open_output(self, size):
+        # Abre o arquivo de saída, ou um contexto vazio se os dados forem descartados
+        # @size - tamanho anunciado pelo servidor, pré-alocado
+        if self.output is None:
+            return nullcontext()
+        self.writer = writeback.open_output(
+            self.output, self.write_mode, size, self.write_queue, self.fsync
+        )
+        return self.writer
+
+    def _log_writer(self):
+        # Loga a gravação da saída, com a taxa fim a fim (até os dados gravados)
+        if self.writer is None:
+            return
+        writer = self.writer
+        *_, elapsed, rate = writer.summary()
+        self.logg.info(
+            f"Saída gravada ({writer.mode}) em {elapsed:.2f} segundos. Taxa fim a "
+            f"fim: {rate:.2f} MB/s. Escritas: {writer.writes}, espera por fila "
+            f"cheia: {writer.stall_time:.3f} s, sincronização: {writer.sync_time:.3f} s."
+        )
+
+    def _start_decompressor(self, info):
+        # Cria a descompressão dos dados recebidos, se a compressão foi pedida
+        # e o servidor a confirmou na resposta de prontidão
+        # @info - campos da resposta de prontidão do servidor
+        if self.compress is None:
+            return None
+        if info.get("compress") != self.compress:
+            self.logg.warning("O servidor não confirmou a compressão; sem compressão.")
+            return None
+        return compression.StreamDecompressor(self.compress)
+
+    def _log_compression(self):
+        # Loga os bytes originais e no fio e o tempo de CPU da descompressão
+        if self.decompressor is not None:
+            self.logg.info(f"Compressão {self.decompressor.describe()}.")
+
+    def _receive_copy(self, sock, out):
+        # Recebe os dados do servidor em blocos de tamanho buffer_size, alocando
+        # um novo objeto bytes a cada chamada. Retorna (bytes, pacotes, instante
+        # do primeiro byte, instante do último byte). Com compressão, os bytes
+        # contados, verificados e gravados são os já descomprimidos.
+        # @sock - socket conectado ao servidor
+        # @out - arquivo de saída (None descarta os dados)
+        total_received = 0
+        packet_count = 0
+        first_byte = last_byte = None
+        # Instrumentação por pacote: com o histograma desabilitado, custa um teste
+        arrival = self.histogram.arrival if self.histogram else None
+        digest = self.digest.update if self.digest else None
+        count = self.counter.add if self.counter else None
+        decompress = self.decompressor.decompress if self.decompressor else None
+        while True:
+            data = sock.recv(self.buffer_size)
+            if not data:
+                break  # Fim da transferência
+            last_byte = time.perf_counter()
+            if first_byte is None:
+                first_byte = last_byte
+            if arrival is not None:
+                arrival(last_byte)
+            if decompress is not None:
+                data = decompress(data)
+            if digest is not None:
+                digest(data)
+            if count is not None:
+                count(len(data))
+            total_received += len(data)
+            packet_count += 1
+            if out is not None:
+                out.write(data)
+
+            if self.verbose:
+                self.logg.debug(f"Pacote {packet_count}: {len(data)} bytes recebidos.")
+        return total_received, packet_count, first_byte, last_byte
+
+    def _receive_into(self, sock, out):
+        # Recebe os dados diretamente em um buffer pré-alocado com recv_into,
+        # reutilizado em todas as chamadas (nenhuma alocação por pacote).
+        # Retorna os mesmos valores de _receive_copy.
+        # @sock - socket conectado ao servidor
+        # @out - arquivo de saída (None descarta os dados)
+        view = memoryview(bytearray(self.buffer_size))
+        total_received = 0
+        packet_count = 0
+        first_byte = last_byte = None
+        arrival = self.histogram.arrival if self.histogram else None
+        digest = self.digest.update if self.digest else None
+        count = self.counter.add if self.counter else None
+        decompress = self.decompressor.decompress if self.decompressor else None
+        while True:
+            size = sock.recv_into(view)
+            if not size:
+                break  # Fim da transferência
+            last_byte = time.perf_counter()
+            if first_byte is None:
+                first_byte = last_byte
+            if arrival is not None:
+                arrival(last_byte)
+            data = view[:size]
+            if decompress is not None:
+                data = decompress(data)
+                size = len(data)
+            if digest is not None:
+                digest(data)
+            if count is not None:
+                count(size)
+            total_received += size
+            packet_count += 1
+            if out is not None:
+                out.write(data)
+
+            if self.verbose:
+                self.logg.debug(f"Pacote {packet_count}: {size} bytes recebidos.")
+        return total_received, packet_count, first_byte, last_byte
+
+    def _tune(self, sock):
+        # Aplica o perfil de ajuste antes do connect, pois a janela do TCP é
+        # negociada no handshake
+        # @sock - socket ainda não conectado
+        for failure in tuning.apply(sock, self.tuning):
+            self.logg.warning(f"Opção de socket não aplicada: {failure}")
+
+    def _connect(self):
+        # Cria um socket ajustado e o conecta ao servidor
+        sock = socket.socket(socket.AF_INET, socket.SOCK_STREAM)
+        try:
+            self._tune(sock)
+            sock.connect((self.host, self.port))
+        except BaseException:
+            sock.close()
+            raise
+        self.socket_info = tuning.summary(self.tuning, sock)
+        return sock
+
+    def _start_digest(self, info, offset=0):
+        # Cria o resumo calculado durante a recepção, se a verificação foi
+        # pedida e o servidor anunciou o resumo esperado, ou a conferência dos
+        # dados de um arquivo sintético contra o padrão
+        # @info - campos da resposta de prontidão do servidor
+        # @offset - posição do primeiro byte recebido no arquivo
+        if self.verify_pattern:
+            return synthetic.PatternVerifier(offset)
+        if self.checksum is None:
+            return None
+        if "digest" not in info:
+            self.logg.warning("O servidor não anunciou o resumo; sem verificação.")
+            return None
+        return integrity.StreamDigest(self.checksum)
+
+    def _verification(self, digest, info):
+        # Resultado da verificação feita com @digest durante a recepção
+        # @digest - resumo ou conferência criado por _start_digest
+        # @info - campos da resposta de prontidão do servidor
+        if isinstance(digest, synthetic.PatternVerifier):
+            # Bytes anunciados contra os bytes que conferem com o padrão
+            return integrity.Verification(
+                synthetic.ALGORITHM,
+                info["size"],
+                str(digest.matched),
+                digest.time,
+                len(digest.mismatches),
+            )
+        return integrity.Verification(
+            self.checksum, info["digest"], digest.hexdigest(), digest.time
+        )
+
+    def _log_verification(self):
+        # Loga o resultado da verificação de integridade
+        verification = self.verification
+        if verification.passed:
+            self.logg.info(
+                f"Resumo {verification.algorithm} conferido ({verification.calculated}), "
+                f"verificação em {verification.time:.3f} segundos."
+            )
+        else:
+            self.logg.error(
+                f"Resumo {verification.algorithm} divergente: esperado "
+                f"{verification.expected}, calculado {verification.calculated}."
+            )
+
+    def _probe_size(self):
+        # Pede ao servidor apenas o tamanho total do arquivo (mode=size), que
+        # não é registrado como transferência. A faixa vazia mantém a resposta
+        # correta em servidores que não conhecem o modo. Retorna None se o
+        # servidor recusou a solicitação.
+        with self._connect() as sock:
+            sock.sendall(
+                format_request(
+                    self.file_name, self.buffer_size, offset=0, length=0, mode="size"
+                )
+            )
+            reply, _ = read_reply(sock)
+        info = parse_reply(reply)
+        return None if info is None else int(info["total"])
+
+    def _split_ranges(self, size):
+        # Divide o arquivo em até self.streams faixas (deslocamento, comprimento)
+        # contíguas, com limites múltiplos do buffer
+        # @size - tamanho total do arquivo
+        per_stream = chunk_count(size, self.streams)
+        per_stream = chunk_count(per_stream, self.buffer_size) * self.buffer_size
+        return [
+            (offset, min(per_stream, size - offset))
+            for offset in range(0, size, max(per_stream, 1))
         ]
 
-        with open(csv_file, mode="a", newline="") as file:
-            writer = csv.writer(file)
-            if not file_exists:
-                writer.writerow(
-                    header
-                )  # Escreve o cabeçalho apenas se o arquivo não existir
-            writer.writerow(row)
+    def _receive_range(self, index, offset, length, out):
+        # Recebe uma faixa do arquivo em uma conexão própria, gravando cada bloco
+        # na sua posição do arquivo de saída com pwrite. Retorna os mesmos
+        # valores de _receive_copy, a verificação da faixa (None se não houve) e
+        # a descompressão da faixa (None sem compressão).
+        # @index - número da conexão, para o log
+        # @offset - primeiro byte da faixa
+        # @length - tamanho da faixa
+        # @out - gravação da saída, compartilhada (None descarta os dados)
+        with self._connect() as sock, sampling.tracking(self.sampler) as count:
+            sock.sendall(
+                format_request(
+                    self.file_name,
+                    self.buffer_size,
+                    offset=offset,
+                    length=length,
+                    checksum=self.checksum,
+                    compress=self.compress,
+                    level=self.compress_level,
+                )
+            )
+            reply, pending = read_reply(sock)
+            info = parse_reply(reply)
+            if info is None:
+                raise RuntimeError(f"o servidor recusou a faixa da conexão {index}")
+            digest = self._start_digest(info, offset)
+            update = digest.update if digest else None
+            decompressor = self._start_decompressor(info)
+            decompress = decompressor.decompress if decompressor else None
+
+            view = memoryview(bytearray(self.buffer_size))
+            position = offset
+            packet_count = int(bool(pending))
+            first_byte = last_byte = time.perf_counter() if pending else None
+            if pending and decompress is not None:
+                pending = decompress(pending)
+            total_received = len(pending)
+            if pending and update is not None:
+                update(pending)
+            if pending and count is not None:
+                count(len(pending))
+            if pending and out is not None:
+                out.pwrite(pending, position)
+            position += len(pending)
+            while True:
+                size = sock.recv_into(view)
+                if not size:
+                    break  # Fim da faixa
+                last_byte = time.perf_counter()
+                if first_byte is None:
+                    first_byte = last_byte
+                data = view[:size]
+                if decompress is not None:
+                    data = decompress(data)
+                    size = len(data)
+                if update is not None:
+                    update(data)
+                if count is not None:
+                    count(size)
+                if out is not None:
+                    out.pwrite(data, position)
+                position += size
+                total_received += size
+                packet_count += 1
+
+                if self.verbose:
+                    self.logg.debug(
+                        f"Conexão {index}, pacote {packet_count}: {size} bytes recebidos."
+                    )
+        verification = None
+        if digest is not None:
+            verification = self._verification(digest, info)
+        return (
+            total_received,
+            packet_count,
+            first_byte,
+            last_byte,
+            verification,
+            decompressor,
+        )
+
+    def _run_parallel(self):
+        # Recebe o arquivo em self.streams conexões simultâneas, cada uma com
+        # uma faixa de bytes, e registra a taxa de cada conexão e a agregada
+        # (total de bytes entre o primeiro e o último byte de todas elas)
+        try:
+            size = self._probe_size()
+            if size is None:
+                self.logg.error("O servidor não está pronto para enviar o arquivo.")
+                return
+            ranges = self._split_ranges(size)
+            self.logg.info(
+                f"Recebendo {size} bytes em {len(ranges)} conexões paralelas."
+            )
+
+            self._start_sampler()
+            self.cpu = profiling.CpuUsage()  # Todas as conexões e a gravação
+            try:
+                with self._open_output(size) as out, ThreadPoolExecutor(
+                    max_workers=max(len(ranges), 1)
+                ) as pool:
+                    futures = [
+                        pool.submit(self._receive_range, index, offset, length, out)
+                        for index, (offset, length) in enumerate(ranges)
+                    ]
+                    results = [future.result() for future in futures]
+            finally:
+                self._stop_sampler()
+                self.cpu.stop()
+            self._log_writer()
+
+            stream_rates = []
+            for index, (received, _, first, last, *_) in enumerate(results):
+                elapsed = last - first if first else 0.0
+                rate = received / elapsed / (1024 * 1024) if elapsed else 0.0
+                stream_rates.append(rate)
+                self.logg.info(
+                    f"Conexão {index}: {received} bytes em {elapsed:.2f} segundos. "
+                    f"Taxa: {rate:.2f} MB/s"
+                )
+
+            total_received = sum(result[0] for result in results)
+            packet_count = sum(result[1] for result in results)
+            firsts = [result[2] for result in results if result[2] is not None]
+            lasts = [result[3] for result in results if result[3] is not None]
+            elapsed_time = max(lasts) - min(firsts) if firsts else 0.0
+            throughput = 0.0
+            if elapsed_time:
+                throughput = total_received / elapsed_time / (1024 * 1024)  # MB/s
+            verifications = [result[4] for result in results if result[4]]
+            if verifications:
+                # Um resumo por faixa; o tempo de verificação é o da faixa
+                # mais lenta de verificar, pois as conexões são simultâneas
+                corrupted = [v.corrupted for v in verifications if v.corrupted]
+                self.verification = integrity.Verification(
+                    verifications[0].algorithm,
+                    " ".join(v.expected for v in verifications),
+                    " ".join(v.calculated for v in verifications),
+                    max(v.time for v in verifications),
+                    sum(corrupted) if corrupted else None,
+                )
+                self._log_verification()
+            decompressors = [result[5] for result in results if result[5]]
+            if decompressors:
+                # Soma das faixas: o tempo de CPU é o de todas as conexões
+                self.decompressor = compression.merge(decompressors)
+                self._log_compression()
+
+            self._log_metrics(
+                total_received,
+                elapsed_time,
+                packet_count,
+                throughput,
+                size,
+                sum(chunk_count(length, self.buffer_size) for _, length in ranges),
+                stream_rates=stream_rates,
+            )
+            self.logg.info(
+                f"Arquivo recebido em {elapsed_time:.2f} segundos. Taxa agregada: {throughput:.2f} MB/s"
+            )
+        except Exception as e:
+            self.logg.error(f"Erro: {e}")
+        finally:
+            self._stop_sampler()
+            self._save_metrics()
+            self.logg.info("Conexões encerradas.")
+
+    def _log_echo(self, rtts, elapsed_time):
+        # Registra as métricas do modo de requisição/resposta
+        # @rtts - histograma dos RTTs de todas as conexões
+        # @elapsed_time - tempo entre a primeira requisição e a última resposta
+        row = metrics.Row(
+            latency.summary_header(),
+            latency.summary(
+                self.buffer_size,
+                self.pipeline,
+                self.concurrency,
+                self.requests * self.concurrency,
+                rtts,
+                0,
+                elapsed_time,
+            ),
+        )
+        row.add(tuning.summary_header(), self.socket_info)
+        self.metrics.add_row("metricas_latencia_tcp", row)
+
+    def _echo_connection(self, index):
+        # Envia self.requests mensagens em uma conexão, mantendo até
+        # self.pipeline sem resposta, e mede o RTT de cada uma. O TCP entrega
+        # as respostas em ordem, por isso os instantes de envio ficam em uma
+        # fila. O envio e a recepção são intercalados por um seletor: com
+        # mensagens grandes, enviar o pipeline inteiro antes de ler as
+        # respostas travaria as duas pontas com os buffers cheios. Retorna
+        # (histograma dos RTTs, instante da primeira requisição, instante da
+        # última resposta).
+        # @index - número da conexão, para o log
+        rtts = ArrivalHistogram()
+        with self._connect() as sock:
+            latency.nodelay(sock)
+            self.socket_info = tuning.summary(self.tuning, sock)
+            sock.sendall(
+                format_request(latency.ECHO_FILE, self.buffer_size, mode="echo")
+            )
+            reply, _ = read_reply(sock)
+            if parse_reply(reply) is None:
+                raise RuntimeError(f"o servidor recusou a conexão {index}")
+
+            message = memoryview(os.urandom(self.buffer_size))
+            view = memoryview(bytearray(self.buffer_size))
+            pending = message[:0]  # Resto da mensagem em envio
+            sent_times = deque()
+            sent = answered = received = 0
+            first = last = time.perf_counter()
+            sock.setblocking(False)
+            with selectors.DefaultSelector() as sel:
+                sel.register(sock, selectors.EVENT_READ)
+                interest = selectors.EVENT_READ
+                while answered < self.requests:
+                    # Inicia as mensagens que cabem no pipeline
+                    while not pending and sent < min(
+                        answered + self.pipeline, self.requests
+                    ):
+                        sent_times.append(time.perf_counter())
+                        sent += 1
+                        pending = self._send_some(sock, message)
+                    events = selectors.EVENT_READ
+                    if pending:
+                        events |= selectors.EVENT_WRITE
+                    if events != interest:
+                        sel.modify(sock, events)
+                        interest = events
+
+                    for _, mask in sel.select():
+                        if mask & selectors.EVENT_WRITE:
+                            pending = self._send_some(sock, pending)
+                        if not mask & selectors.EVENT_READ:
+                            continue
+                        size = sock.recv_into(view[received:])
+                        if not size:
+                            raise ConnectionError("o servidor encerrou a conexão")
+                        received += size
+                        if received < self.buffer_size:
+                            continue
+                        last = time.perf_counter()
+                        rtts.record(int((last - sent_times.popleft()) * 1e9))
+                        answered += 1
+                        received = 0
+
+                        if self.verbose:
+                            self.logg.debug(
+                                f"Conexão {index}, resposta {answered} recebida."
+                            )
+        return rtts, first, last
+
+    def _send_some(self, sock, data):
+        # Envia o que couber de @data no socket não bloqueante e retorna o resto
+        # @sock - socket não bloqueante
+        # @data - memoryview dos bytes a enviar
+        try:
+            return data[sock.send(data) :]
+        except BlockingIOError:
+            return data
+
+    def _run_echo(self):
+        # Modo de requisição/resposta: self.concurrency conexões simultâneas
+        # enviam mensagens pequenas ao servidor, que as devolve. Registra as
+        # requisições por segundo e os percentis do RTT de todas as conexões.
+        try:
+            self.logg.info(
+                f"Enviando {self.requests} mensagens de {self.buffer_size} bytes em "
+                f"{self.concurrency} conexões (pipeline de {self.pipeline})."
+            )
+            with ThreadPoolExecutor(max_workers=self.concurrency) as pool:
+                results = list(pool.map(self._echo_connection, range(self.concurrency)))
+
+            rtts = ArrivalHistogram()
+            for histogram, _, _ in results:
+                rtts.merge(histogram)
+            elapsed_time = max(r[2] for r in results) - min(r[1] for r in results)
+            self._log_echo(rtts, elapsed_time)
+            rate = rtts.count / elapsed_time if elapsed_time else 0.0
+            self.logg.info(
+                f"{rtts.count} respostas em {elapsed_time:.2f} segundos: "
+                f"{rate:.0f} requisições/s, RTT médio {rtts.mean() / 1000:.1f} us, "
+                f"p99 {rtts.percentile(99) / 1000:.1f} us."
+            )
+        except Exception as e:
+            self.logg.error(f"Erro: {e}")
+        finally:
+            self._save_metrics()
+            self.logg.info("Conexões encerradas.")
+
+    def _start_profiler(self):
+        # Inicia o perfil da execução, se pedido
+        if self.profile is None:
+            return
+        path = self.profile_file or profiling.output_path(
+            self.profile, "tcp", self.metrics.directory
+        )
+        self.profiler = profiling.create_profiler(self.profile, path)
 
-        self.logg.info(f"Métricas salvas no arquivo CSV '{csv_file}'.")
-        self.logg.info(f"Integridade dos dados: {integridade}")
-        self.logg.info(f"Bytes perdidos: {bytes_lost}")
+    def _stop_profiler(self):
+        # Grava o perfil e loga as funções mais custosas
+        if self.profiler is None:
+            return
+        self.profiler.stop()
+        self.logg.info(
+            f"Perfil ({self.profile}) salvo em '{self.profiler.path}'.\n"
+            f"{self.profiler.report()}"
+        )
 
     def run(self):
-        # Inicia a comunicação com o servidor e recebe o arquivo
+        # Inicia a comunicação com o servidor e recebe o arquivo, perfilando a
+        # execução se pedido
         self._init_logging()
+        self._start_profiler()
+        try:
+            with profiling.profiled(self.profiler):
+                self._run()
+        finally:
+            self._stop_profiler()
+
+    def _run(self):
+        # Escolhe o modo de execução e recebe o arquivo
+        if self.requests:
+            self._run_echo()
+            return
+        if self.streams > 1:
+            # O histograma por pacote não se aplica a chegadas de várias conexões
+            self._run_parallel()
+            return
+        if self.histogram_path is not None:
+            self.histogram = ArrivalHistogram()
         with socket.socket(socket.AF_INET, socket.SOCK_STREAM) as sock:
             try:
-                # Conectar ao servidor TCP na porta especificada
+                # Conectar ao servidor TCP na porta especificada, com o perfil
+                # de ajuste já aplicado
+                self._tune(sock)
                 sock.connect((self.host, self.port))
+                self.socket_info = tuning.summary(self.tuning, sock)
                 self.logg.info("Conectado ao servidor.")
+                self._start_sampler()
+                if self.sampler is not None:
+                    self.counter = self.sampler.track()
 
                 # Enviar o nome do arquivo e o tamanho do buffer para o servidor
-                sock.sendall(f"{self.file_name},{self.buffer_size}".encode())
+                sock.sendall(
+                    format_request(
+                        self.file_name,
+                        self.buffer_size,
+                        checksum=self.checksum,
+                        compress=self.compress,
+                        level=self.compress_level,
+                    )
+                )
                 self.logg.info(f"Solicitação do arquivo '{self.file_name}' enviada.")
 
-                # Aguardar a confirmação do servidor
-                if sock.recv(1024) != b"READY":
+                # Aguardar a confirmação do servidor, que anuncia o tamanho do
+                # arquivo; os primeiros dados podem chegar junto com ela
+                reply, pending = read_reply(sock)
+                info = parse_reply(reply)
+                if info is None:
                     self.logg.error("O servidor não está pronto para enviar o arquivo.")
                     return
+                expected_size = int(info["size"])
+                expected_packets = int(info["chunks"])
+                self.digest = self._start_digest(info)
+                self.decompressor = self._start_decompressor(info)
+                self.cpu = profiling.CpuUsage()
 
                 # Receber os dados do arquivo
-                total_received = 0
-                packet_count = 0
-                start_time = time.time()  # Marca o tempo de início da transferência
-
-                while True:
-                    # Recebe os dados do servidor em blocos de tamanho buffer_size
-                    data = sock.recv(self.buffer_size)
-                    if not data:
-                        break  # Fim da transferência
-                    total_received += len(data)
-                    packet_count += 1
-
-                    if self.verbose:
-                        self.logg.debug(
-                            f"Pacote {packet_count}: {len(data)} bytes recebidos."
-                        )
-
-                # Calcula o tempo total decorrido e a taxa de transferência
-                elapsed_time = time.time() - start_time
-                throughput = total_received / elapsed_time / (1024 * 1024)  # MB/s
+                first_byte = time.perf_counter() if pending else None
+                packet_count = int(bool(pending))
+                if pending and self.histogram is not None:
+                    self.histogram.arrival(first_byte)
+                if pending and self.decompressor is not None:
+                    pending = self.decompressor.decompress(pending)
+                if pending and self.digest is not None:
+                    self.digest.update(pending)
+                if pending and self.counter is not None:
+                    self.counter.add(len(pending))
+                with self._open_output(expected_size) as out:
+                    if pending and out is not None:
+                        out.write(pending)
+                    if self.recv_into:
+                        received = self._receive_into(sock, out)
+                    else:
+                        received = self._receive_copy(sock, out)
+                self._stop_sampler()
+                self.cpu.stop()  # Inclui a gravação e a sincronização da saída
+                self._log_writer()
+                total_received, packets, first, last_byte = received
+                total_received += len(pending)
+                packet_count += packets
+                first_byte = first_byte or first
+                last_byte = last_byte or first_byte
+
+                # Calcula o tempo entre o primeiro e o último byte e a taxa de
+                # transferência
+                elapsed_time = last_byte - first_byte if first_byte else 0.0
+                throughput = 0.0
+                if elapsed_time:
+                    throughput = total_received / elapsed_time / (1024 * 1024)  # MB/s
+                if self.digest is not None:
+                    self.verification = self._verification(self.digest, info)
+                    self._log_verification()
+                self._log_compression()
 
                 # Logar as métricas no CSV
-                self._log_metrics_to_csv(
+                self._log_metrics(
                     total_received,
                     elapsed_time,
                     packet_count,
                     throughput,
-                    total_received,
+                    expected_size,
+                    expected_packets,
                 )
 
                 self.logg.info(
@@ -135,6 +850,8 @@ class Client:
                 self.logg.error(f"Erro: {e}")
             finally:
                 # Garante que a conexão será encerrada corretamente
+                self._stop_sampler()
+                self._save_metrics()
                 self.logg.info("Conexão encerrada.")
 
 
@@ -149,20 +866,196 @@ def parse_args(args):
     parser.add_argument(
         "--port", required=True, type=int, help="Número da porta do servidor"
     )
+    parser.add_argument("--file", type=str, help="Nome do arquivo a ser solicitado")
+    parser.add_argument(
+        "--buffer",
+        required=True,
+        type=int,
+        help="Tamanho do buffer (no modo --echo, o tamanho das mensagens)",
+    )
+    parser.add_argument(
+        "--recv-into",
+        action="store_true",
+        help="Receber em um buffer pré-alocado (recv_into) em vez de alocar por pacote",
+    )
+    parser.add_argument(
+        "--output", type=str, help="Arquivo onde gravar os dados recebidos"
+    )
+    parser.add_argument(
+        "--histogram",
+        nargs="?",
+        const="histograma_tcp.csv",
+        help="Registrar o histograma de intervalos entre chegadas (p50/p90/p99/p99.9 "
+        "e jitter) e exportá-lo para o arquivo indicado",
+    )
+    parser.add_argument(
+        "--streams",
+        type=int,
+        default=1,
+        help="Receber o arquivo em N conexões paralelas, cada uma com uma faixa de "
+        "bytes (sempre com recv_into e gravação posicional)",
+    )
+    parser.add_argument(
+        "--checksum",
+        choices=integrity.ALGORITHMS,
+        help="Verificar a integridade dos dados com o resumo anunciado pelo "
+        "servidor, calculado durante a recepção",
+    )
+    parser.add_argument(
+        "--verify-pattern",
+        action="store_true",
+        help="Conferir os dados de um arquivo sintético (--file gen:<tamanho>, ex.: "
+        "gen:2G) contra o padrão gerado, sem gravá-los",
+    )
+    parser.add_argument(
+        "--write-mode",
+        choices=writeback.WRITE_MODES,
+        default="direct",
+        help="Gravação da saída (--output): na própria recepção (direct) ou em uma "
+        "thread à parte, alimentada por uma fila limitada (behind)",
+    )
+    parser.add_argument(
+        "--write-queue",
+        type=int,
+        default=writeback.DEFAULT_QUEUE_MB,
+        metavar="MB",
+        help="Tamanho máximo da fila de gravação no modo --write-mode behind",
+    )
+    parser.add_argument(
+        "--fsync",
+        action="store_true",
+        help="Sincronizar a saída com o disco antes de medir a taxa fim a fim",
+    )
+    parser.add_argument(
+        "--compress",
+        choices=compression.ALGORITHMS,
+        help="Pedir ao servidor os dados comprimidos, descomprimidos na recepção",
+    )
+    parser.add_argument(
+        "--compress-level",
+        type=int,
+        help="Nível de compressão (por padrão, o mais rápido do algoritmo)",
+    )
+    parser.add_argument(
+        "--profile",
+        choices=profiling.MODES,
+        help="Perfilar a execução: cProfile (todas as chamadas, com custo alto) ou "
+        "amostragem das pilhas de todas as threads (custo baixo, flame graph)",
+    )
+    parser.add_argument(
+        "--profile-file",
+        help="Arquivo do perfil (padrão: perfil_tcp.prof ou .txt no diretório das "
+        "métricas)",
+    )
+    parser.add_argument(
+        "--tuning",
+        choices=list(tuning.PROFILES),
+        default="default",
+        help="Perfil de ajuste dos sockets: valores do sistema (default), buffers "
+        "grandes (throughput) ou TCP_NODELAY e busy polling (low-latency)",
+    )
+    parser.add_argument(
+        "--echo",
+        type=int,
+        nargs="?",
+        const=latency.DEFAULT_REQUESTS,
+        default=0,
+        metavar="REQUISIÇÕES",
+        help="Modo de requisição/resposta: enviar N mensagens por conexão, que o "
+        "servidor devolve, e medir as requisições por segundo e o RTT",
+    )
+    parser.add_argument(
+        "--pipeline",
+        type=int,
+        default=1,
+        help="Mensagens sem resposta permitidas por conexão (modo --echo)",
+    )
+    parser.add_argument(
+        "--concurrency",
+        type=int,
+        default=1,
+        help="Conexões simultâneas (modo --echo)",
+    )
+    parser.add_argument(
+        "--metrics-format",
+        nargs="+",
+        choices=metrics.FORMATS,
+        default=["csv"],
+        help="Formatos dos arquivos de métricas: CSV, JSON Lines e/ou colunar binário",
+    )
+    parser.add_argument(
+        "--metrics-dir",
+        default=".",
+        help="Diretório dos arquivos de métricas",
+    )
     parser.add_argument(
-        "--file", required=True, type=str, help="Nome do arquivo a ser solicitado"
+        "--sample",
+        type=int,
+        nargs="?",
+        const=sampling.DEFAULT_INTERVAL_MS,
+        default=0,
+        metavar="MS",
+        help="Amostrar a taxa durante a transferência a cada N ms (100 por padrão) "
+        "e gravar a série em amostras_tcp",
+    )
+    parser.add_argument(
+        "--live",
+        action="store_true",
+        help="Exibir a taxa amostrada ao vivo no terminal (implica --sample)",
     )
-    parser.add_argument("--buffer", required=True, type=int, help="Tamanho do buffer")
     parser.add_argument(
         "-v", "--verbose", action="store_true", help="Ativar log detalhado dos pacotes"
     )
-    return parser.parse_args(args)
+    parsed = parser.parse_args(args)
+    if parsed.file is None and not parsed.echo:
+        parser.error("--file é obrigatório fora do modo --echo")
+    if parsed.verify_pattern and not synthetic.is_synthetic(parsed.file or ""):
+        parser.error("--verify-pattern exige um arquivo sintético (--file gen:...)")
+    if parsed.verify_pattern and parsed.checksum:
+        parser.error("--verify-pattern e --checksum não podem ser combinados")
+    if parsed.compress and parsed.compress_level is not None:
+        levels = compression.LEVELS[parsed.compress]
+        if parsed.compress_level not in levels:
+            parser.error(
+                f"--compress-level de {parsed.compress} deve estar entre "
+                f"{levels.start} e {levels.stop - 1}"
+            )
+    if parsed.live and not parsed.sample:
+        parsed.sample = sampling.DEFAULT_INTERVAL_MS
+    return parsed
 
 
 def main():
     # Função principal que inicializa o cliente com os argumentos fornecidos
     args = parse_args(sys.argv[1:])
-    client = Client(args.host, args.port, args.buffer, args.file, args.verbose)
+    client = Client(
+        args.host,
+        args.port,
+        args.buffer,
+        args.file,
+        args.verbose,
+        args.recv_into,
+        args.output,
+        args.histogram,
+        args.streams,
+        args.tuning,
+        args.checksum,
+        args.echo,
+        args.pipeline,
+        args.concurrency,
+        args.metrics_format,
+        args.metrics_dir,
+        args.sample,
+        args.live,
+        args.verify_pattern,
+        args.write_mode,
+        args.write_queue,
+        args.fsync,
+        args.compress,
+        args.compress_level,
+        args.profile,
+        args.profile_file,
+    )
     client.run()
 
 
@@ -1,19 +1,96 @@
 import socket
 import logging
+import errno
+import selectors
 import sys
+import threading
 import time
 import os
+from concurrent.futures import ThreadPoolExecutor
+
+import compression
+import integrity
+import latency
+import metrics
+import prefork
+import profiling
+import sampling
+import synthetic
+import tuning
+from filecache import DEFAULT_CACHE_MB, FileCache
+from protocol import chunk_count, format_reply, parse_request
+
+# Motores de concorrência disponíveis para atender os clientes
+ENGINES = ("sequential", "threads", "selectors")
+
+# Modos de envio do arquivo: cópia por espaço de usuário, sendfile (cópia zero)
+# ou fatias de um mapeamento em memória mantido em cache entre as requisições
+SEND_MODES = ("copy", "sendfile", "mmap")
+
+# Erros que indicam que o sendfile não é suportado para o par arquivo/socket
+SENDFILE_UNSUPPORTED = (errno.EINVAL, errno.ENOSYS, errno.ENOTSOCK, errno.EOPNOTSUPP)
 
 
 class Server:
-    def __init__(self, host, port, verbose):
+    def __init__(
+        self,
+        host,
+        port,
+        verbose,
+        engine="sequential",
+        workers=8,
+        backlog=128,
+        send_mode="copy",
+        cache_size=DEFAULT_CACHE_MB,
+        tuning_profile="default",
+        processes=1,
+        metrics_formats=("csv",),
+        metrics_dir=".",
+        sample_interval=0,
+        live=False,
+        profile=None,
+        profile_file=None,
+    ):
         # Inicializa o servidor com os parâmetros fornecidos
         # @host - endereço IP do servidor
         # @port - número da porta onde o servidor estará ouvindo conexões
         # @verbose - nível de detalhamento do log (True para log detalhado)
+        # @engine - motor de concorrência (sequential, threads ou selectors)
+        # @workers - número máximo de clientes atendidos simultaneamente (threads)
+        # @backlog - tamanho da fila de conexões pendentes do listen()
+        # @send_mode - modo de envio do arquivo (copy, sendfile ou mmap)
+        # @cache_size - capacidade do cache de arquivos mapeados, em MB (modo mmap)
+        # @tuning_profile - perfil de ajuste dos sockets (tuning.PROFILES)
+        # @processes - processos trabalhadores com SO_REUSEPORT (0: um por núcleo)
+        # @metrics_formats - formatos dos arquivos de métricas (metrics.FORMATS)
+        # @metrics_dir - diretório dos arquivos de métricas
+        # @sample_interval - intervalo da amostragem da taxa de envio, somando
+        #                    os clientes atendidos, em ms (0 desabilita)
+        # @live - exibe a taxa amostrada ao vivo no terminal
+        # @profile - perfila o servidor até o encerramento (profiling.MODES;
+        #            None desabilita)
+        # @profile_file - arquivo do perfil (None usa o nome padrão)
         self.host = host
         self.port = port
         self.verbose = verbose
+        self.engine = engine
+        self.workers = workers
+        self.backlog = backlog
+        self.send_mode = send_mode
+        self.cache = None  # Arquivos mapeados em memória, no modo mmap
+        if send_mode == "mmap":
+            self.cache = FileCache(cache_size * 1024 * 1024)
+        self.tuning = tuning_profile
+        self.processes = processes
+        self.digests = integrity.DigestCache()  # Resumos pedidos pelos clientes
+        self.stats = prefork.WorkerStats()  # Totais devolvidos no modo pré-fork
+        self.metrics = metrics.Metrics(metrics_formats, metrics_dir)
+        self.sample_interval = sample_interval
+        self.live = live
+        self.sampler = None  # Amostragem da taxa, iniciada em serve()
+        self.profile = profile
+        self.profile_file = profile_file
+        self.profiler = None  # Perfil do servidor, iniciado em serve()
         self.logg = logging.getLogger("SERVIDOR_TCP")
 
     def _init_logging(self):
@@ -22,47 +99,434 @@ class Server:
         logging.basicConfig(level=level)
         self.logg.info(f"Servidor TCP inicializado em {self.host}:{self.port}.")
 
+    def _parse_request(self, data):
+        # Interpreta a requisição do cliente: nome do arquivo, tamanho do buffer
+        # e opções (ex.: offset e length de uma faixa de bytes)
+        # @data - bytes recebidos do cliente
+        file_name, buffer_size, options = parse_request(data)
+        # Arquivos sintéticos (gen:<tamanho>) não estão em disco
+        if synthetic.is_synthetic(file_name):
+            return file_name, buffer_size, options
+        # Caminho do arquivo a ser enviado
+        return "send_data/" + file_name, buffer_size, options
+
+    def _byte_range(self, file_path, options):
+        # Faixa de bytes pedida pelo cliente, limitada ao tamanho do arquivo.
+        # Retorna (deslocamento, comprimento); sem opções, o arquivo inteiro.
+        # Retorna None se a faixa não for válida (valores não inteiros ou
+        # negativos), para ser recusada antes da confirmação de prontidão.
+        # @file_path - caminho do arquivo a ser enviado
+        # @options - opções da requisição do cliente
+        size = synthetic.getsize(file_path)
+        try:
+            offset = int(options.get("offset", 0))
+            length = int(options.get("length", size))
+        except ValueError:
+            return None
+        if offset < 0 or length < 0:
+            return None
+        offset = min(offset, size)
+        return offset, min(length, size - offset)
+
+    def _ready_reply(self, file_path, buffer_size, options, offset, length):
+        # Monta a confirmação de prontidão, anunciando o tamanho do que será
+        # enviado e o número de blocos para o cliente calcular as perdas reais.
+        # Pedidos de faixa recebem também o tamanho total do arquivo, e pedidos
+        # de verificação, o resumo dos bytes enviados (calculado antes do envio
+        # e mantido em cache). A compressão pedida é confirmada se o algoritmo
+        # for suportado; os tamanhos anunciados são sempre os originais.
+        # @file_path - caminho do arquivo a ser enviado
+        # @buffer_size - tamanho de cada bloco
+        # @options - opções da requisição do cliente
+        # @offset - primeiro byte que será enviado
+        # @length - bytes que serão enviados
+        fields = {"size": length, "chunks": chunk_count(length, buffer_size)}
+        if "offset" in options or "length" in options:
+            fields["total"] = synthetic.getsize(file_path)
+        algorithm = options.get("checksum")
+        if algorithm in integrity.ALGORITHMS:
+            fields["checksum"] = algorithm
+            fields["digest"] = self.digests.digest(file_path, algorithm, offset, length)
+        codec = compression.negotiate(options)
+        if codec is not None:
+            fields["compress"] = codec[0]
+        return format_reply(**fields)
+
+    def _size_reply(self, file_path):
+        # Resposta ao pedido do tamanho do arquivo (mode=size), feito pelo
+        # cliente antes de dividi-lo entre as conexões paralelas. Equivale à
+        # confirmação de uma faixa vazia, mas não é registrada como
+        # transferência nas métricas.
+        # @file_path - caminho do arquivo consultado
+        return format_reply(size=0, chunks=0, total=synthetic.getsize(file_path))
+
+    def _describe_range(self, file_path, offset, length):
+        # Descrição do que será enviado, para o log
+        if offset == 0 and length == synthetic.getsize(file_path):
+            return f"'{file_path}'"
+        return f"'{file_path}' (bytes {offset} a {offset + length - 1})"
+
+    def _log_metrics(
+        self,
+        file_path,
+        total_sent,
+        elapsed_time,
+        packet_count,
+        throughput,
+        buffer_size,
+        send_mode,
+        conn,
+        compressor=None,
+        cpu=None,
+    ):
+        # Registra as métricas do envio no pipeline de métricas do servidor
+        # @file_path - caminho do arquivo enviado
+        # @total_sent - total de bytes enviados
+        # @elapsed_time - tempo total decorrido para o envio
+        # @packet_count - número de blocos enviados (chamadas de envio)
+        # @throughput - taxa de transferência em MB/s
+        # @buffer_size - tamanho do bloco solicitado pelo cliente
+        # @send_mode - caminho de envio efetivamente utilizado
+        # @conn - socket do cliente, para ler o ajuste efetivo
+        # @compressor - compressão do envio (None se não comprimido)
+        # @cpu - CPU gasta no envio (profiling.CpuUsage; None se não medida)
+        row = metrics.Row(
+            [
+                "Arquivo",
+                "Total de Bytes Enviados",
+                "Tempo Decorrido (s)",
+                "Número de Pacotes",
+                "Taxa de Transferência (MB/s)",
+                "Tamanho do Buffer (bytes)",
+                "Modo de Envio",
+                "Motor",
+            ],
+            [
+                file_path,
+                total_sent,
+                elapsed_time,
+                packet_count,
+                throughput,
+                buffer_size,
+                send_mode,
+                self.engine,
+            ],
+        )
+        row.add(tuning.summary_header(), tuning.summary(self.tuning, conn))
+        row.section(compression.summary_header(), compressor)
+        row.section(profiling.summary_header(), cpu, total_sent)
+        self.metrics.add_row("metricas_servidor_tcp", row)
+
+    def _log_transfer(
+        self,
+        file_path,
+        total_sent,
+        elapsed_time,
+        packet_count,
+        buffer_size,
+        send_mode,
+        conn,
+        compressor=None,
+        cpu=None,
+    ):
+        # Calcula e registra a taxa de transferência de um envio concluído
+        # @file_path - caminho do arquivo enviado
+        # @total_sent - total de bytes enviados
+        # @elapsed_time - tempo total decorrido para o envio
+        # @packet_count - número de blocos enviados
+        # @buffer_size - tamanho do bloco solicitado pelo cliente
+        # @send_mode - caminho de envio efetivamente utilizado
+        # @conn - socket do cliente
+        # @compressor - compressão do envio (None se não comprimido); a taxa
+        #               é a dos bytes no fio
+        # @cpu - CPU gasta no envio (profiling.CpuUsage; None se não medida)
+        throughput = 0.0
+        if elapsed_time:
+            throughput = total_sent / elapsed_time / (1024 * 1024)  # MB/s
+        self.stats.add(total_sent, elapsed_time)
+        self.logg.info(
+            f"Arquivo '{file_path}' enviado em {elapsed_time:.2f} segundos. Taxa: {throughput:.2f} MB/s (modo: {send_mode})"
+        )
+        if compressor is not None:
+            self.logg.info(f"Compressão {compressor.describe()}.")
+        if cpu is not None:
+            self.logg.info(f"{cpu.describe(total_sent)}.")
+        self._log_metrics(
+            file_path,
+            total_sent,
+            elapsed_time,
+            packet_count,
+            throughput,
+            buffer_size,
+            send_mode,
+            conn,
+            compressor,
+            cpu,
+        )
+
+    def _log_echo(self, total_echoed, elapsed_time, buffer_size, conn):
+        # Registra uma sessão do modo de requisição/resposta encerrada pelo
+        # cliente. As mensagens devolvidas entram no CSV como pacotes.
+        # @total_echoed - bytes devolvidos ao cliente
+        # @elapsed_time - duração da sessão
+        # @buffer_size - tamanho de cada mensagem
+        # @conn - socket do cliente
+        messages = total_echoed // buffer_size if buffer_size else 0
+        rate = messages / elapsed_time if elapsed_time else 0.0
+        throughput = 0.0
+        if elapsed_time:
+            throughput = total_echoed / elapsed_time / (1024 * 1024)  # MB/s
+        self.stats.add(total_echoed, elapsed_time)
+        self.logg.info(
+            f"Eco encerrado: {messages} mensagens de {buffer_size} bytes em "
+            f"{elapsed_time:.2f} segundos ({rate:.0f} requisições/s)."
+        )
+        self._log_metrics(
+            latency.ECHO_FILE,
+            total_echoed,
+            elapsed_time,
+            messages,
+            throughput,
+            buffer_size,
+            "echo",
+            conn,
+        )
+
+    def _serve_echo(self, conn, buffer_size):
+        # Modo de requisição/resposta: devolve ao cliente tudo o que ele envia,
+        # assim que chega, até o cliente encerrar a conexão. As mensagens têm
+        # tamanho fixo, por isso o servidor não precisa delimitá-las.
+        # @conn - socket do cliente
+        # @buffer_size - tamanho das mensagens do cliente
+        latency.nodelay(conn)
+        conn.sendall(format_reply(size=buffer_size))
+        self.logg.info(f"Modo de eco com mensagens de {buffer_size} bytes.")
+        view = memoryview(bytearray(latency.ECHO_BUFFER))
+        total_echoed = 0
+        start_time = time.time()
+        while size := conn.recv_into(view):
+            conn.sendall(view[:size])
+            total_echoed += size
+        self._log_echo(total_echoed, time.time() - start_time, buffer_size, conn)
+
+    def _send_copy(self, conn, file, buffer_size, length, count=None):
+        # Lê e envia o arquivo em blocos do tamanho do buffer especificado,
+        # copiando cada bloco pelo espaço de usuário
+        # @conn - socket do cliente
+        # @file - arquivo aberto, posicionado no primeiro byte a enviar
+        # @buffer_size - tamanho de cada bloco
+        # @length - número de bytes a enviar
+        # @count - contabiliza cada bloco na amostragem (None se desabilitada)
+        packet_count = 0
+        total_sent = 0
+        while total_sent < length and (
+            chunk := file.read(min(buffer_size, length - total_sent))
+        ):
+            conn.sendall(chunk)
+            packet_count += 1
+            total_sent += len(chunk)
+            if count is not None:
+                count(len(chunk))
+
+            if self.verbose:
+                self.logg.debug(
+                    f"Pacote {packet_count} enviado, tamanho: {len(chunk)} bytes"
+                )
+        return total_sent, packet_count
+
+    def _send_mapped(self, conn, file, buffer_size, offset, length, count=None):
+        # Envia fatias memoryview do arquivo mapeado em memória, sem ler o disco
+        # nem copiar os blocos para objetos bytes
+        # @conn - socket do cliente
+        # @file - arquivo mapeado (MappedFile)
+        # @buffer_size - tamanho de cada bloco
+        # @offset - primeiro byte a enviar
+        # @length - número de bytes a enviar
+        # @count - contabiliza cada bloco na amostragem (None se desabilitada)
+        view = file.view
+        end = offset + length
+        packet_count = 0
+        total_sent = 0
+        for start in range(offset, end, buffer_size):
+            chunk = view[start : min(start + buffer_size, end)]
+            conn.sendall(chunk)
+            packet_count += 1
+            total_sent += len(chunk)
+            if count is not None:
+                count(len(chunk))
+
+            if self.verbose:
+                self.logg.debug(
+                    f"Pacote {packet_count} enviado, tamanho: {len(chunk)} bytes"
+                )
+        return total_sent, packet_count
+
+    def _send_compressed(self, conn, compressor, buffer_size, count=None):
+        # Envia os bytes comprimidos da faixa pedida, lendo o arquivo em blocos
+        # do tamanho do buffer. Cada envio leva o que a compressão produziu
+        # para o bloco, por isso os pacotes têm tamanhos variados.
+        # @conn - socket do cliente
+        # @compressor - fonte comprimida (compression.StreamCompressor)
+        # @buffer_size - tamanho dos blocos lidos do arquivo
+        # @count - contabiliza cada envio na amostragem (None se desabilitada)
+        packet_count = 0
+        total_sent = 0
+        while chunk := compressor.read(buffer_size):
+            conn.sendall(chunk)
+            packet_count += 1
+            total_sent += len(chunk)
+            if count is not None:
+                count(len(chunk))
+
+            if self.verbose:
+                self.logg.debug(
+                    f"Pacote {packet_count} enviado, tamanho: {len(chunk)} bytes"
+                )
+        return total_sent, packet_count
+
+    def _send_mode(self, file_path):
+        # Modo de envio de um arquivo: arquivos sintéticos são sempre enviados
+        # pelo laço de cópia, cujo read() já devolve fatias do padrão sem cópia
+        # (não há descritor para o sendfile nem mapeamento para o mmap)
+        # @file_path - caminho do arquivo
+        return "gen" if synthetic.is_synthetic(file_path) else self.send_mode
+
+    def _open_source(self, file_path):
+        # Abre o arquivo a ser enviado: sintético, mapeado pelo cache no modo
+        # mmap, ou do disco nos demais modos
+        # @file_path - caminho do arquivo
+        if synthetic.is_synthetic(file_path):
+            return synthetic.open_source(file_path)
+        if self.cache is not None:
+            return self.cache.open(file_path)
+        return open(file_path, "rb")
+
+    def _send_sendfile(self, conn, file, buffer_size, offset, length, count=None):
+        # Envia o arquivo com os.sendfile, que copia do page cache direto para o
+        # socket sem passar pelo espaço de usuário. Cada chamada envia até
+        # @buffer_size bytes, para manter a granularidade comparável ao modo copy.
+        # Se o sendfile não for suportado, continua pelo laço de cópia.
+        # @conn - socket do cliente
+        # @file - arquivo aberto para leitura
+        # @buffer_size - tamanho máximo de cada chamada ao sendfile
+        # @offset - primeiro byte a enviar
+        # @length - número de bytes a enviar
+        # @count - contabiliza cada bloco na amostragem (None se desabilitada)
+        packet_count = 0
+        total_sent = 0
+        try:
+            out_fd, in_fd = conn.fileno(), file.fileno()
+            while total_sent < length and (
+                sent := os.sendfile(
+                    out_fd,
+                    in_fd,
+                    offset + total_sent,
+                    min(buffer_size, length - total_sent),
+                )
+            ):
+                packet_count += 1
+                total_sent += sent
+                if count is not None:
+                    count(sent)
+
+                if self.verbose:
+                    self.logg.debug(
+                        f"Pacote {packet_count} enviado, tamanho: {sent} bytes"
+                    )
+            return total_sent, packet_count, "sendfile"
+        except (AttributeError, OSError) as e:
+            if isinstance(e, OSError) and e.errno not in SENDFILE_UNSUPPORTED:
+                raise
+            self.logg.warning(f"sendfile indisponível ({e}), usando cópia.")
+
+        file.seek(offset + total_sent)
+        copied, copied_packets = self._send_copy(
+            conn, file, buffer_size, length - total_sent, count
+        )
+        return total_sent + copied, packet_count + copied_packets, "copy (fallback)"
+
     def _handle_client(self, conn):
+        # Atende um cliente nos motores sequential e threads, perfilando o
+        # atendimento no modo cprofile
+        # @conn - socket do cliente
+        with profiling.profiled(self.profiler):
+            self._serve_client(conn)
+
+    def _serve_client(self, conn):
         try:
             # Recebe informações do cliente: nome do arquivo e tamanho do buffer
-            file_info = conn.recv(1024).decode().split(",")
-            file_name, buffer_size = file_info[0], int(file_info[1])
-            file_path = "send_data/" + file_name  # Caminho do arquivo a ser enviado
+            file_path, buffer_size, options = self._parse_request(conn.recv(1024))
+            if options.get("mode") == "echo":
+                self._serve_echo(conn, buffer_size)
+                return
 
             # Verifica se o arquivo existe
-            if not os.path.isfile(file_path):
+            if not synthetic.exists(file_path):
                 self.logg.error(f"Arquivo '{file_path}' não encontrado.")
-                conn.sendall(b"ERROR: File not found.")
+                conn.sendall(b"ERROR: File not found.\n")
+                return
+            if options.get("mode") == "size":
+                conn.sendall(self._size_reply(file_path))
+                return
+
+            # Verifica a faixa de bytes pedida
+            byte_range = self._byte_range(file_path, options)
+            if byte_range is None:
+                self.logg.error(f"Faixa de bytes inválida pedida para '{file_path}'.")
+                conn.sendall(b"ERROR: Invalid range.\n")
                 return
 
             # Envia confirmação ao cliente informando que o servidor está pronto
-            conn.sendall(b"READY")
+            offset, length = byte_range
+            conn.sendall(
+                self._ready_reply(file_path, buffer_size, options, offset, length)
+            )
             self.logg.info(
-                f"Preparando para enviar '{file_path}' com buffer de {buffer_size} bytes."
+                f"Preparando para enviar {self._describe_range(file_path, offset, length)} "
+                f"com buffer de {buffer_size} bytes."
             )
 
             # Inicia a transferência do arquivo
             start_time = time.time()  # Marca o tempo de início da transferência
-            with open(file_path, "rb") as file:
-                packet_count = 0
-                total_sent = 0
-
-                # Lê e envia o arquivo em blocos do tamanho do buffer especificado
-                while chunk := file.read(buffer_size):
-                    conn.sendall(chunk)
-                    packet_count += 1
-                    total_sent += len(chunk)
-
-                    if self.verbose:
-                        self.logg.debug(
-                            f"Pacote {packet_count} enviado, tamanho: {len(chunk)} bytes"
-                        )
-
-            # Calcula o tempo total decorrido e a taxa de transferência
-            elapsed_time = time.time() - start_time
-            throughput = total_sent / elapsed_time / (1024 * 1024)  # MB/s
-            self.logg.info(
-                f"Arquivo '{file_path}' enviado em {elapsed_time:.2f} segundos. Taxa: {throughput:.2f} MB/s"
+            cpu = profiling.CpuUsage("thread")
+            send_mode = self._send_mode(file_path)
+            codec = compression.negotiate(options)
+            compressor = None
+            with self._open_source(file_path) as file, sampling.tracking(
+                self.sampler
+            ) as count:
+                if codec is not None:
+                    # A compressão lê o arquivo pelo laço de cópia
+                    file.seek(offset)
+                    compressor = compression.StreamCompressor(file, length, *codec)
+                    send_mode = codec[0]
+                    total_sent, packet_count = self._send_compressed(
+                        conn, compressor, buffer_size, count
+                    )
+                elif send_mode == "sendfile":
+                    total_sent, packet_count, send_mode = self._send_sendfile(
+                        conn, file, buffer_size, offset, length, count
+                    )
+                elif send_mode == "mmap":
+                    total_sent, packet_count = self._send_mapped(
+                        conn, file, buffer_size, offset, length, count
+                    )
+                else:
+                    file.seek(offset)
+                    total_sent, packet_count = self._send_copy(
+                        conn, file, buffer_size, length, count
+                    )
+
+            self._log_transfer(
+                file_path,
+                total_sent,
+                time.time() - start_time,
+                packet_count,
+                buffer_size,
+                send_mode,
+                conn,
+                compressor,
+                cpu.stop(),
             )
 
         except Exception as e:
@@ -73,24 +537,430 @@ class Server:
             conn.close()
             self.logg.info("Conexão encerrada.")
 
+    def _serve_sequential(self, sock):
+        # Atende um cliente por vez, na própria thread do accept()
+        while True:
+            conn, addr = sock.accept()  # Aguarda uma nova conexão
+            self.logg.info(f"Conexão aceita de {addr}")
+            tuning.apply(conn, self.tuning, sender=True)
+            self._handle_client(conn)
+
+    def _serve_threads(self, sock):
+        # Atende até @workers clientes simultâneos em um pool de threads.
+        # O semáforo impede que o pool acumule conexões além do seu tamanho:
+        # os clientes excedentes aguardam na fila do listen() (backlog).
+        slots = threading.BoundedSemaphore(self.workers)
+        with ThreadPoolExecutor(
+            max_workers=self.workers, thread_name_prefix="cliente"
+        ) as pool:
+            while True:
+                slots.acquire()
+                try:
+                    conn, addr = sock.accept()  # Aguarda uma nova conexão
+                except BaseException:
+                    slots.release()
+                    raise
+                self.logg.info(f"Conexão aceita de {addr}")
+                tuning.apply(conn, self.tuning, sender=True)
+                future = pool.submit(self._handle_client, conn)
+                future.add_done_callback(lambda _: slots.release())
+
+    def _serve_selectors(self, sock):
+        # Atende todos os clientes em uma única thread com sockets não
+        # bloqueantes e um laço de eventos (epoll/kqueue/select via selectors)
+        sel = selectors.DefaultSelector()
+        sock.setblocking(False)
+        sel.register(sock, selectors.EVENT_READ, None)
+        try:
+            while True:
+                for key, mask in sel.select():
+                    if key.data is None:
+                        self._accept_nonblocking(sel, sock)
+                    elif key.data.echo is not None:
+                        self._on_echo(sel, key.data)
+                    elif mask & selectors.EVENT_READ:
+                        self._on_request(sel, key.data)
+                    else:
+                        self._on_writable(sel, key.data)
+        finally:
+            sel.close()
+
+    def _accept_nonblocking(self, sel, sock):
+        # Aceita uma nova conexão e aguarda a requisição do cliente
+        # @sel - seletor do laço de eventos
+        # @sock - socket de escuta do servidor
+        try:
+            conn, addr = sock.accept()
+        except BlockingIOError:
+            return
+        self.logg.info(f"Conexão aceita de {addr}")
+        tuning.apply(conn, self.tuning, sender=True)
+        conn.setblocking(False)
+        sel.register(conn, selectors.EVENT_READ, _Transfer(conn))
+
+    def _on_request(self, sel, transfer):
+        # Lê a requisição do cliente e prepara o envio do arquivo
+        # @sel - seletor do laço de eventos
+        # @transfer - estado da transferência associada à conexão
+        conn = transfer.conn
+        try:
+            data = conn.recv(1024)
+            if not data:
+                self._close_transfer(sel, transfer)
+                return
+            file_path, buffer_size, options = self._parse_request(data)
+            if options.get("mode") == "echo":
+                self._start_echo(sel, transfer, buffer_size)
+                return
+
+            # Verifica se o arquivo existe
+            if not synthetic.exists(file_path):
+                self.logg.error(f"Arquivo '{file_path}' não encontrado.")
+                conn.send(b"ERROR: File not found.\n")
+                self._close_transfer(sel, transfer)
+                return
+            if options.get("mode") == "size":
+                conn.send(self._size_reply(file_path))
+                self._close_transfer(sel, transfer)
+                return
+
+            # Verifica a faixa de bytes pedida
+            byte_range = self._byte_range(file_path, options)
+            if byte_range is None:
+                self.logg.error(f"Faixa de bytes inválida pedida para '{file_path}'.")
+                conn.send(b"ERROR: Invalid range.\n")
+                self._close_transfer(sel, transfer)
+                return
+
+            offset, length = byte_range
+            transfer.file_path = file_path
+            transfer.buffer_size = buffer_size
+            transfer.offset = offset
+            transfer.length = length
+            transfer.file = self._open_source(file_path)
+            transfer.file.seek(offset)
+            transfer.send_mode = self._send_mode(file_path)
+            codec = compression.negotiate(options)
+            if codec is not None:
+                # A fonte comprimida substitui o arquivo e é fechada com ele
+                transfer.file = compression.StreamCompressor(
+                    transfer.file, length, *codec
+                )
+                transfer.compressor = transfer.file
+                transfer.send_mode = codec[0]
+            transfer.pending = memoryview(
+                self._ready_reply(file_path, buffer_size, options, offset, length)
+            )
+            transfer.start_time = time.time()  # Marca o início da transferência
+            # CPU da thread do laço, que atende também os outros clientes
+            transfer.cpu = profiling.CpuUsage("thread")
+            if self.sampler is not None:
+                transfer.counter = self.sampler.track()
+            self.logg.info(
+                f"Preparando para enviar {self._describe_range(file_path, offset, length)} "
+                f"com buffer de {buffer_size} bytes."
+            )
+            sel.modify(conn, selectors.EVENT_WRITE, transfer)
+        except Exception as e:
+            self.logg.error(f"Erro ao enviar o arquivo: {e}")
+            self._close_transfer(sel, transfer)
+
+    def _start_echo(self, sel, transfer, buffer_size):
+        # Passa a conexão para o modo de requisição/resposta: a confirmação de
+        # prontidão é enviada como a primeira resposta pendente
+        # @sel - seletor do laço de eventos
+        # @transfer - estado da conexão
+        # @buffer_size - tamanho das mensagens do cliente
+        latency.nodelay(transfer.conn)
+        transfer.file_path = latency.ECHO_FILE
+        transfer.buffer_size = buffer_size
+        transfer.echo = memoryview(bytearray(latency.ECHO_BUFFER))
+        transfer.pending = memoryview(format_reply(size=buffer_size))
+        transfer.send_mode = "echo"
+        transfer.start_time = time.time()
+        self.logg.info(f"Modo de eco com mensagens de {buffer_size} bytes.")
+        sel.modify(transfer.conn, selectors.EVENT_WRITE, transfer)
+
+    def _on_echo(self, sel, transfer):
+        # Modo de requisição/resposta no laço de eventos: termina de enviar a
+        # resposta pendente (aguardando a escrita) e então lê e devolve o que
+        # chegou (aguardando a leitura). O buffer só é reutilizado depois que a
+        # resposta anterior saiu inteira.
+        # @sel - seletor do laço de eventos
+        # @transfer - estado da conexão
+        conn = transfer.conn
+        try:
+            if not transfer.pending:
+                size = conn.recv_into(transfer.echo)
+                if not size:
+                    self._log_echo(
+                        transfer.total_sent,
+                        time.time() - transfer.start_time,
+                        transfer.buffer_size,
+                        conn,
+                    )
+                    self._close_transfer(sel, transfer)
+                    return
+                transfer.total_sent += size
+                transfer.pending = transfer.echo[:size]
+            sent = conn.send(transfer.pending)
+            transfer.pending = transfer.pending[sent:]
+        except BlockingIOError:
+            pass
+        except Exception as e:
+            self.logg.error(f"Erro no modo de eco: {e}")
+            self._close_transfer(sel, transfer)
+            return
+        events = selectors.EVENT_WRITE if transfer.pending else selectors.EVENT_READ
+        if sel.get_key(conn).events != events:
+            sel.modify(conn, events, transfer)
+
+    def _on_writable(self, sel, transfer):
+        # Envia o próximo bloco pendente da transferência. Cada evento envia no
+        # máximo um bloco, o que reveza o socket entre os clientes ativos.
+        # @sel - seletor do laço de eventos
+        # @transfer - estado da transferência associada à conexão
+        try:
+            if not transfer.pending and transfer.send_mode == "sendfile":
+                self._sendfile_nonblocking(sel, transfer)
+                return
+
+            if not transfer.pending:
+                if transfer.compressor is not None:
+                    # A fonte comprimida controla o fim da faixa
+                    chunk = transfer.file.read(transfer.buffer_size)
+                else:
+                    remaining = transfer.length - transfer.total_sent
+                    chunk = transfer.file.read(min(transfer.buffer_size, remaining))
+                if not chunk:
+                    self._finish_transfer(sel, transfer)
+                    return
+                transfer.pending = memoryview(chunk)
+                transfer.packet_count += 1
+                transfer.total_sent += len(chunk)
+                if transfer.counter is not None:
+                    transfer.counter.add(len(chunk))
+
+                if self.verbose:
+                    self.logg.debug(
+                        f"Pacote {transfer.packet_count} enviado, tamanho: {len(chunk)} bytes"
+                    )
+
+            sent = transfer.conn.send(transfer.pending)
+            transfer.pending = transfer.pending[sent:]
+        except BlockingIOError:
+            pass
+        except Exception as e:
+            self.logg.error(f"Erro ao enviar o arquivo: {e}")
+            self._close_transfer(sel, transfer)
+
+    def _sendfile_nonblocking(self, sel, transfer):
+        # Envia o próximo bloco com os.sendfile a partir do deslocamento atual.
+        # Se o sendfile não for suportado, a conexão passa para o modo de cópia.
+        # @sel - seletor do laço de eventos
+        # @transfer - estado da transferência associada à conexão
+        remaining = transfer.length - transfer.total_sent
+        if not remaining:
+            self._finish_transfer(sel, transfer)
+            return
+        try:
+            sent = os.sendfile(
+                transfer.conn.fileno(),
+                transfer.file.fileno(),
+                transfer.offset + transfer.total_sent,
+                min(transfer.buffer_size, remaining),
+            )
+        except BlockingIOError:
+            return
+        except (AttributeError, OSError) as e:
+            if isinstance(e, OSError) and e.errno not in SENDFILE_UNSUPPORTED:
+                raise
+            self.logg.warning(f"sendfile indisponível ({e}), usando cópia.")
+            transfer.send_mode = "copy (fallback)"
+            transfer.file.seek(transfer.offset + transfer.total_sent)
+            return
+
+        if not sent:
+            self._finish_transfer(sel, transfer)
+            return
+        transfer.packet_count += 1
+        transfer.total_sent += sent
+        if transfer.counter is not None:
+            transfer.counter.add(sent)
+
+        if self.verbose:
+            self.logg.debug(
+                f"Pacote {transfer.packet_count} enviado, tamanho: {sent} bytes"
+            )
+
+    def _finish_transfer(self, sel, transfer):
+        # Registra as métricas de uma transferência concluída e encerra a conexão
+        # @sel - seletor do laço de eventos
+        # @transfer - estado da transferência associada à conexão
+        self._log_transfer(
+            transfer.file_path,
+            transfer.total_sent,
+            time.time() - transfer.start_time,
+            transfer.packet_count,
+            transfer.buffer_size,
+            transfer.send_mode,
+            transfer.conn,
+            transfer.compressor,
+            transfer.cpu,
+        )
+        self._close_transfer(sel, transfer)
+
+    def _close_transfer(self, sel, transfer):
+        # Remove a conexão do laço de eventos e libera seus recursos
+        # @sel - seletor do laço de eventos
+        # @transfer - estado da transferência associada à conexão
+        sel.unregister(transfer.conn)
+        if transfer.counter is not None:
+            self.sampler.release(transfer.counter)
+        if transfer.file is not None:
+            transfer.file.close()
+        transfer.conn.close()
+        self.logg.info("Conexão encerrada.")
+
+    def _apply_tuning(self, sock):
+        # Aplica o perfil de ajuste ao socket de escuta e loga os valores efetivos
+        # @sock - socket de escuta do servidor
+        for failure in tuning.apply(sock, self.tuning, sender=True):
+            self.logg.warning(f"Opção de socket não aplicada: {failure}")
+        values = dict(zip(tuning.summary_header(), tuning.summary(self.tuning, sock)))
+        self.logg.info(f"Ajuste dos sockets: {values}")
+
+    def _start_sampler(self):
+        # Inicia a amostragem da taxa de envio, se pedida. No modo pré-fork,
+        # cada trabalhador amostra os seus clientes, identificado pelo PID.
+        if not self.sample_interval:
+            return
+        self.sampler = sampling.Sampler(
+            self.metrics,
+            "amostras_servidor_tcp",
+            self.sample_interval / 1000,
+            {"PID": os.getpid()},
+            self.live,
+        )
+        self.sampler.start()
+
+    def _start_profiler(self):
+        # Inicia o perfil do servidor, se pedido. No modo pré-fork, cada
+        # trabalhador grava o seu perfil, identificado pelo PID.
+        if self.profile is None:
+            return
+        path = self.profile_file or profiling.output_path(
+            self.profile, "servidor_tcp", self.metrics.directory, self.processes != 1
+        )
+        self.profiler = profiling.create_profiler(self.profile, path)
+
+    def _stop_profiler(self):
+        # Grava o perfil e loga as funções mais custosas
+        if self.profiler is None:
+            return
+        self.profiler.stop()
+        self.logg.info(
+            f"Perfil ({self.profile}) salvo em '{self.profiler.path}'.\n"
+            f"{self.profiler.report()}"
+        )
+
     def run(self):
-        # Inicia o servidor TCP e aguarda conexões de clientes
+        # Inicia o servidor TCP: em um único processo, ou em processos
+        # trabalhadores que compartilham a porta no modo pré-fork
         self._init_logging()
+        prefork.exit_on_sigterm()
+        if self.processes != 1:
+            prefork.run(self, "metricas_trabalhadores_tcp")
+        else:
+            self.serve()
+
+    def serve(self):
+        # Liga o socket do servidor e aguarda conexões de clientes
         with socket.socket(socket.AF_INET, socket.SOCK_STREAM) as sock:
             try:
+                # No modo pré-fork, cada trabalhador liga o seu socket à porta
+                if self.processes != 1:
+                    prefork.reuse_port(sock)
+
+                # Ajusta o socket antes do listen: as conexões aceitas herdam
+                # os buffers, e a janela do TCP é negociada com eles
+                self._apply_tuning(sock)
+
                 # Liga o servidor ao endereço e porta especificados
                 sock.bind((self.host, self.port))
-                sock.listen(5)  # Define o número máximo de conexões em espera
-                self.logg.info(f"Servidor ouvindo em {self.host}:{self.port}")
+                sock.listen(self.backlog)  # Número máximo de conexões em espera
+                self.logg.info(
+                    f"Servidor ouvindo em {self.host}:{self.port} (motor: {self.engine})"
+                )
+                self._start_sampler()
+                self._start_profiler()
 
-                while True:
-                    conn, addr = sock.accept()  # Aguarda uma nova conexão
-                    self.logg.info(f"Conexão aceita de {addr}")
-                    self._handle_client(conn)
+                if self.engine == "threads":
+                    self._serve_threads(sock)
+                elif self.engine == "selectors":
+                    # O laço de eventos atende todos os clientes: é perfilado
+                    # inteiro, e não por cliente
+                    with profiling.profiled(self.profiler):
+                        self._serve_selectors(sock)
+                else:
+                    self._serve_sequential(sock)
 
             except Exception as e:
                 # Captura e loga qualquer erro ocorrido durante a execução do servidor
                 self.logg.error(f"Erro no servidor: {e}")
+            finally:
+                if self.sampler is not None:
+                    self.sampler.stop()
+                self._stop_profiler()
+                if self.cache is not None:
+                    self.logg.info(
+                        f"Cache de arquivos mapeados: {self.cache.hits} acertos, "
+                        f"{self.cache.misses} faltas."
+                    )
+                if self.digests.time:
+                    self.logg.info(
+                        f"Tempo gasto calculando resumos: {self.digests.time:.3f} s."
+                    )
+                self.metrics.flush()
+
+
+class _Transfer:
+    # Estado de uma conexão atendida pelo motor selectors
+    __slots__ = (
+        "conn",
+        "file",
+        "file_path",
+        "buffer_size",
+        "offset",
+        "length",
+        "send_mode",
+        "pending",
+        "packet_count",
+        "total_sent",
+        "start_time",
+        "echo",
+        "counter",
+        "compressor",
+        "cpu",
+    )
+
+    def __init__(self, conn):
+        # @conn - socket não bloqueante do cliente
+        self.conn = conn
+        self.file = None
+        self.file_path = None
+        self.buffer_size = 0
+        self.offset = 0  # Faixa de bytes pedida pelo cliente
+        self.length = 0
+        self.send_mode = None
+        self.pending = None  # Bytes ainda não enviados do bloco atual
+        self.packet_count = 0
+        self.total_sent = 0
+        self.start_time = None
+        self.echo = None  # Buffer das mensagens, no modo de requisição/resposta
+        self.counter = None  # Contador da amostragem da taxa, se habilitada
+        self.compressor = None  # Fonte comprimida, se a compressão foi negociada
+        self.cpu = None  # CPU gasta desde o início do envio
 
 
 def parse_args(args):
@@ -100,16 +970,128 @@ def parse_args(args):
     parser = argparse.ArgumentParser(description="Servidor TCP - Envio de Arquivo")
     parser.add_argument("--host", required=True, type=str, help="Endereço IP do host")
     parser.add_argument("--port", required=True, type=int, help="Número da porta")
+    parser.add_argument(
+        "--engine",
+        choices=ENGINES,
+        default="sequential",
+        help="Motor de concorrência para atender os clientes",
+    )
+    parser.add_argument(
+        "--workers",
+        type=int,
+        default=8,
+        help="Número de clientes atendidos simultaneamente (motor threads)",
+    )
+    parser.add_argument(
+        "--backlog",
+        type=int,
+        default=128,
+        help="Tamanho da fila de conexões pendentes",
+    )
+    parser.add_argument(
+        "--send-mode",
+        choices=SEND_MODES,
+        default="copy",
+        help="Modo de envio: cópia pelo espaço de usuário, sendfile (cópia zero) ou "
+        "fatias de arquivos mapeados em memória (mmap), mantidos em cache",
+    )
+    parser.add_argument(
+        "--cache-size",
+        type=int,
+        default=DEFAULT_CACHE_MB,
+        help="Capacidade do cache de arquivos mapeados em MB (modo mmap)",
+    )
+    parser.add_argument(
+        "--tuning",
+        choices=list(tuning.PROFILES),
+        default="default",
+        help="Perfil de ajuste dos sockets: valores do sistema (default), buffers "
+        "grandes e TCP_CORK (throughput) ou TCP_NODELAY e busy polling (low-latency)",
+    )
+    parser.add_argument(
+        "--processes",
+        type=int,
+        default=1,
+        help="Processos trabalhadores, cada um com o seu socket na mesma porta "
+        "(SO_REUSEPORT); 0 cria um por núcleo",
+    )
+    parser.add_argument(
+        "--metrics-format",
+        nargs="+",
+        choices=metrics.FORMATS,
+        default=["csv"],
+        help="Formatos dos arquivos de métricas: CSV, JSON Lines e/ou colunar binário",
+    )
+    parser.add_argument(
+        "--metrics-dir",
+        default=".",
+        help="Diretório dos arquivos de métricas",
+    )
+    parser.add_argument(
+        "--sample",
+        type=int,
+        nargs="?",
+        const=sampling.DEFAULT_INTERVAL_MS,
+        default=0,
+        metavar="MS",
+        help="Amostrar a taxa de envio a cada N ms (100 por padrão) e gravar a "
+        "série em amostras_servidor_tcp",
+    )
+    parser.add_argument(
+        "--live",
+        action="store_true",
+        help="Exibir a taxa amostrada ao vivo no terminal (implica --sample)",
+    )
     parser.add_argument(
         "-v", "--verbose", action="store_true", help="Ativar log detalhado dos pacotes"
     )
-    return parser.parse_args(args)
+    parser.add_argument(
+        "--profile",
+        choices=profiling.MODES,
+        help="Perfilar o servidor até o encerramento: cProfile (todas as chamadas, "
+        "com custo alto) ou amostragem das pilhas de todas as threads (custo baixo)",
+    )
+    parser.add_argument(
+        "--profile-file",
+        help="Arquivo do perfil (padrão: perfil_servidor_tcp.prof ou .txt no "
+        "diretório das métricas, com o PID no modo pré-fork)",
+    )
+    parsed = parser.parse_args(args)
+    if parsed.processes < 0:
+        parser.error("--processes não pode ser negativo (0 cria um por núcleo)")
+    if parsed.workers < 1:
+        parser.error("--workers deve ser pelo menos 1")
+    if parsed.live and not parsed.sample:
+        parsed.sample = sampling.DEFAULT_INTERVAL_MS
+    return parsed
+
+
+def create_server(args):
+    # Cria o servidor a partir dos argumentos já analisados por parse_args
+    return Server(
+        args.host,
+        args.port,
+        args.verbose,
+        args.engine,
+        args.workers,
+        args.backlog,
+        args.send_mode,
+        args.cache_size,
+        args.tuning,
+        args.processes,
+        args.metrics_format,
+        args.metrics_dir,
+        args.sample,
+        args.live,
+        args.profile,
+        args.profile_file,
+    )
 
 
 def main():
     # Função principal que inicializa o servidor com os argumentos fornecidos
     args = parse_args(sys.argv[1:])
-    server = Server(args.host, args.port, args.verbose)
+    server = create_server(args)
     server.run()
 
 
@@ -0,0 +1,86 @@
+import socket
+import sys
+
+# Perfis de ajuste dos sockets, aplicados igualmente nos quatro scripts:
+#   default     - mantém os valores do sistema
+#   throughput  - buffers de envio/recepção grandes e, no envio TCP, TCP_CORK
+#                 (o kernel só transmite segmentos cheios)
+#   low-latency - TCP_NODELAY (sem Nagle) e busy polling na recepção
+# Os valores pedidos são limites: o kernel pode dobrá-los (Linux) ou
+# reduzi-los (net.core.wmem_max/rmem_max), por isso os valores efetivos são
+# lidos de volta e registrados nas métricas.
+PROFILES = {
+    "default": {},
+    "throughput": {"sndbuf": 4 * 1024 * 1024, "rcvbuf": 4 * 1024 * 1024, "cork": 1},
+    "low-latency": {"nodelay": 1, "busy_poll": 50},
+}
+
+# SO_BUSY_POLL não é exportado pelo módulo socket; 46 é o valor do Linux
+SO_BUSY_POLL = getattr(socket, "SO_BUSY_POLL", 46 if sys.platform == "linux" else None)
+
+# Opções de cada perfil: (nome, nível, opção, apenas TCP, apenas no envio)
+OPTIONS = {
+    "sndbuf": ("SO_SNDBUF", socket.SOL_SOCKET, socket.SO_SNDBUF, False, False),
+    "rcvbuf": ("SO_RCVBUF", socket.SOL_SOCKET, socket.SO_RCVBUF, False, False),
+    "nodelay": ("TCP_NODELAY", socket.IPPROTO_TCP, socket.TCP_NODELAY, True, False),
+    "cork": (
+        "TCP_CORK",
+        socket.IPPROTO_TCP,
+        getattr(socket, "TCP_CORK", None),
+        True,
+        True,
+    ),
+    "busy_poll": ("SO_BUSY_POLL", socket.SOL_SOCKET, SO_BUSY_POLL, False, False),
+}
+
+
+def apply(sock, profile, sender=False):
+    # Aplica as opções do perfil ao socket. Deve ser chamada antes do
+    # connect/listen, para que o TCP negocie a janela com os buffers novos.
+    # Retorna a lista de opções recusadas pelo sistema, como "NOME (erro)".
+    # @sock - socket a ajustar
+    # @profile - nome do perfil (chave de PROFILES)
+    # @sender - o socket envia o arquivo (TCP_CORK atrasaria as requisições)
+    is_tcp = sock.type == socket.SOCK_STREAM
+    failures = []
+    for key, value in PROFILES[profile].items():
+        name, level, option, tcp_only, sender_only = OPTIONS[key]
+        if (tcp_only and not is_tcp) or (sender_only and not sender):
+            continue
+        if option is None:
+            failures.append(f"{name} (indisponível)")
+            continue
+        try:
+            sock.setsockopt(level, option, value)
+        except OSError as e:
+            failures.append(f"{name} ({e.strerror})")
+    return failures
+
+
+def effective(sock):
+    # Lê do kernel os valores em vigor das opções de ajuste. Opções que não
+    # se aplicam ao tipo de socket ficam vazias.
+    # @sock - socket ajustado
+    is_tcp = sock.type == socket.SOCK_STREAM
+    values = []
+    for name, level, option, tcp_only, _ in OPTIONS.values():
+        if option is None or (tcp_only and not is_tcp):
+            values.append("")
+            continue
+        try:
+            values.append(sock.getsockopt(level, option))
+        except OSError:
+            values.append("")
+    return values
+
+
+def summary_header():
+    # Colunas do ajuste dos sockets acrescentadas ao CSV de métricas
+    return ["Perfil de Ajuste"] + [f"{name} Efetivo" for name, *_ in OPTIONS.values()]
+
+
+def summary(profile, sock):
+    # Valores das colunas de summary_header para um socket ajustado
+    # @profile - nome do perfil aplicado
+    # @sock - socket ajustado
+    return [profile] + effective(sock)
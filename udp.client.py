@@ -2,23 +2,136 @@ import socket
 import logging
 import sys
 import time
-import csv
 import os
+from concurrent.futures import ThreadPoolExecutor
+from contextlib import nullcontext
+from datetime import datetime
+
+import batchio
+import compression
+import integrity
+import latency
+import metrics
+import profiling
+import rudp
+import sampling
+import synthetic
+import tuning
+import writeback
+from histogram import ArrivalHistogram, summary_header
+from protocol import format_request, parse_reply
 
 
 class Client:
-    def __init__(self, host, port, buffer_size, file_name, verbose):
+    def __init__(
+        self,
+        host,
+        port,
+        buffer_size,
+        file_name,
+        verbose,
+        recv_into=False,
+        output=None,
+        reliable=False,
+        histogram=None,
+        io="single",
+        batch=32,
+        tuning_profile="default",
+        checksum=None,
+        requests=0,
+        pipeline=1,
+        concurrency=1,
+        metrics_formats=("csv",),
+        metrics_dir=".",
+        sample_interval=0,
+        live=False,
+        verify_pattern=False,
+        write_mode="direct",
+        write_queue=writeback.DEFAULT_QUEUE_MB,
+        fsync=False,
+        compress=None,
+        compress_level=None,
+        profile=None,
+        profile_file=None,
+    ):
         # Inicializa o cliente com os parâmetros fornecidos
         # @host - endereço IP do servidor
         # @port - número da porta do servidor
         # @buffer_size - tamanho do buffer utilizado na recepção de pacotes
         # @file_name - nome do arquivo a ser solicitado ao servidor
         # @verbose - nível de detalhamento do log (True para log detalhado)
+        # @recv_into - recebe em um buffer pré-alocado, sem alocar bytes por pacote
+        # @output - caminho onde gravar os dados recebidos (None descarta os dados)
+        # @histogram - arquivo CSV do histograma de intervalos entre chegadas
+        #              (None desabilita a instrumentação por pacote)
+        # @reliable - usa o modo confiável (sequência, ACKs e retransmissão)
+        # @io - recepção no modo sem confirmação (single, mmsg ou gro)
+        # @batch - datagramas por chamada de sistema na recepção em lote
+        # @tuning_profile - perfil de ajuste do socket (tuning.PROFILES)
+        # @checksum - algoritmo do resumo verificado (None não verifica)
+        # @requests - requisições por socket no modo de requisição/resposta,
+        #             em que buffer_size é o tamanho das mensagens (0: baixa o
+        #             arquivo)
+        # @pipeline - mensagens sem resposta permitidas por socket
+        # @concurrency - sockets simultâneos no modo de requisição/resposta
+        # @metrics_formats - formatos dos arquivos de métricas (metrics.FORMATS)
+        # @metrics_dir - diretório dos arquivos de métricas
+        # @sample_interval - intervalo da amostragem da taxa durante a
+        #                    transferência, em ms (0 desabilita)
+        # @live - exibe a taxa amostrada ao vivo no terminal
+        # @verify_pattern - confere os blocos de um arquivo sintético (gen:)
+        #                   contra o padrão, sem gravá-los
+        # @write_mode - gravação da saída na recepção (direct) ou em uma thread
+        #               à parte (behind) (writeback.WRITE_MODES)
+        # @write_queue - tamanho máximo da fila do modo behind, em MB
+        # @fsync - sincroniza a saída com o disco antes de medir o fim a fim
+        # @compress - algoritmo de compressão pedido ao servidor, bloco a bloco
+        #             (compression.ALGORITHMS; None recebe sem compressão)
+        # @compress_level - nível de compressão (None usa o padrão do algoritmo)
+        # @profile - perfila a execução (profiling.MODES; None desabilita)
+        # @profile_file - arquivo do perfil (None usa o nome padrão)
         self.host = host
         self.port = port
         self.buffer_size = buffer_size
         self.file_name = file_name
         self.verbose = verbose
+        self.recv_into = recv_into
+        self.output = output
+        self.reliable = reliable
+        self.window = None  # Janela anunciada ao servidor no modo confiável
+        self.histogram_path = histogram
+        self.histogram = None  # Intervalos entre chegadas, se habilitado
+        self.io = io
+        self.batch = batch
+        self.io_mode = "single"  # Modo de recepção efetivamente utilizado
+        self.recv_calls = 0  # Chamadas de sistema de recepção de dados
+        self.short_datagrams = 0  # Datagramas menores que o cabeçalho, descartados
+        self.report_every = 0  # Blocos entre relatórios pedidos pelo servidor
+        self.tuning = tuning_profile
+        self.socket_info = None  # Ajuste efetivo do socket
+        self.checksum = checksum
+        self.verifier = None  # Verificação do CRC (ou do padrão) de cada bloco
+        self.verify_pattern = verify_pattern
+        self.write_mode = write_mode
+        self.write_queue = write_queue
+        self.fsync = fsync
+        self.writer = None  # Gravação da saída, se pedida
+        self.compress = compress
+        self.compress_level = compress_level
+        self.profile = profile
+        self.profile_file = profile_file
+        self.profiler = None  # Perfil da execução, se pedido
+        self.cpu = None  # CPU gasta na transferência
+        self.decoder = None  # Decodificação dos blocos, se confirmada pelo servidor
+        self.verification = None  # Resultado da verificação de integridade
+        self.requests = requests
+        self.pipeline = max(pipeline, 1)
+        self.concurrency = max(concurrency, 1)
+        self.metrics = metrics.Metrics(metrics_formats, metrics_dir)
+        self.sample_interval = sample_interval
+        self.live = live
+        self.sampler = None  # Amostragem da taxa, se habilitada
+        self.counter = None  # Contador dos blocos recebidos, para a amostragem
         self.logg = logging.getLogger("CLIENTE_UDP")
 
     def _init_logging(self):
@@ -27,62 +140,626 @@ class Client:
         logging.basicConfig(level=level)
         self.logg.info(f"Cliente UDP conectando a {self.host}:{self.port}")
 
-    def _log_metrics_to_csv(
-        self, total_received, elapsed_time, packet_count, throughput, actual_file_size
+    def _log_metrics(
+        self,
+        total_received,
+        elapsed_time,
+        packet_count,
+        throughput,
+        actual_file_size,
+        expected_packets,
+        out_of_order=0,
+        duplicates=0,
     ):
-        # Salva métricas da transferência em um arquivo CSV
+        # Registra as métricas da transferência no pipeline de métricas
         # @total_received - total de bytes recebidos durante a transferência
-        # @elapsed_time - tempo total decorrido para a transferência
-        # @packet_count - número de pacotes recebidos
+        # @elapsed_time - tempo entre o primeiro e o último byte recebido
+        # @packet_count - número de pacotes recebidos (sem duplicados)
         # @throughput - taxa de transferência em MB/s
-        # @actual_file_size - tamanho esperado do arquivo
-        csv_file = "metricas_udp.csv"
-        file_exists = os.path.isfile(csv_file)
-
-        # Calcular bytes perdidos
-        bytes_lost = actual_file_size - total_received
-        integridade = "Aprovada" if bytes_lost == 0 else "Falhou"
-
-        header = [
-            "Total de Bytes Recebidos",
-            "Tempo Decorrido (s)",
-            "Número de Pacotes",
-            "Taxa de Transferência (MB/s)",
-            "Tamanho Esperado (bytes)",
-            "Bytes Perdidos",
-            "Integridade dos Dados",
-            "Tamanho do Buffer (bytes)",
-        ]
-
-        row = [
+        # @actual_file_size - tamanho do arquivo anunciado pelo servidor
+        # @expected_packets - número de blocos anunciado pelo servidor
+        # @out_of_order - pacotes que chegaram depois de um pacote posterior
+        # @duplicates - pacotes recebidos mais de uma vez
+        row = metrics.reception_row(
             total_received,
-            round(elapsed_time, 2),
+            elapsed_time,
             packet_count,
-            round(throughput, 2),
+            throughput,
             actual_file_size,
-            bytes_lost,
-            integridade,
+            expected_packets,
             self.buffer_size,
-        ]
+            out_of_order,
+            duplicates,
+            self.verification,
+        )
+        row.add(
+            ["Modo de E/S", "Chamadas de Recepção", "Datagramas Curtos"],
+            [self.io_mode, self.recv_calls, self.short_datagrams],
+        )
+        row.section(summary_header(), self.histogram)
+        row.add(tuning.summary_header(), self.socket_info)
+        row.section(
+            integrity.summary_header(), self.verification, total_received, elapsed_time
+        )
+        row.section(writeback.summary_header(), self.writer)
+        row.section(compression.summary_header(), self.decoder)
+        row.section(profiling.summary_header(), self.cpu, total_received)
+        self.metrics.add_row("metricas_udp", row)
+        if self.histogram is not None:
+            self.histogram.export(
+                self.histogram_path,
+                {
+                    "Arquivo": self.file_name,
+                    "Tamanho do Buffer (bytes)": self.buffer_size,
+                    "Execução": datetime.now().isoformat(timespec="milliseconds"),
+                },
+            )
+            self.logg.info(f"Histograma salvo no arquivo CSV '{self.histogram_path}'.")
+        if self.cpu is not None:
+            self.logg.info(f"{self.cpu.describe(total_received)}.")
+        self.logg.info(f"Integridade dos dados: {row.value('Integridade dos Dados')}")
+        self.logg.info(f"Bytes perdidos: {row.value('Bytes Perdidos')}")
+
+    def _save_metrics(self):
+        # Grava as métricas registradas e informa os arquivos gravados
+        for path in self.metrics.flush():
+            self.logg.info(f"Métricas salvas no arquivo '{path}'.")
+
+    def _start_sampler(self):
+        # Inicia a amostragem da taxa durante a transferência, se pedida. São
+        # contados os blocos aceitos (sem duplicados nem corrompidos).
+        if not self.sample_interval:
+            return
+        self.sampler = sampling.Sampler(
+            self.metrics,
+            "amostras_udp",
+            self.sample_interval / 1000,
+            {"Arquivo": self.file_name, "Tamanho do Buffer (bytes)": self.buffer_size},
+            self.live,
+        )
+        self.counter = self.sampler.track()
+        self.sampler.start()
+
+    def _stop_sampler(self):
+        # Registra o último intervalo amostrado e encerra a amostragem
+        if self.sampler is not None:
+            self.sampler.stop()
+
+    def _open_output(self, size):
+        # Abre o arquivo de saída, ou um contexto vazio se os dados forem descartados
+        # @size - tamanho anunciado pelo servidor, pré-alocado
+        if self.output is None:
+            return nullcontext()
+        self.writer = writeback.open_output(
+            self.output, self.write_mode, size, self.write_queue, self.fsync
+        )
+        return self.writer
+
+    def _log_writer(self):
+        # Loga a gravação da saída, com a taxa fim a fim (até os dados gravados)
+        if self.writer is None:
+            return
+        writer = self.writer
+        *_, elapsed, rate = writer.summary()
+        self.logg.info(
+            f"Saída gravada ({writer.mode}) em {elapsed:.2f} segundos. Taxa fim a "
+            f"fim: {rate:.2f} MB/s. Escritas: {writer.writes}, espera por fila "
+            f"cheia: {writer.stall_time:.3f} s, sincronização: {writer.sync_time:.3f} s."
+        )
+
+    def _header_size(self):
+        # Bytes antes dos dados em cada datagrama DATA: o cabeçalho e, com
+        # verificação, o CRC32 do bloco
+        if isinstance(self.verifier, integrity.ChunkVerifier):
+            return rudp.CHECKED_HEADER_SIZE
+        return rudp.HEADER.size
+
+    def _payload_size(self):
+        # Maior número de bytes após o cabeçalho de um datagrama DATA: o bloco
+        # e, com compressão, o indicador que o precede
+        if self.decoder is not None:
+            return self.buffer_size + compression.BLOCK_OVERHEAD
+        return self.buffer_size
+
+    def _receive_copy(self, sock, out, tracker):
+        # Recebe datagramas numerados até o FIN do servidor (ou o timeout, se
+        # houve perdas), alocando um novo objeto bytes a cada datagrama.
+        # Retorna (bytes, pacotes, instante do primeiro byte, do último byte).
+        # Com compressão, os bytes contados e gravados são os já decodificados.
+        # @sock - socket utilizado para a comunicação
+        # @out - arquivo de saída (None descarta os dados)
+        # @tracker - contabilidade de perdas, duplicados e reordenação
+        header_size = self._header_size()
+        payload_size = self._payload_size()
+        total_received = 0
+        packet_count = 0
+        next_seq = 0  # Bloco que segue o último gravado na saída
+        first_byte = last_byte = None
+        # Instrumentação por pacote: com o histograma desabilitado, custa um teste
+        arrival = self.histogram.arrival if self.histogram else None
+        check = self.verifier.check if self.verifier else None
+        count = self.counter.add if self.counter else None
+        decode = self.decoder.decode if self.decoder else None
+        while tracker.missing:
+            try:
+                # Receber dados do servidor
+                data, _ = sock.recvfrom(header_size + payload_size)
+            except socket.timeout:
+                # Se o timeout for atingido, os blocos restantes foram perdidos
+                self.logg.info("Timeout atingido. Transferência concluída.")
+                break
+            self.recv_calls += 1
+            if len(data) < header_size and not rudp.is_kind(data, rudp.FIN):
+                self.short_datagrams += 1
+                continue  # Datagrama curto: descartado como perdido
+            kind, seq = rudp.HEADER.unpack_from(data)
+            if kind == rudp.FIN:
+                break  # Fim da transferência
+            last_byte = time.perf_counter()
+            if first_byte is None:
+                first_byte = last_byte
+            if arrival is not None:
+                arrival(last_byte)
+            if check is not None and not check(seq, data):
+                continue  # Bloco corrompido: descartado como perdido
+            if not tracker.on_data(seq):
+                continue
+            if self.report_every and not tracker.missing % self.report_every:
+                sock.sendto(tracker.report_packet(), (self.host, self.port))
+
+            block = memoryview(data)[header_size:]
+            if decode is not None:
+                block = decode(block)
+            size = len(block)
+            total_received += size
+            packet_count += 1
+            if count is not None:
+                count(size)
+            if out is not None:
+                if seq != next_seq:
+                    out.seek(seq * self.buffer_size)
+                out.write(block)
+                next_seq = seq + 1
+
+            if self.verbose:
+                self.logg.debug(f"Pacote {seq}: {size} bytes recebidos.")
+        return total_received, packet_count, first_byte, last_byte
+
+    def _receive_into(self, sock, out, tracker):
+        # Recebe datagramas numerados diretamente em um buffer pré-alocado com
+        # recvfrom_into, reutilizado em todas as chamadas. Retorna os mesmos
+        # valores de _receive_copy.
+        # @sock - socket utilizado para a comunicação
+        # @out - arquivo de saída (None descarta os dados)
+        # @tracker - contabilidade de perdas, duplicados e reordenação
+        header_size = self._header_size()
+        view = memoryview(bytearray(header_size + self._payload_size()))
+        payload = view[header_size:]
+        total_received = 0
+        packet_count = 0
+        next_seq = 0  # Bloco que segue o último gravado na saída
+        first_byte = last_byte = None
+        arrival = self.histogram.arrival if self.histogram else None
+        check = self.verifier.check if self.verifier else None
+        count = self.counter.add if self.counter else None
+        decode = self.decoder.decode if self.decoder else None
+        while tracker.missing:
+            try:
+                size, _ = sock.recvfrom_into(view)
+            except socket.timeout:
+                # Se o timeout for atingido, os blocos restantes foram perdidos
+                self.logg.info("Timeout atingido. Transferência concluída.")
+                break
+            self.recv_calls += 1
+            if size < header_size and not rudp.is_kind(view[:size], rudp.FIN):
+                self.short_datagrams += 1
+                continue  # Datagrama curto: descartado como perdido
+            kind, seq = rudp.HEADER.unpack_from(view)
+            if kind == rudp.FIN:
+                break  # Fim da transferência
+            last_byte = time.perf_counter()
+            if first_byte is None:
+                first_byte = last_byte
+            if arrival is not None:
+                arrival(last_byte)
+            if check is not None and not check(seq, view[:size]):
+                continue  # Bloco corrompido: descartado como perdido
+            if not tracker.on_data(seq):
+                continue
+            if self.report_every and not tracker.missing % self.report_every:
+                sock.sendto(tracker.report_packet(), (self.host, self.port))
+
+            block = payload[: size - header_size]
+            if decode is not None:
+                block = decode(block)
+            size = len(block)
+            total_received += size
+            packet_count += 1
+            if count is not None:
+                count(size)
+            if out is not None:
+                if seq != next_seq:
+                    out.seek(seq * self.buffer_size)
+                out.write(block)
+                next_seq = seq + 1
+
+            if self.verbose:
+                self.logg.debug(f"Pacote {seq}: {size} bytes recebidos.")
+        return total_received, packet_count, first_byte, last_byte
+
+    def _receive_batched(self, sock, out, tracker):
+        # Recebe os datagramas numerados em lotes (recvmmsg ou UDP_GRO), vários
+        # por chamada de sistema, direto nas fatias de um buffer pré-alocado.
+        # Os pacotes de um mesmo lote recebem o mesmo instante de chegada.
+        # Retorna os mesmos valores de _receive_copy.
+        # @sock - socket utilizado para a comunicação
+        # @out - arquivo de saída (None descarta os dados)
+        # @tracker - contabilidade de perdas, duplicados e reordenação
+        header_size = self._header_size()
+        receiver = batchio.open_receiver(
+            sock, header_size + self._payload_size(), self.io, self.batch
+        )
+        self.io_mode = receiver.mode
+        self.logg.info(f"Recepção em lote: {receiver.mode}.")
+        total_received = 0
+        packet_count = 0
+        next_seq = 0  # Bloco que segue o último gravado na saída
+        first_byte = last_byte = None
+        arrival = self.histogram.arrival if self.histogram else None
+        check = self.verifier.check if self.verifier else None
+        count = self.counter.add if self.counter else None
+        decode = self.decoder.decode if self.decoder else None
+        finished = False
+        while tracker.missing and not finished:
+            try:
+                datagrams = receiver.receive()
+            except socket.timeout:
+                # Se o timeout for atingido, os blocos restantes foram perdidos
+                self.logg.info("Timeout atingido. Transferência concluída.")
+                break
+            now = time.perf_counter()
+            for datagram in datagrams:
+                if len(datagram) < header_size and not rudp.is_kind(
+                    datagram, rudp.FIN
+                ):
+                    self.short_datagrams += 1
+                    continue  # Datagrama curto: descartado como perdido
+                kind, seq = rudp.HEADER.unpack_from(datagram)
+                if kind == rudp.FIN:
+                    finished = True  # Fim da transferência
+                    break
+                last_byte = now
+                if first_byte is None:
+                    first_byte = now
+                if arrival is not None:
+                    arrival(now)
+                if check is not None and not check(seq, datagram):
+                    continue  # Bloco corrompido: descartado como perdido
+                if not tracker.on_data(seq):
+                    continue
+                if self.report_every and not tracker.missing % self.report_every:
+                    sock.sendto(tracker.report_packet(), (self.host, self.port))
+
+                block = datagram[header_size:]
+                if decode is not None:
+                    block = decode(block)
+                size = len(block)
+                total_received += size
+                packet_count += 1
+                if count is not None:
+                    count(size)
+                if out is not None:
+                    if seq != next_seq:
+                        out.seek(seq * self.buffer_size)
+                    out.write(block)
+                    next_seq = seq + 1
+
+                if self.verbose:
+                    self.logg.debug(f"Pacote {seq}: {size} bytes recebidos.")
+        self.recv_calls = receiver.calls
+        return total_received, packet_count, first_byte, last_byte
+
+    def _receive_reliable(self, sock, out, receiver):
+        # Recebe os blocos numerados do modo confiável, confirmando-os com ACKs
+        # seletivos, até o FIN do servidor. Blocos fora de ordem são gravados na
+        # posição correspondente do arquivo de saída. Retorna os mesmos
+        # valores de _receive_copy.
+        # @sock - socket utilizado para a comunicação
+        # @out - arquivo de saída (None descarta os dados)
+        # @receiver - estado do receptor confiável
+        server_addr = (self.host, self.port)
+        header_size = self._header_size()
+        view = memoryview(bytearray(header_size + self._payload_size()))
+        payload = view[header_size:]
+        total_received = 0
+        packet_count = 0
+        next_seq = 0  # Bloco que segue o último gravado na saída
+        first_byte = last_byte = None
+        arrival = self.histogram.arrival if self.histogram else None
+        check = self.verifier.check if self.verifier else None
+        count = self.counter.add if self.counter else None
+        decode = self.decoder.decode if self.decoder else None
+        idle = 0.0
+
+        sock.settimeout(rudp.ACK_DELAY)
+        while True:
+            try:
+                size, _ = sock.recvfrom_into(view)
+            except socket.timeout:
+                # Sem dados: repete o último ACK para destravar o servidor
+                idle += rudp.ACK_DELAY
+                if idle >= rudp.IDLE_TIMEOUT:
+                    self.logg.error(
+                        "Servidor parou de responder. Transferência incompleta."
+                    )
+                    break
+                sock.sendto(receiver.ack_packet(), server_addr)
+                continue
 
-        with open(csv_file, mode="a", newline="") as file:
-            writer = csv.writer(file)
-            if not file_exists:
-                writer.writerow(
-                    header
-                )  # Escreve o cabeçalho apenas se o arquivo não existir
-            writer.writerow(row)
+            idle = 0.0
+            self.recv_calls += 1
+            if size < header_size and not rudp.is_kind(view[:size], rudp.FIN):
+                self.short_datagrams += 1
+                continue  # Datagrama curto: descartado como perdido
+            kind, seq = rudp.HEADER.unpack_from(view)
 
-        self.logg.info(f"Métricas salvas no arquivo CSV '{csv_file}'.")
-        self.logg.info(f"Integridade dos dados: {integridade}")
-        self.logg.info(f"Bytes perdidos: {bytes_lost}")
+            if kind == rudp.DATA:
+                last_byte = time.perf_counter()
+                if first_byte is None:
+                    first_byte = last_byte
+                if arrival is not None:
+                    arrival(last_byte)
+                # Um bloco corrompido não é confirmado, e o servidor o retransmite
+                if (check is None or check(seq, view[:size])) and receiver.on_data(
+                    seq
+                ):
+                    block = payload[: size - header_size]
+                    if decode is not None:
+                        block = decode(block)
+                    data_size = len(block)
+                    total_received += data_size
+                    packet_count += 1
+                    if count is not None:
+                        count(data_size)
+                    if out is not None:
+                        if seq != next_seq:
+                            out.seek(seq * self.buffer_size)
+                        out.write(block)
+                        next_seq = seq + 1
+
+                    if self.verbose:
+                        self.logg.debug(f"Pacote {seq}: {data_size} bytes recebidos.")
+                if receiver.should_ack():
+                    sock.sendto(receiver.ack_packet(), server_addr)
+
+            elif kind == rudp.FIN:
+                sock.sendto(rudp.pack(rudp.FIN_ACK, seq), server_addr)
+                if receiver.complete(seq):
+                    break
+
+        return total_received, packet_count, first_byte, last_byte
+
+    def _verify(self, expected):
+        # Confere o resumo do arquivo calculado a partir dos CRCs dos blocos
+        # recebidos e loga as faixas de bytes dos blocos corrompidos
+        # @expected - resumo anunciado pelo servidor
+        verifier = self.verifier
+        self.verification = integrity.Verification(
+            self.checksum,
+            expected,
+            verifier.hexdigest(self.checksum),
+            verifier.time,
+            len(verifier.corrupted),
+        )
+        for start, end in verifier.corrupted_ranges(self.buffer_size):
+            self.logg.error(f"Blocos corrompidos nos bytes {start} a {end - 1}.")
+        if self.verification.passed:
+            self.logg.info(
+                f"Resumo {self.checksum} conferido ({self.verification.calculated}), "
+                f"verificação em {verifier.time:.3f} segundos."
+            )
+        else:
+            self.logg.error(
+                f"Resumo {self.checksum} divergente: esperado {expected}, calculado "
+                f"{self.verification.calculated} ({len(verifier.corrupted)} blocos "
+                "corrompidos)."
+            )
+
+    def _verify_pattern(self, expected_size):
+        # Registra a conferência dos blocos de um arquivo sintético contra o
+        # padrão e loga as posições dos blocos divergentes
+        # @expected_size - tamanho do arquivo anunciado pelo servidor
+        verifier = self.verifier
+        self.verification = integrity.Verification(
+            synthetic.ALGORITHM,
+            str(expected_size),
+            str(verifier.matched),
+            verifier.time,
+            len(verifier.mismatches),
+        )
+        for offset in verifier.mismatches:
+            self.logg.error(f"Bloco divergente do padrão no byte {offset}.")
+        if self.verification.passed:
+            self.logg.info(
+                f"Padrão conferido ({verifier.matched} bytes), verificação em "
+                f"{verifier.time:.3f} segundos."
+            )
+        else:
+            self.logg.error(
+                f"Padrão divergente: {verifier.matched} de {expected_size} bytes "
+                f"conferem ({len(verifier.mismatches)} blocos divergentes)."
+            )
+
+    def _log_echo(self, rtts, lost, elapsed_time):
+        # Registra as métricas do modo de requisição/resposta
+        # @rtts - histograma dos RTTs de todos os sockets
+        # @lost - requisições sem resposta
+        # @elapsed_time - tempo entre a primeira requisição e a última resposta
+        row = metrics.Row(
+            latency.summary_header(),
+            latency.summary(
+                self.buffer_size,
+                self.pipeline,
+                self.concurrency,
+                self.requests * self.concurrency,
+                rtts,
+                lost,
+                elapsed_time,
+            ),
+        )
+        row.add(tuning.summary_header(), self.socket_info)
+        self.metrics.add_row("metricas_latencia_udp", row)
+
+    def _open_echo(self):
+        # Cria um socket ajustado e combina o modo de requisição/resposta com
+        # o servidor (READY e requisição, como no envio do arquivo)
+        server_addr = (self.host, self.port)
+        sock = socket.socket(socket.AF_INET, socket.SOCK_DGRAM)
+        try:
+            for failure in tuning.apply(sock, self.tuning):
+                self.logg.warning(f"Opção de socket não aplicada: {failure}")
+            self.socket_info = tuning.summary(self.tuning, sock)
+            sock.settimeout(2)
+            sock.sendto(b"READY", server_addr)
+            response, _ = sock.recvfrom(1024)
+            if response != b"READY":
+                raise RuntimeError("o servidor não respondeu com 'READY'")
+            sock.sendto(
+                format_request(latency.ECHO_FILE, self.buffer_size, mode="echo"),
+                server_addr,
+            )
+            reply, _ = sock.recvfrom(1024)
+            if parse_reply(reply) is None:
+                raise RuntimeError(f"o servidor recusou a solicitação: {reply!r}")
+            sock.settimeout(latency.ECHO_TIMEOUT)
+        except BaseException:
+            sock.close()
+            raise
+        return sock
+
+    def _echo_socket(self, index, sock):
+        # Envia self.requests mensagens ECHO pelo socket, mantendo até
+        # self.pipeline sem resposta, e mede o RTT de cada uma. As respostas
+        # podem se perder ou chegar fora de ordem, por isso cada mensagem leva
+        # o seu número de sequência e os instantes de envio ficam em um
+        # dicionário. Após ECHO_TIMEOUT sem respostas, as pendentes são dadas
+        # como perdidas e o pipeline é reabastecido. Retorna (histograma dos
+        # RTTs, instante da primeira requisição, instante da última resposta,
+        # requisições perdidas).
+        # @index - número do socket, para o log
+        # @sock - socket já combinado com o servidor (_open_echo)
+        server_addr = (self.host, self.port)
+        rtts = ArrivalHistogram()
+        packet = bytearray(rudp.HEADER.size) + os.urandom(self.buffer_size)
+        view = memoryview(bytearray(len(packet)))
+        outstanding = {}  # seq -> instante do envio
+        sent = lost = 0
+        first = last = time.perf_counter()
+        with sock:
+            while sent < self.requests or outstanding:
+                while sent < self.requests and len(outstanding) < self.pipeline:
+                    rudp.HEADER.pack_into(packet, 0, rudp.ECHO, sent)
+                    outstanding[sent] = time.perf_counter()
+                    sock.sendto(packet, server_addr)
+                    sent += 1
+                try:
+                    size = sock.recv_into(view)
+                except socket.timeout:
+                    lost += len(outstanding)
+                    outstanding.clear()
+                    continue
+                now = time.perf_counter()
+                if not rudp.is_kind(view[:size], rudp.ECHO):
+                    continue
+                _, seq = rudp.HEADER.unpack_from(view)
+                start = outstanding.pop(seq, None)
+                if start is None:
+                    continue  # Resposta atrasada de uma requisição dada como perdida
+                last = now
+                rtts.record(int((now - start) * 1e9))
+
+                if self.verbose:
+                    self.logg.debug(f"Socket {index}, resposta {seq} recebida.")
+        return rtts, first, last, lost
+
+    def _run_echo(self):
+        # Modo de requisição/resposta: self.concurrency sockets simultâneos
+        # enviam mensagens pequenas ao servidor, que as devolve. Os sockets
+        # combinam o modo com o servidor um de cada vez, antes do tráfego, pois
+        # o servidor sequencial lê a requisição como o próximo datagrama.
+        try:
+            self.logg.info(
+                f"Enviando {self.requests} mensagens de {self.buffer_size} bytes em "
+                f"{self.concurrency} sockets (pipeline de {self.pipeline})."
+            )
+            socks = [self._open_echo() for _ in range(self.concurrency)]
+            with ThreadPoolExecutor(max_workers=self.concurrency) as pool:
+                results = list(pool.map(self._echo_socket, range(len(socks)), socks))
+
+            rtts = ArrivalHistogram()
+            for histogram, *_ in results:
+                rtts.merge(histogram)
+            lost = sum(r[3] for r in results)
+            elapsed_time = max(r[2] for r in results) - min(r[1] for r in results)
+            self._log_echo(rtts, lost, elapsed_time)
+            rate = rtts.count / elapsed_time if elapsed_time else 0.0
+            self.logg.info(
+                f"{rtts.count} respostas ({lost} perdidas) em {elapsed_time:.2f} "
+                f"segundos: {rate:.0f} requisições/s, RTT médio "
+                f"{rtts.mean() / 1000:.1f} us, p99 {rtts.percentile(99) / 1000:.1f} us."
+            )
+        except Exception as e:
+            self.logg.error(f"Erro: {e}")
+        finally:
+            self._save_metrics()
+            self.logg.info("Execução do cliente finalizada.")
+
+    def _start_profiler(self):
+        # Inicia o perfil da execução, se pedido
+        if self.profile is None:
+            return
+        path = self.profile_file or profiling.output_path(
+            self.profile, "udp", self.metrics.directory
+        )
+        self.profiler = profiling.create_profiler(self.profile, path)
+
+    def _stop_profiler(self):
+        # Grava o perfil e loga as funções mais custosas
+        if self.profiler is None:
+            return
+        self.profiler.stop()
+        self.logg.info(
+            f"Perfil ({self.profile}) salvo em '{self.profiler.path}'.\n"
+            f"{self.profiler.report()}"
+        )
 
     def run(self):
-        # Inicia a comunicação com o servidor e recebe o arquivo
+        # Inicia a comunicação com o servidor e recebe o arquivo, perfilando a
+        # execução se pedido
         self._init_logging()
+        self._start_profiler()
+        try:
+            with profiling.profiled(self.profiler):
+                self._run()
+        finally:
+            self._stop_profiler()
+
+    def _run(self):
+        # Escolhe o modo de execução e recebe o arquivo
+        if self.requests:
+            self._run_echo()
+            return
+        if self.histogram_path is not None:
+            self.histogram = ArrivalHistogram()
 
         with socket.socket(socket.AF_INET, socket.SOCK_DGRAM) as sock:
             try:
+                # Ajusta o socket antes do primeiro envio; no modo confiável,
+                # a janela anunciada acompanha o buffer de recepção efetivo
+                for failure in tuning.apply(sock, self.tuning):
+                    self.logg.warning(f"Opção de socket não aplicada: {failure}")
+                self.socket_info = tuning.summary(self.tuning, sock)
+
                 # Enviar o sinal "READY" para o servidor
                 sock.sendto(b"READY", (self.host, self.port))
                 self.logg.info("Sinal de prontidão (READY) enviado ao servidor.")
@@ -96,57 +773,125 @@ class Client:
                 self.logg.info("Servidor está pronto para enviar o arquivo.")
 
                 # Enviar informações do arquivo e buffer ao servidor
+                # No modo confiável, anuncia a janela que cabe no buffer de recepção
+                options = {
+                    "checksum": self.checksum,
+                    "compress": self.compress,
+                    "level": self.compress_level,
+                }
+                if self.reliable:
+                    self.window = rudp.receive_window(sock, self.buffer_size)
+                    options.update(mode="reliable", window=self.window)
                 sock.sendto(
-                    f"{self.file_name},{self.buffer_size}".encode(),
+                    format_request(self.file_name, self.buffer_size, **options),
                     (self.host, self.port),
                 )
 
-                total_received = 0
-                packet_count = 0
-                start_time = time.time()  # Marca o tempo de início da transferência
-
                 sock.settimeout(
                     2
                 )  # Define um tempo limite (timeout) para a recepção de pacotes
-                while True:
-                    try:
-                        # Receber dados do servidor
-                        data, _ = sock.recvfrom(self.buffer_size)
-                        if not data:
-                            break  # Fim da transferência
-                        total_received += len(data)
-                        packet_count += 1
-
-                        if self.verbose:
-                            self.logg.debug(
-                                f"Pacote {packet_count}: {len(data)} bytes recebidos."
-                            )
-                    except socket.timeout:
-                        # Se o timeout for atingido, a transferência é considerada concluída
-                        self.logg.info("Timeout atingido. Transferência concluída.")
-                        break
-
-                # Calcula o tempo total decorrido e a taxa de transferência
-                elapsed_time = time.time() - start_time
-                throughput = total_received / elapsed_time / (1024 * 1024)  # MB/s
+
+                # Aguardar o tamanho do arquivo e o número de blocos anunciados.
+                # Com reordenação na rede, os primeiros blocos podem chegar antes
+                # da resposta; são descartados (e retransmitidos no modo confiável)
+                reply, _ = sock.recvfrom(1024)
+                while rudp.is_kind(reply, rudp.DATA):
+                    reply, _ = sock.recvfrom(1024)
+                info = parse_reply(reply)
+                if info is None:
+                    self.logg.error(f"O servidor recusou a solicitação: {reply!r}")
+                    return
+                expected_size = int(info["size"])
+                expected_packets = int(info["chunks"])
+                # O servidor com controle de ritmo pede relatórios de recepção
+                self.report_every = int(info.get("feedback", 0))
+                # Com verificação, cada datagrama traz o CRC32 do seu bloco
+                if self.verify_pattern:
+                    self.verifier = synthetic.PatternVerifier(
+                        block_size=self.buffer_size, header_size=rudp.HEADER.size
+                    )
+                elif self.checksum is not None:
+                    if "digest" in info:
+                        self.verifier = integrity.ChunkVerifier(expected_packets)
+                    else:
+                        self.logg.warning(
+                            "O servidor não anunciou o resumo; sem verificação."
+                        )
+                # Com compressão, cada bloco chega precedido do seu indicador
+                if self.compress is not None:
+                    if info.get("compress") == self.compress:
+                        self.decoder = compression.BlockDecompressor(self.compress)
+                    else:
+                        self.logg.warning(
+                            "O servidor não confirmou a compressão; sem compressão."
+                        )
+
+                self._start_sampler()
+                self.cpu = profiling.CpuUsage()
+                with self._open_output(expected_size) as out:
+                    if self.reliable:
+                        # Confirma a cada quarto de janela, para o servidor
+                        # nunca ficar parado esperando ACKs
+                        tracker = rudp.ReliableReceiver(max(1, self.window // 4))
+                        received = self._receive_reliable(sock, out, tracker)
+                    elif self.io != "single":
+                        tracker = rudp.SequenceTracker(expected_packets)
+                        received = self._receive_batched(sock, out, tracker)
+                    elif self.recv_into:
+                        tracker = rudp.SequenceTracker(expected_packets)
+                        received = self._receive_into(sock, out, tracker)
+                    else:
+                        tracker = rudp.SequenceTracker(expected_packets)
+                        received = self._receive_copy(sock, out, tracker)
+                self._stop_sampler()
+                self.cpu.stop()  # Inclui a gravação e a sincronização da saída
+                self._log_writer()
+                total_received, packet_count, first_byte, last_byte = received
+
+                # Calcula o tempo entre o primeiro e o último byte recebido (sem
+                # contar a espera pelo timeout) e a taxa de transferência
+                elapsed_time = last_byte - first_byte if first_byte else 0.0
+                throughput = 0.0
+                if elapsed_time:
+                    throughput = total_received / elapsed_time / (1024 * 1024)  # MB/s
 
                 # Exibir informações de métricas
                 self.logg.info(f"Arquivo recebido em {elapsed_time:.2f} segundos.")
                 self.logg.info(f"Tamanho total recebido: {total_received} bytes.")
                 self.logg.info(f"Taxa de transferência: {throughput:.2f} MB/s.")
+                self.logg.info(
+                    f"Pacotes recebidos: {packet_count} de {expected_packets}. "
+                    f"Duplicados: {tracker.duplicates}. Fora de ordem: {tracker.out_of_order}."
+                )
+                self.logg.info(f"Chamadas de recepção: {self.recv_calls}.")
+                if self.short_datagrams:
+                    self.logg.warning(
+                        f"Datagramas curtos descartados: {self.short_datagrams}."
+                    )
+                if self.decoder is not None:
+                    self.logg.info(f"Compressão {self.decoder.describe()}.")
+                if self.verify_pattern:
+                    self._verify_pattern(expected_size)
+                elif self.verifier is not None:
+                    self._verify(info["digest"])
 
                 # Registrar as métricas no arquivo CSV
-                self._log_metrics_to_csv(
+                self._log_metrics(
                     total_received,
                     elapsed_time,
                     packet_count,
                     throughput,
-                    total_received,
+                    expected_size,
+                    expected_packets,
+                    tracker.out_of_order,
+                    tracker.duplicates,
                 )
 
             except Exception as e:
                 self.logg.error(f"Erro: {e}")
             finally:
+                self._stop_sampler()
+                self._save_metrics()
                 self.logg.info("Execução do cliente finalizada.")
 
 
@@ -161,20 +906,213 @@ def parse_args(args):
     parser.add_argument(
         "--port", required=True, type=int, help="Número da porta do servidor"
     )
+    parser.add_argument("--file", type=str, help="Nome do arquivo a ser solicitado")
     parser.add_argument(
-        "--file", required=True, type=str, help="Nome do arquivo a ser solicitado"
+        "--buffer",
+        required=True,
+        type=int,
+        help="Tamanho do buffer (no modo --echo, o tamanho das mensagens)",
+    )
+    parser.add_argument(
+        "--recv-into",
+        action="store_true",
+        help="Receber em um buffer pré-alocado (recv_into) em vez de alocar por pacote",
+    )
+    parser.add_argument(
+        "--output", type=str, help="Arquivo onde gravar os dados recebidos"
+    )
+    parser.add_argument(
+        "--reliable",
+        action="store_true",
+        help="Usar o modo confiável (sequência, ACKs seletivos e retransmissão)",
+    )
+    parser.add_argument(
+        "--histogram",
+        nargs="?",
+        const="histograma_udp.csv",
+        help="Registrar o histograma de intervalos entre chegadas (p50/p90/p99/p99.9 "
+        "e jitter) e exportá-lo para o arquivo indicado",
+    )
+    parser.add_argument(
+        "--io",
+        choices=batchio.RECV_MODES,
+        default="single",
+        help="Recepção no modo sem confirmação: um datagrama por chamada (single), "
+        "em lote com recvmmsg (mmsg) ou agregada pelo kernel com UDP_GRO (gro)",
+    )
+    parser.add_argument(
+        "--batch",
+        type=int,
+        default=32,
+        help="Datagramas por chamada de sistema no modo mmsg",
+    )
+    parser.add_argument(
+        "--checksum",
+        choices=integrity.ALGORITHMS,
+        help="Verificar a integridade dos dados: CRC32 de cada datagrama e resumo "
+        "do arquivo anunciado pelo servidor",
+    )
+    parser.add_argument(
+        "--verify-pattern",
+        action="store_true",
+        help="Conferir os blocos de um arquivo sintético (--file gen:<tamanho>, ex.: "
+        "gen:2G) contra o padrão gerado, sem gravá-los",
+    )
+    parser.add_argument(
+        "--write-mode",
+        choices=writeback.WRITE_MODES,
+        default="direct",
+        help="Gravação da saída (--output): na própria recepção (direct) ou em uma "
+        "thread à parte, alimentada por uma fila limitada (behind)",
+    )
+    parser.add_argument(
+        "--write-queue",
+        type=int,
+        default=writeback.DEFAULT_QUEUE_MB,
+        metavar="MB",
+        help="Tamanho máximo da fila de gravação no modo --write-mode behind",
+    )
+    parser.add_argument(
+        "--fsync",
+        action="store_true",
+        help="Sincronizar a saída com o disco antes de medir a taxa fim a fim",
+    )
+    parser.add_argument(
+        "--compress",
+        choices=compression.ALGORITHMS,
+        help="Pedir ao servidor cada bloco comprimido (sozinho, para tolerar perdas "
+        "e reordenação), descomprimido na recepção",
+    )
+    parser.add_argument(
+        "--compress-level",
+        type=int,
+        help="Nível de compressão (por padrão, o mais rápido do algoritmo)",
+    )
+    parser.add_argument(
+        "--profile",
+        choices=profiling.MODES,
+        help="Perfilar a execução: cProfile (todas as chamadas, com custo alto) ou "
+        "amostragem das pilhas de todas as threads (custo baixo, flame graph)",
+    )
+    parser.add_argument(
+        "--profile-file",
+        help="Arquivo do perfil (padrão: perfil_udp.prof ou .txt no diretório das "
+        "métricas)",
+    )
+    parser.add_argument(
+        "--tuning",
+        choices=list(tuning.PROFILES),
+        default="default",
+        help="Perfil de ajuste do socket: valores do sistema (default), buffers "
+        "grandes (throughput) ou busy polling (low-latency)",
+    )
+    parser.add_argument(
+        "--echo",
+        type=int,
+        nargs="?",
+        const=latency.DEFAULT_REQUESTS,
+        default=0,
+        metavar="REQUISIÇÕES",
+        help="Modo de requisição/resposta: enviar N mensagens por socket, que o "
+        "servidor devolve, e medir as requisições por segundo, o RTT e as perdas",
+    )
+    parser.add_argument(
+        "--pipeline",
+        type=int,
+        default=1,
+        help="Mensagens sem resposta permitidas por socket (modo --echo)",
+    )
+    parser.add_argument(
+        "--concurrency",
+        type=int,
+        default=1,
+        help="Sockets simultâneos (modo --echo)",
+    )
+    parser.add_argument(
+        "--metrics-format",
+        nargs="+",
+        choices=metrics.FORMATS,
+        default=["csv"],
+        help="Formatos dos arquivos de métricas: CSV, JSON Lines e/ou colunar binário",
+    )
+    parser.add_argument(
+        "--metrics-dir",
+        default=".",
+        help="Diretório dos arquivos de métricas",
+    )
+    parser.add_argument(
+        "--sample",
+        type=int,
+        nargs="?",
+        const=sampling.DEFAULT_INTERVAL_MS,
+        default=0,
+        metavar="MS",
+        help="Amostrar a taxa durante a transferência a cada N ms (100 por padrão) "
+        "e gravar a série em amostras_udp",
+    )
+    parser.add_argument(
+        "--live",
+        action="store_true",
+        help="Exibir a taxa amostrada ao vivo no terminal (implica --sample)",
     )
-    parser.add_argument("--buffer", required=True, type=int, help="Tamanho do buffer")
     parser.add_argument(
         "-v", "--verbose", action="store_true", help="Ativar log detalhado dos pacotes"
     )
-    return parser.parse_args(args)
+    parsed = parser.parse_args(args)
+    if parsed.file is None and not parsed.echo:
+        parser.error("--file é obrigatório fora do modo --echo")
+    if parsed.verify_pattern and not synthetic.is_synthetic(parsed.file or ""):
+        parser.error("--verify-pattern exige um arquivo sintético (--file gen:...)")
+    if parsed.verify_pattern and parsed.checksum:
+        parser.error("--verify-pattern e --checksum não podem ser combinados")
+    if parsed.compress and parsed.compress_level is not None:
+        levels = compression.LEVELS[parsed.compress]
+        if parsed.compress_level not in levels:
+            parser.error(
+                f"--compress-level de {parsed.compress} deve estar entre "
+                f"{levels.start} e {levels.stop - 1}"
+            )
+    if parsed.compress and (parsed.checksum or parsed.verify_pattern):
+        # Os CRCs e o padrão são dos blocos originais, não dos comprimidos
+        parser.error("--compress não pode ser combinado com a verificação por bloco")
+    if parsed.live and not parsed.sample:
+        parsed.sample = sampling.DEFAULT_INTERVAL_MS
+    return parsed
 
 
 def main():
     # Função principal que inicializa o cliente com os argumentos fornecidos
     args = parse_args(sys.argv[1:])
-    client = Client(args.host, args.port, args.buffer, args.file, args.verbose)
+    client = Client(
+        args.host,
+        args.port,
+        args.buffer,
+        args.file,
+        args.verbose,
+        args.recv_into,
+        args.output,
+        args.reliable,
+        args.histogram,
+        args.io,
+        args.batch,
+        args.tuning,
+        args.checksum,
+        args.echo,
+        args.pipeline,
+        args.concurrency,
+        args.metrics_format,
+        args.metrics_dir,
+        args.sample,
+        args.live,
+        args.verify_pattern,
+        args.write_mode,
+        args.write_queue,
+        args.fsync,
+        args.compress,
+        args.compress_level,
+        args.profile,
+        args.profile_file,
+    )
     client.run()
 
 
@@ -1,19 +1,116 @@
+import asyncio
 import socket
 import logging
+import select
 import sys
 import time
 import os
+from collections import deque
+from functools import partial
+
+import batchio
+import compression
+import pacing
+import rudp
+import integrity
+import latency
+import metrics
+import prefork
+import profiling
+import sampling
+import synthetic
+import tuning
+from filecache import DEFAULT_CACHE_MB, FileCache
+from protocol import chunk_count, format_reply, parse_request
+
+# Origem dos dados enviados: leitura do disco a cada requisição, ou arquivos
+# mapeados em memória mantidos em cache entre as requisições
+SOURCES = ("file", "mmap")
+
+# Motores disponíveis: um cliente por vez, ou vários clientes simultâneos em
+# um laço de eventos asyncio
+ENGINES = ("sequential", "asyncio")
+
+# Datagramas do cliente que podem chegar depois do fim de uma transferência
+LATE_KINDS = (rudp.ACK, rudp.FIN_ACK, rudp.REPORT)
+
+# Datagramas enviados por sessão a cada rodada do escalonador asyncio
+QUANTUM = 16
 
 
 class Server:
-    def __init__(self, host, port, verbose):
+    def __init__(
+        self,
+        host,
+        port,
+        verbose,
+        window=256,
+        engine="sequential",
+        io="single",
+        batch=32,
+        pacing_mode="none",
+        rate=100,
+        rate_step=5,
+        source="file",
+        cache_size=DEFAULT_CACHE_MB,
+        tuning_profile="default",
+        processes=1,
+        metrics_formats=("csv",),
+        metrics_dir=".",
+        sample_interval=0,
+        live=False,
+        profile=None,
+        profile_file=None,
+    ):
         # Inicializa o servidor com os parâmetros fornecidos
         # @host - endereço IP do servidor
         # @port - número da porta onde o servidor vai escutar
         # @verbose - nível de detalhamento do log (True para log detalhado)
+        # @window - blocos em trânsito sem confirmação no modo confiável
+        # @engine - motor de atendimento (sequential ou asyncio)
+        # @io - envio dos datagramas sem confirmação (single, mmsg ou gso)
+        # @batch - datagramas por chamada de sistema no envio em lote
+        # @pacing_mode - ritmo do envio sem confirmação (none, fixed ou aimd)
+        # @rate - taxa fixa (ou inicial, no modo aimd) em MB/s
+        # @rate_step - aumento da taxa por relatório sem perdas no modo aimd, em MB/s
+        # @source - origem dos dados (file ou mmap)
+        # @cache_size - capacidade do cache de arquivos mapeados, em MB
+        # @tuning_profile - perfil de ajuste do socket (tuning.PROFILES)
+        # @processes - processos trabalhadores com SO_REUSEPORT (0: um por núcleo)
+        # @metrics_formats - formatos dos arquivos de métricas (metrics.FORMATS)
+        # @metrics_dir - diretório dos arquivos de métricas
+        # @sample_interval - intervalo da amostragem da taxa de envio, somando
+        #                    os clientes atendidos, em ms (0 desabilita)
+        # @live - exibe a taxa amostrada ao vivo no terminal
+        # @profile - perfila o servidor até o encerramento (profiling.MODES;
+        #            None desabilita)
+        # @profile_file - arquivo do perfil (None usa o nome padrão)
         self.host = host
         self.port = port
         self.verbose = verbose
+        self.window = window
+        self.engine = engine
+        self.io = io
+        self.batch = batch
+        self.pacing = pacing_mode
+        self.rate = rate
+        self.rate_step = rate_step
+        self.cache = None  # Arquivos mapeados em memória, com source mmap
+        if source == "mmap":
+            self.cache = FileCache(cache_size * 1024 * 1024)
+        self.tuning = tuning_profile
+        self.processes = processes
+        self.digests = integrity.DigestCache()  # CRCs dos blocos, por arquivo
+        self.stats = prefork.WorkerStats()  # Totais devolvidos no modo pré-fork
+        self.socket_info = []  # Ajuste efetivo do socket, lido ao iniciar
+        self.echoed = 0  # Mensagens devolvidas no modo de requisição/resposta
+        self.metrics = metrics.Metrics(metrics_formats, metrics_dir)
+        self.sample_interval = sample_interval
+        self.live = live
+        self.sampler = None  # Amostragem da taxa, iniciada em serve()
+        self.profile = profile
+        self.profile_file = profile_file
+        self.profiler = None  # Perfil do servidor, iniciado em serve()
         self.logg = logging.getLogger("SERVIDOR_UDP")
 
     def _init_logging(self):
@@ -22,6 +119,249 @@ class Server:
         logging.basicConfig(level=level)
         self.logg.info(f"Servidor UDP inicializado em {self.host}:{self.port}.")
 
+    def _open_request(self, data):
+        # Interpreta a requisição do cliente e monta a resposta a ser enviada.
+        # Retorna (caminho, buffer, opções, resposta); se não há arquivo a
+        # enviar, o caminho é None e a resposta é a mensagem de erro ou, no
+        # modo de requisição/resposta, a confirmação de prontidão.
+        # @data - requisição recebida do cliente
+        file_name, buffer_size, options = parse_request(data)
+
+        # No modo de requisição/resposta não há sessão: os datagramas ECHO são
+        # devolvidos pelo laço de recepção, de qualquer cliente
+        if options.get("mode") == "echo":
+            self.logg.info(f"Modo de eco com mensagens de {buffer_size} bytes.")
+            return None, buffer_size, options, format_reply(size=buffer_size)
+
+        # Caminho do arquivo a ser enviado; arquivos sintéticos (gen:<tamanho>)
+        # não estão em disco
+        if not synthetic.is_synthetic(file_name):
+            file_name = "send_data/" + file_name
+
+        # Verifica se o arquivo existe
+        if not synthetic.exists(file_name):
+            self.logg.error(f"Arquivo '{file_name}' não encontrado.")
+            return None, buffer_size, options, b"ERROR: File not found."
+
+        self.logg.info(
+            f"Preparando para enviar '{file_name}' com buffer de {buffer_size} bytes"
+            f"{' (modo confiável)' if options.get('mode') == 'reliable' else ''}."
+        )
+
+        # Anuncia o tamanho do arquivo e o número de blocos, para o cliente
+        # saber quando a transferência terminou e quanto foi perdido
+        # Com controle de ritmo, pede também os relatórios de recepção
+        size = synthetic.getsize(file_name)
+        fields = {"size": size, "chunks": chunk_count(size, buffer_size)}
+        if self.pacing != "none" and options.get("mode") != "reliable":
+            fields["feedback"] = pacing.REPORT_EVERY
+        # Com verificação, anuncia o resumo da tabela de CRCs dos blocos
+        crcs = self._chunk_crcs(file_name, buffer_size, options)
+        if crcs is not None:
+            fields["checksum"] = options["checksum"]
+            fields["digest"] = integrity.table_digest(options["checksum"], crcs)
+        # Confirma a compressão pedida, se o algoritmo for suportado
+        codec = compression.negotiate(options)
+        if codec is not None:
+            fields["compress"] = codec[0]
+        reply = format_reply(**fields)
+        return file_name, buffer_size, options, reply
+
+    def _chunk_crcs(self, file_name, buffer_size, options):
+        # CRC32 de cada bloco do arquivo, enviado nos datagramas quando o
+        # cliente pede verificação (None sem verificação). A tabela é calculada
+        # uma vez por arquivo e tamanho de bloco, fora do envio medido.
+        # @file_name - caminho do arquivo
+        # @buffer_size - tamanho dos dados de cada datagrama
+        # @options - opções da requisição do cliente
+        if options.get("checksum") not in integrity.ALGORITHMS:
+            return None
+        return self.digests.chunk_crcs(file_name, buffer_size)
+
+    def _client_window(self, options):
+        # Janela do modo confiável, limitada pelo que cabe no buffer do cliente
+        # @options - opções da requisição do cliente
+        return min(self.window, int(options.get("window", self.window)))
+
+    def _open_source(self, file_name):
+        # Abre o arquivo a ser enviado: sintético, mapeado pelo cache com source
+        # mmap, ou do disco. Todos têm a mesma interface (read, readinto, close).
+        # @file_name - caminho do arquivo
+        if synthetic.is_synthetic(file_name):
+            return synthetic.open_source(file_name)
+        if self.cache is not None:
+            return self.cache.open(file_name)
+        return open(file_name, "rb")
+
+    def _open_compressed(self, file_name, options):
+        # Abre o arquivo a ser enviado e, se o cliente pediu compressão, o
+        # envolve na compressão por bloco. Retorna (fonte, compressão ou None).
+        # @file_name - caminho do arquivo
+        # @options - opções da requisição do cliente
+        file = self._open_source(file_name)
+        codec = compression.negotiate(options)
+        if codec is None:
+            return file, None
+        compressor = compression.BlockCompressor(file, *codec)
+        return compressor, compressor
+
+    def _create_pacer(self, options):
+        # Controle de ritmo de uma transferência sem confirmação (None se
+        # desabilitado ou no modo confiável, que já é limitado pela janela)
+        # @options - opções da requisição do cliente
+        if options.get("mode") == "reliable":
+            return None
+        return pacing.create_pacer(self.pacing, self.rate, self.rate_step)
+
+    def _pace(self, sock, client_addr, pacer, next_seq, size):
+        # Aguarda até o ritmo permitir enviar @size bytes, lendo os relatórios
+        # do cliente que chegarem na espera. Sem espera, os relatórios são
+        # lidos apenas a cada REPORT_EVERY blocos, para não custar uma chamada
+        # de sistema por datagrama.
+        # @sock - socket utilizado para a comunicação
+        # @client_addr - endereço do cliente
+        # @pacer - controle de ritmo da transferência
+        # @next_seq - próximo bloco a ser enviado
+        # @size - bytes do próximo envio
+        delay = pacer.delay(time.perf_counter())
+        if delay or next_seq >= pacer.poll_seq:
+            pacer.poll_seq = next_seq + pacing.REPORT_EVERY
+            deadline = time.perf_counter() + delay
+            while select.select(
+                [sock], [], [], max(0.0, deadline - time.perf_counter())
+            )[0]:
+                data, addr = sock.recvfrom(1024)
+                if addr == client_addr:
+                    self._on_report(pacer, data, next_seq)
+        pacer.consume(size)
+
+    def _on_report(self, pacer, data, next_seq):
+        # Repassa ao controle de ritmo um relatório de recepção do cliente
+        # @pacer - controle de ritmo da transferência
+        # @data - datagrama recebido do cliente
+        # @next_seq - próximo bloco a ser enviado
+        if rudp.is_kind(data, rudp.REPORT) and len(data) >= (
+            rudp.HEADER.size + rudp.REPORT_BODY.size
+        ):
+            pacer.on_report(*rudp.parse_report(data), next_seq, time.perf_counter())
+
+    def _log_metrics(
+        self,
+        file_name,
+        total_sent,
+        elapsed_time,
+        packet_count,
+        buffer_size,
+        pacer,
+        compressor=None,
+        cpu=None,
+    ):
+        # Registra as métricas do envio no pipeline de métricas do servidor
+        # @file_name - caminho do arquivo enviado
+        # @total_sent - total de bytes enviados
+        # @elapsed_time - tempo total decorrido para o envio
+        # @packet_count - número de datagramas de dados enviados
+        # @buffer_size - tamanho do bloco solicitado pelo cliente
+        # @pacer - controle de ritmo utilizado (None sem controle)
+        # @compressor - compressão do envio (None se não comprimido)
+        # @cpu - CPU gasta no envio (profiling.CpuUsage; None se não medida)
+        mb = 1024 * 1024
+
+        row = metrics.Row(
+            [
+                "Arquivo",
+                "Total de Bytes Enviados",
+                "Tempo Decorrido (s)",
+                "Número de Pacotes",
+                "Taxa de Transferência (MB/s)",
+                "Tamanho do Buffer (bytes)",
+                "Motor",
+            ],
+            [
+                file_name,
+                total_sent,
+                elapsed_time,
+                packet_count,
+                total_sent / elapsed_time / mb if elapsed_time else 0.0,
+                buffer_size,
+                self.engine,
+            ],
+        )
+        pacing_values = ["none", "", "", "", "", ""]
+        if pacer is not None:
+            pacing_values = [
+                self.pacing,
+                pacer.initial_rate / mb,
+                pacer.rate / mb,
+                pacer.max_clean_rate / mb,
+                pacer.reports,
+                pacer.lossy_reports,
+            ]
+        row.add(
+            [
+                "Ritmo",
+                "Taxa Inicial (MB/s)",
+                "Taxa Final (MB/s)",
+                "Maior Taxa sem Perdas (MB/s)",
+                "Relatórios",
+                "Relatórios com Perdas",
+            ],
+            pacing_values,
+        )
+        row.add(tuning.summary_header(), self.socket_info)
+        row.section(compression.summary_header(), compressor)
+        row.section(profiling.summary_header(), cpu, total_sent)
+        self.metrics.add_row("metricas_servidor_udp", row)
+
+    def _log_transfer(
+        self,
+        file_name,
+        total_sent,
+        elapsed_time,
+        packet_count,
+        buffer_size,
+        pacer=None,
+        compressor=None,
+        cpu=None,
+    ):
+        # Calcula e loga a taxa de transferência de um envio concluído
+        # @file_name - caminho do arquivo enviado
+        # @total_sent - total de bytes enviados
+        # @elapsed_time - tempo total decorrido para o envio
+        # @packet_count - número de datagramas de dados enviados
+        # @buffer_size - tamanho do bloco solicitado pelo cliente
+        # @pacer - controle de ritmo utilizado (None sem controle)
+        # @compressor - compressão do envio (None se não comprimido); a taxa
+        #               é a dos bytes no fio
+        # @cpu - CPU gasta no envio (profiling.CpuUsage; None se não medida)
+        throughput = 0.0
+        if elapsed_time:
+            throughput = total_sent / elapsed_time / (1024 * 1024)  # MB/s
+        self.stats.add(total_sent, elapsed_time)
+        self.logg.info(
+            f"Arquivo '{file_name}' enviado em {elapsed_time:.2f} segundos. Taxa: {throughput:.2f} MB/s"
+        )
+        if pacer is not None:
+            self.logg.info(
+                f"Ritmo {self.pacing}: taxa final {pacer.rate / (1024 * 1024):.2f} MB/s, "
+                f"maior taxa sem perdas {pacer.max_clean_rate / (1024 * 1024):.2f} MB/s "
+                f"({pacer.lossy_reports} de {pacer.reports} relatórios com perdas)."
+            )
+        if compressor is not None:
+            self.logg.info(f"Compressão {compressor.describe()}.")
+        if cpu is not None:
+            self.logg.info(f"{cpu.describe(total_sent)}.")
+        self._log_metrics(
+            file_name,
+            total_sent,
+            elapsed_time,
+            packet_count,
+            buffer_size,
+            pacer,
+            compressor,
+            cpu,
+        )
+
     def _send_file(self, sock, client_addr):
         # Envia um arquivo para o cliente especificado
         # @sock - socket utilizado para a comunicação
@@ -29,77 +369,723 @@ class Server:
         try:
             # Recebe o nome do arquivo e o tamanho do buffer do cliente
             data, _ = sock.recvfrom(1024)
-            file_info = data.decode().split(",")
-            print("File info", file_info)
-            file_name, buffer_size = file_info[0], int(file_info[1])
-
-            # Caminho do arquivo a ser enviado
-            file_name = "send_data/" + file_name
-
-            # Verifica se o arquivo existe
-            if not os.path.isfile(file_name):
-                self.logg.error(f"Arquivo '{file_name}' não encontrado.")
+            file_name, buffer_size, options, reply = self._open_request(data)
+            sock.sendto(reply, client_addr)
+            if file_name is None:
                 return
 
-            self.logg.info(
-                f"Preparando para enviar '{file_name}' com buffer de {buffer_size} bytes."
-            )
-
             # Inicia a transferência do arquivo
+            crcs = self._chunk_crcs(file_name, buffer_size, options)
             start_time = time.time()
-            packet_count = 0
-            total_sent = 0
-
-            with open(file_name, "rb") as file:
-                while chunk := file.read(buffer_size):
-                    # Envia o arquivo em pacotes do tamanho do buffer
-                    sock.sendto(chunk, client_addr)
-                    packet_count += 1
-                    total_sent += len(chunk)
-                    if self.verbose:
-                        self.logg.debug(
-                            f"Pacote {packet_count} enviado, tamanho: {len(chunk)} bytes"
-                        )
-
-            # Calcula o tempo total de transferência e a taxa de transferência
-            elapsed_time = time.time() - start_time
-            throughput = total_sent / elapsed_time / (1024 * 1024)  # Converte para MB/s
-            self.logg.info(
-                f"Arquivo '{file_name}' enviado em {elapsed_time:.2f} segundos. Taxa: {throughput:.2f} MB/s"
+            cpu = profiling.CpuUsage("thread")
+            pacer = self._create_pacer(options)
+
+            file, compressor = self._open_compressed(file_name, options)
+            with file, sampling.tracking(self.sampler) as count:
+                if options.get("mode") == "reliable":
+                    total_sent, packet_count = self._send_reliable(
+                        sock,
+                        client_addr,
+                        file,
+                        buffer_size,
+                        self._client_window(options),
+                        crcs,
+                        count,
+                    )
+                elif self.io != "single" and compressor is None:
+                    total_sent, packet_count = self._send_batched(
+                        sock, client_addr, file, buffer_size, pacer, crcs, count
+                    )
+                elif (
+                    self.cache is not None
+                    or synthetic.is_synthetic(file_name)
+                    or compressor is not None
+                ):
+                    # Os blocos comprimidos têm tamanhos variados: vão um a um,
+                    # como as fatias do arquivo mapeado (o envio em lote com
+                    # UDP_SEGMENT exige segmentos do mesmo tamanho)
+                    total_sent, packet_count = self._send_mapped(
+                        sock, client_addr, file, buffer_size, pacer, crcs, count
+                    )
+                else:
+                    total_sent, packet_count = self._send_datagrams(
+                        sock, client_addr, file, buffer_size, pacer, crcs, count
+                    )
+
+            self._log_transfer(
+                file_name,
+                total_sent,
+                time.time() - start_time,
+                packet_count,
+                buffer_size,
+                pacer,
+                compressor,
+                cpu.stop(),
             )
         except Exception as e:
             self.logg.error(f"Erro ao enviar o arquivo: {e}")
 
+    def _send_datagrams(
+        self, sock, client_addr, file, buffer_size, pacer=None, crcs=None, count=None
+    ):
+        # Envia o arquivo em pacotes numerados do tamanho do buffer, sem
+        # controle de entrega, e sinaliza o fim com um FIN. O número de
+        # sequência permite ao cliente contar perdas, duplicados e reordenação.
+        # Os blocos são lidos direto em um buffer reutilizado, após o cabeçalho.
+        # @sock - socket utilizado para a comunicação
+        # @client_addr - endereço do cliente que receberá o arquivo
+        # @file - arquivo aberto para leitura
+        # @buffer_size - tamanho dos dados de cada datagrama (sem cabeçalho)
+        # @pacer - controle de ritmo (None envia o mais rápido possível)
+        # @crcs - CRC32 de cada bloco, enviado após o cabeçalho (None não envia)
+        # @count - contabiliza cada bloco na amostragem (None se desabilitada)
+        header_size = rudp.HEADER.size if crcs is None else rudp.CHECKED_HEADER_SIZE
+        packet = bytearray(header_size + buffer_size)
+        view = memoryview(packet)
+        payload = view[header_size:]
+        packet_count = 0
+        total_sent = 0
+        while size := file.readinto(payload):
+            if pacer is not None:
+                self._pace(sock, client_addr, pacer, packet_count, header_size + size)
+            rudp.HEADER.pack_into(packet, 0, rudp.DATA, packet_count)
+            if crcs is not None:
+                rudp.CHECKSUM.pack_into(packet, rudp.HEADER.size, crcs[packet_count])
+            sock.sendto(view[: header_size + size], client_addr)
+            packet_count += 1
+            total_sent += size
+            if count is not None:
+                count(size)
+            if self.verbose:
+                self.logg.debug(f"Pacote {packet_count} enviado, tamanho: {size} bytes")
+
+        sock.sendto(rudp.pack(rudp.FIN, packet_count), client_addr)
+        return total_sent, packet_count
+
+    def _send_mapped(
+        self, sock, client_addr, file, buffer_size, pacer=None, crcs=None, count=None
+    ):
+        # Envia os mesmos datagramas de _send_datagrams direto do arquivo
+        # mapeado (ou do padrão de um arquivo sintético): o cabeçalho e a fatia
+        # devolvida por read() vão juntos em um sendmsg (scatter/gather), sem
+        # ler o disco nem copiar o bloco
+        # @sock - socket utilizado para a comunicação
+        # @client_addr - endereço do cliente que receberá o arquivo
+        # @file - arquivo mapeado (MappedFile) ou sintético (SyntheticFile)
+        # @buffer_size - tamanho dos dados de cada datagrama (sem cabeçalho)
+        # @pacer - controle de ritmo (None envia o mais rápido possível)
+        # @crcs - CRC32 de cada bloco, enviado após o cabeçalho (None não envia)
+        # @count - contabiliza cada bloco na amostragem (None se desabilitada)
+        header = bytearray(
+            rudp.HEADER.size if crcs is None else rudp.CHECKED_HEADER_SIZE
+        )
+        packet_count = 0
+        total_sent = 0
+        while chunk := file.read(buffer_size):
+            size = len(chunk)
+            if pacer is not None:
+                self._pace(sock, client_addr, pacer, packet_count, len(header) + size)
+            rudp.HEADER.pack_into(header, 0, rudp.DATA, packet_count)
+            if crcs is not None:
+                rudp.CHECKSUM.pack_into(header, rudp.HEADER.size, crcs[packet_count])
+            sock.sendmsg([header, chunk], [], 0, client_addr)
+            packet_count += 1
+            total_sent += size
+            if count is not None:
+                count(size)
+            if self.verbose:
+                self.logg.debug(f"Pacote {packet_count} enviado, tamanho: {size} bytes")
+
+        sock.sendto(rudp.pack(rudp.FIN, packet_count), client_addr)
+        return total_sent, packet_count
+
+    def _send_batched(
+        self, sock, client_addr, file, buffer_size, pacer=None, crcs=None, count=None
+    ):
+        # Envia os mesmos datagramas de _send_datagrams, mas vários por chamada
+        # de sistema (sendmmsg ou UDP_SEGMENT), lidos direto nas fatias do lote
+        # @sock - socket utilizado para a comunicação
+        # @client_addr - endereço do cliente que receberá o arquivo
+        # @file - arquivo aberto para leitura
+        # @buffer_size - tamanho dos dados de cada datagrama (sem cabeçalho)
+        # @pacer - controle de ritmo (None envia o mais rápido possível)
+        # @crcs - CRC32 de cada bloco, enviado após o cabeçalho (None não envia)
+        # @count - contabiliza cada bloco na amostragem (None se desabilitada)
+        header_size = rudp.HEADER.size if crcs is None else rudp.CHECKED_HEADER_SIZE
+        sender = batchio.open_sender(
+            sock, client_addr, header_size + buffer_size, self.io, self.batch
+        )
+        self.logg.info(
+            f"Envio em lote: {sender.mode}, até {len(sender.slots)} datagramas por chamada."
+        )
+        payloads = [slot[header_size:] for slot in sender.slots]
+        packet_count = 0
+        total_sent = 0
+        eof = False
+        while not eof:
+            lengths = []
+            for slot, payload in zip(sender.slots, payloads):
+                size = file.readinto(payload)
+                if not size:
+                    eof = True
+                    break
+                rudp.HEADER.pack_into(slot, 0, rudp.DATA, packet_count)
+                if crcs is not None:
+                    rudp.CHECKSUM.pack_into(slot, rudp.HEADER.size, crcs[packet_count])
+                lengths.append(header_size + size)
+                packet_count += 1
+                total_sent += size
+                if count is not None:
+                    count(size)
+                if self.verbose:
+                    self.logg.debug(
+                        f"Pacote {packet_count} enviado, tamanho: {size} bytes"
+                    )
+                if size < buffer_size:
+                    eof = True  # Bloco final: só ele pode ser menor que o buffer
+                    break
+            if lengths:
+                if pacer is not None:
+                    self._pace(
+                        sock,
+                        client_addr,
+                        pacer,
+                        packet_count - len(lengths),
+                        sum(lengths),
+                    )
+                sender.send(lengths)
+
+        sock.sendto(rudp.pack(rudp.FIN, packet_count), client_addr)
+        self.logg.info(
+            f"Chamadas de envio: {sender.calls} para {packet_count} pacotes."
+        )
+        return total_sent, packet_count
+
+    def _send_reliable(
+        self, sock, client_addr, file, buffer_size, window, crcs=None, count=None
+    ):
+        # Envia o arquivo com números de sequência, janela deslizante, ACKs
+        # seletivos e retransmissão, encerrando com FIN/FIN_ACK
+        # @sock - socket utilizado para a comunicação
+        # @client_addr - endereço do cliente que receberá o arquivo
+        # @file - arquivo aberto para leitura
+        # @buffer_size - tamanho dos dados de cada datagrama (sem cabeçalho)
+        # @window - número máximo de blocos em trânsito sem confirmação
+        # @crcs - CRC32 de cada bloco, enviado após o cabeçalho (None não envia)
+        # @count - contabiliza cada bloco na amostragem (None se desabilitada)
+        chunks = iter(partial(file.read, buffer_size), b"")
+        sender = rudp.ReliableSender(chunks, window, crcs)
+        header_size = rudp.HEADER.size if crcs is None else rudp.CHECKED_HEADER_SIZE
+        last_heard = time.perf_counter()
+
+        while not sender.done:
+            if time.perf_counter() - last_heard > rudp.IDLE_TIMEOUT:
+                raise TimeoutError("o cliente parou de enviar ACKs")
+
+            for packet in sender.poll(time.perf_counter()):
+                sock.sendto(packet, client_addr)
+                if count is not None:
+                    count(len(packet) - header_size)
+                if self.verbose:
+                    _, seq = rudp.HEADER.unpack_from(packet)
+                    self.logg.debug(f"Pacote {seq} enviado, tamanho: {len(packet)} bytes")
+
+            # Aguarda ACKs até a próxima expiração de RTO (ou apenas consulta,
+            # se ainda há espaço na janela) e processa todos os pendentes
+            timeout = sender.wait_time(time.perf_counter())
+            while select.select([sock], [], [], timeout)[0]:
+                data, addr = sock.recvfrom(1024)
+                timeout = 0
+                if addr != client_addr or not rudp.is_kind(data, rudp.ACK):
+                    continue
+                last_heard = time.perf_counter()
+                for packet in sender.on_ack(data, last_heard):
+                    sock.sendto(packet, client_addr)
+                    if count is not None:
+                        count(len(packet) - header_size)
+
+        self._finish_reliable(sock, client_addr, sender)
+        self.logg.info(
+            f"Retransmissões: {sender.retransmissions} de {sender.packets_sent} pacotes."
+        )
+        return sender.bytes_sent, sender.packets_sent
+
+    def _finish_reliable(self, sock, client_addr, sender):
+        # Envia o FIN com o total de blocos até o cliente confirmar com FIN_ACK
+        # @sock - socket utilizado para a comunicação
+        # @client_addr - endereço do cliente que receberá o arquivo
+        # @sender - estado da janela do remetente
+        fin = rudp.pack(rudp.FIN, sender.next_seq)
+        for _ in range(rudp.FIN_RETRIES):
+            sock.sendto(fin, client_addr)
+            deadline = time.perf_counter() + sender.rto
+            while (timeout := deadline - time.perf_counter()) > 0:
+                if not select.select([sock], [], [], timeout)[0]:
+                    break
+                data, addr = sock.recvfrom(1024)
+                if addr == client_addr and rudp.is_kind(data, rudp.FIN_ACK):
+                    return
+        self.logg.warning("Cliente não confirmou o fim da transferência.")
+
+    def _serve_sequential(self, sock):
+        # Atende um cliente por vez: as transferências ocupam o socket inteiro
+        # @sock - socket do servidor
+        while True:
+            # Aguarda um sinal de prontidão do cliente
+            data, client_addr = sock.recvfrom(latency.ECHO_BUFFER)
+            if rudp.is_kind(data, rudp.ECHO):
+                sock.sendto(data, client_addr)
+                self.echoed += 1
+                continue
+            if any(rudp.is_kind(data, kind) for kind in LATE_KINDS):
+                continue  # ACK ou relatório atrasado de uma transferência encerrada
+            if data != b"READY":
+                self.logg.error("Sinal de prontidão inválido do cliente.")
+                continue
+
+            self.logg.info(
+                f"Sinal de prontidão recebido de {client_addr}. Iniciando transferência do arquivo."
+            )
+
+            # Envia confirmação de prontidão para o cliente
+            sock.sendto(b"READY", client_addr)
+
+            # Inicia o envio do arquivo
+            self._send_file(sock, client_addr)
+
+    async def _serve_asyncio(self, sock):
+        # Atende vários clientes simultâneos no mesmo socket: um protocolo
+        # asyncio separa os datagramas por endereço de origem e um escalonador
+        # reveza o envio entre as sessões ativas
+        # @sock - socket do servidor
+        loop = asyncio.get_running_loop()
+        transport, engine = await loop.create_datagram_endpoint(
+            lambda: _AsyncEngine(self), sock=sock
+        )
+        try:
+            await engine.schedule()
+        finally:
+            transport.close()
+
+    def _start_sampler(self):
+        # Inicia a amostragem da taxa de envio, se pedida. Os datagramas
+        # retransmitidos no modo confiável também são contados. No modo
+        # pré-fork, cada trabalhador amostra os seus clientes, pelo PID.
+        if not self.sample_interval:
+            return
+        self.sampler = sampling.Sampler(
+            self.metrics,
+            "amostras_servidor_udp",
+            self.sample_interval / 1000,
+            {"PID": os.getpid()},
+            self.live,
+        )
+        self.sampler.start()
+
+    def _start_profiler(self):
+        # Inicia o perfil do servidor, se pedido. No modo pré-fork, cada
+        # trabalhador grava o seu perfil, identificado pelo PID.
+        if self.profile is None:
+            return
+        path = self.profile_file or profiling.output_path(
+            self.profile, "servidor_udp", self.metrics.directory, self.processes != 1
+        )
+        self.profiler = profiling.create_profiler(self.profile, path)
+
+    def _stop_profiler(self):
+        # Grava o perfil e loga as funções mais custosas
+        if self.profiler is None:
+            return
+        self.profiler.stop()
+        self.logg.info(
+            f"Perfil ({self.profile}) salvo em '{self.profiler.path}'.\n"
+            f"{self.profiler.report()}"
+        )
+
     def run(self):
-        # Inicia o servidor e aguarda conexões de clientes
+        # Inicia o servidor: em um único processo, ou em processos
+        # trabalhadores que compartilham a porta no modo pré-fork
         self._init_logging()
+        prefork.exit_on_sigterm()
+        if self.processes != 1:
+            prefork.run(self, "metricas_trabalhadores_udp")
+        else:
+            self.serve()
+
+    def serve(self):
+        # Liga o socket do servidor e aguarda conexões de clientes
         with socket.socket(socket.AF_INET, socket.SOCK_DGRAM) as sock:
             try:
+                # No modo pré-fork, cada trabalhador liga o seu socket à porta
+                if self.processes != 1:
+                    prefork.reuse_port(sock)
+
+                # Ajusta o socket e registra os valores efetivos, que valem
+                # para todas as transferências
+                for failure in tuning.apply(sock, self.tuning, sender=True):
+                    self.logg.warning(f"Opção de socket não aplicada: {failure}")
+                self.socket_info = tuning.summary(self.tuning, sock)
+                self.logg.info(
+                    "Ajuste do socket: "
+                    f"{dict(zip(tuning.summary_header(), self.socket_info))}"
+                )
+
                 # Associa o socket ao endereço e porta especificados
                 sock.bind((self.host, self.port))
-                self.logg.info(f"Servidor ouvindo em {self.host}:{self.port}")
+                self.logg.info(
+                    f"Servidor ouvindo em {self.host}:{self.port} (motor: {self.engine})"
+                )
+                self._start_sampler()
+                self._start_profiler()
 
-                while True:
-                    # Aguarda um sinal de prontidão do cliente
-                    data, client_addr = sock.recvfrom(1024)
-                    if data != b"READY":
-                        self.logg.error("Sinal de prontidão inválido do cliente.")
-                        continue
+                # Os dois motores atendem em uma só thread, perfilada inteira
+                with profiling.profiled(self.profiler):
+                    if self.engine == "asyncio":
+                        asyncio.run(self._serve_asyncio(sock))
+                    else:
+                        self._serve_sequential(sock)
 
+            except Exception as e:
+                self.logg.error(f"Erro no servidor: {e}")
+            finally:
+                if self.sampler is not None:
+                    self.sampler.stop()
+                self._stop_profiler()
+                if self.cache is not None:
                     self.logg.info(
-                        f"Sinal de prontidão recebido de {client_addr}. Iniciando transferência do arquivo."
+                        f"Cache de arquivos mapeados: {self.cache.hits} acertos, "
+                        f"{self.cache.misses} faltas."
                     )
+                if self.digests.time:
+                    self.logg.info(
+                        f"Tempo gasto calculando CRCs: {self.digests.time:.3f} s."
+                    )
+                if self.echoed:
+                    self.logg.info(f"Mensagens devolvidas (eco): {self.echoed}.")
+                self.metrics.flush()
+                self.logg.info("Execução do servidor finalizada.")
 
-                    # Envia confirmação de prontidão para o cliente
-                    sock.sendto(b"READY", client_addr)
 
-                    # Inicia o envio do arquivo
-                    self._send_file(sock, client_addr)
+class _Session:
+    # Estado de um cliente atendido pelo motor asyncio
+    __slots__ = (
+        "addr",
+        "file",
+        "file_name",
+        "buffer_size",
+        "packet",
+        "view",
+        "payload",
+        "header_size",
+        "crcs",
+        "sender",
+        "pacer",
+        "seq",
+        "total_sent",
+        "start_time",
+        "last_heard",
+        "fin",
+        "fin_attempts",
+        "fin_deadline",
+        "counter",
+        "compressor",
+        "cpu",
+    )
 
-            except Exception as e:
-                self.logg.error(f"Erro no servidor: {e}")
-            finally:
-                self.logg.info("Execução do servidor finalizada.")
+    def __init__(self, addr):
+        # @addr - endereço do cliente
+        self.addr = addr
+        self.file = None
+        self.file_name = None
+        self.buffer_size = 0
+        self.packet = None  # Buffer reutilizado para os datagramas sem confirmação
+        self.view = None
+        self.payload = None
+        self.header_size = rudp.HEADER.size  # Cabeçalho, com o CRC se verificado
+        self.crcs = None  # CRC32 de cada bloco, se o cliente pediu verificação
+        self.sender = None  # Janela do remetente no modo confiável
+        self.pacer = None  # Controle de ritmo do modo sem confirmação
+        self.seq = 0
+        self.total_sent = 0
+        self.start_time = None  # None enquanto aguarda a requisição do cliente
+        self.last_heard = time.perf_counter()
+        self.fin = None  # FIN enviado no modo confiável, aguardando FIN_ACK
+        self.fin_attempts = 0
+        self.fin_deadline = None
+        self.counter = None  # Contador da amostragem da taxa, se habilitada
+        self.compressor = None  # Compressão por bloco, se negociada
+        self.cpu = None  # CPU gasta desde o início do envio
+
+
+class _AsyncEngine(asyncio.DatagramProtocol):
+    # Protocolo do motor asyncio: mantém uma tabela de sessões indexada pelo
+    # endereço do cliente e envia os arquivos em rodízio entre as sessões
+    # ativas, no máximo QUANTUM datagramas por sessão a cada rodada
+
+    def __init__(self, server):
+        # @server - servidor que fornece a configuração e o log
+        self.server = server
+        self.logg = server.logg
+        self.transport = None
+        self.sessions = {}  # endereço -> _Session
+        self.active = deque()  # Sessões em transferência, em rodízio
+        self.wakeup = asyncio.Event()  # Sinaliza a chegada de datagramas
+        self.writable = asyncio.Event()  # Limpo enquanto o envio está pausado
+        self.writable.set()
+
+    def connection_made(self, transport):
+        self.transport = transport
+
+    def pause_writing(self):
+        # O buffer de envio do transporte encheu: o escalonador aguarda
+        self.writable.clear()
+
+    def resume_writing(self):
+        self.writable.set()
+
+    def error_received(self, exc):
+        self.logg.warning(f"Erro no socket: {exc}")
+
+    def datagram_received(self, data, addr):
+        # Encaminha cada datagrama para a sessão do seu endereço de origem
+        if rudp.is_kind(data, rudp.ECHO):
+            self.transport.sendto(data, addr)
+            self.server.echoed += 1
+            return
+        session = self.sessions.get(addr)
+        if data == b"READY":
+            if session is not None:
+                self._close(session)  # O cliente reiniciou a sessão
+            self.logg.info(
+                f"Sinal de prontidão recebido de {addr}. Iniciando transferência do arquivo."
+            )
+            session = self.sessions[addr] = _Session(addr)
+            self.transport.sendto(b"READY", addr)
+            asyncio.get_running_loop().call_later(
+                rudp.IDLE_TIMEOUT, self._expire_request, session
+            )
+            return
+        if session is None:
+            return  # Datagrama atrasado de uma sessão já encerrada
+
+        session.last_heard = time.perf_counter()
+        if session.start_time is None:
+            self._start(session, data)
+        elif session.sender is not None and rudp.is_kind(data, rudp.ACK):
+            for packet in session.sender.on_ack(data, session.last_heard):
+                self.transport.sendto(packet, addr)
+                if session.counter is not None:
+                    session.counter.add(len(packet) - session.header_size)
+        elif session.fin is not None and rudp.is_kind(data, rudp.FIN_ACK):
+            self._finish(session)
+        elif session.pacer is not None:
+            self.server._on_report(session.pacer, data, session.seq)
+        self.wakeup.set()
+
+    def _start(self, session, data):
+        # Abre o arquivo pedido pelo cliente e coloca a sessão no rodízio. Um
+        # erro encerra só a sessão do cliente, como no motor sequencial.
+        # @session - sessão do cliente
+        # @data - requisição recebida do cliente
+        try:
+            file_name, buffer_size, options, reply = self.server._open_request(data)
+        except (ValueError, IndexError, UnicodeDecodeError) as e:
+            self.logg.error(f"Requisição inválida de {session.addr}: {e}")
+            self._close(session)
+            return
+        try:
+            self._open_session(session, file_name, buffer_size, options, reply)
+        except Exception as e:
+            self.logg.error(f"Erro ao enviar o arquivo para {session.addr}: {e}")
+            self._close(session)
+
+    def _open_session(self, session, file_name, buffer_size, options, reply):
+        # Responde à requisição e prepara o envio do arquivo da sessão
+        # @session - sessão do cliente
+        # @file_name - arquivo pedido (None se a requisição foi recusada)
+        # @buffer_size - tamanho dos dados de cada datagrama
+        # @options - opções da requisição
+        # @reply - resposta de prontidão (ou de erro) ao cliente
+        self.transport.sendto(reply, session.addr)
+        if file_name is None:
+            self._close(session)
+            return
+
+        session.file, session.compressor = self.server._open_compressed(
+            file_name, options
+        )
+        session.file_name = file_name
+        session.buffer_size = buffer_size
+        session.start_time = time.time()
+        # CPU da thread do laço, que atende também as outras sessões
+        session.cpu = profiling.CpuUsage("thread")
+        session.pacer = self.server._create_pacer(options)
+        session.crcs = self.server._chunk_crcs(file_name, buffer_size, options)
+        if session.crcs is not None:
+            session.header_size = rudp.CHECKED_HEADER_SIZE
+        if self.server.sampler is not None:
+            session.counter = self.server.sampler.track()
+        if options.get("mode") == "reliable":
+            chunks = iter(partial(session.file.read, buffer_size), b"")
+            session.sender = rudp.ReliableSender(
+                chunks, self.server._client_window(options), session.crcs
+            )
+        else:
+            # Com compressão, cabe também o indicador de cada bloco
+            size = session.header_size + buffer_size
+            if session.compressor is not None:
+                size += compression.BLOCK_OVERHEAD
+            session.packet = bytearray(size)
+            session.view = memoryview(session.packet)
+            session.payload = session.view[session.header_size :]
+        self.active.append(session)
+
+    def _expire_request(self, session):
+        # Descarta a sessão se o cliente não enviou a requisição a tempo
+        # @session - sessão do cliente
+        if session.start_time is None and self.sessions.get(session.addr) is session:
+            self.logg.error(f"Cliente {session.addr} não enviou a requisição.")
+            self._close(session)
+
+    async def schedule(self):
+        # Escalonador: a cada rodada dá a vez a todas as sessões ativas e, se
+        # nenhuma tem o que enviar, dorme até chegar um datagrama ou vencer o
+        # próximo prazo (RTO ou FIN)
+        while True:
+            await self.writable.wait()
+            now = time.perf_counter()
+            progressed = False
+            timeout = None
+            for _ in range(len(self.active)):
+                session = self.active.popleft()
+                try:
+                    sent, wait = self._step(session, now)
+                except Exception as e:
+                    # Um erro encerra só a sessão do cliente
+                    self.logg.error(
+                        f"Erro ao enviar o arquivo para {session.addr}: {e}"
+                    )
+                    self._close(session)
+                    continue
+                progressed = progressed or sent
+                if wait is not None:
+                    timeout = wait if timeout is None else min(timeout, wait)
+                if session.file is not None:
+                    self.active.append(session)
+
+            if progressed:
+                await asyncio.sleep(0)  # Deixa o laço processar os datagramas
+                continue
+            self.wakeup.clear()
+            try:
+                await asyncio.wait_for(self.wakeup.wait(), timeout)
+            except asyncio.TimeoutError:
+                pass
+
+    def _step(self, session, now):
+        # Dá a vez a uma sessão. Retorna (enviou algo, segundos até o próximo
+        # prazo da sessão ou None).
+        # @session - sessão do cliente
+        # @now - instante atual (time.perf_counter)
+        if session.fin is not None:
+            if now < session.fin_deadline:
+                return False, session.fin_deadline - now
+            if session.fin_attempts >= rudp.FIN_RETRIES:
+                self.logg.warning("Cliente não confirmou o fim da transferência.")
+                self._finish(session)
+                return False, None
+            self._send_fin(session, now)
+            return True, None
+
+        if session.sender is not None:
+            if now - session.last_heard > rudp.IDLE_TIMEOUT:
+                self.logg.error(f"Cliente {session.addr} parou de enviar ACKs.")
+                self._close(session)
+                return False, None
+            packets = session.sender.poll(now, QUANTUM)
+            for packet in packets:
+                self.transport.sendto(packet, session.addr)
+                if session.counter is not None:
+                    session.counter.add(len(packet) - session.header_size)
+            if session.sender.done:
+                self._send_fin(session, now)
+                return True, None
+            if packets:
+                return True, None
+            return False, session.sender.wait_time(now)
+
+        for sent in range(QUANTUM):
+            if session.pacer is not None:
+                delay = session.pacer.delay(now)
+                if delay:
+                    return sent > 0, delay
+            size = session.file.readinto(session.payload)
+            if not size:
+                self.transport.sendto(rudp.pack(rudp.FIN, session.seq), session.addr)
+                self._finish(session)
+                return True, None
+            rudp.HEADER.pack_into(session.packet, 0, rudp.DATA, session.seq)
+            if session.crcs is not None:
+                rudp.CHECKSUM.pack_into(
+                    session.packet, rudp.HEADER.size, session.crcs[session.seq]
+                )
+            self.transport.sendto(
+                session.view[: session.header_size + size], session.addr
+            )
+            session.seq += 1
+            session.total_sent += size
+            if session.counter is not None:
+                session.counter.add(size)
+            if session.pacer is not None:
+                session.pacer.consume(session.header_size + size)
+        return True, None
+
+    def _send_fin(self, session, now):
+        # Envia (ou reenvia) o FIN do modo confiável e agenda a próxima tentativa
+        # @session - sessão do cliente
+        # @now - instante atual (time.perf_counter)
+        if session.fin is None:
+            session.fin = rudp.pack(rudp.FIN, session.sender.next_seq)
+        self.transport.sendto(session.fin, session.addr)
+        session.fin_attempts += 1
+        session.fin_deadline = now + session.sender.rto
+
+    def _finish(self, session):
+        # Registra a taxa de uma transferência concluída e encerra a sessão
+        # @session - sessão do cliente
+        total_sent, packet_count = session.total_sent, session.seq
+        if session.sender is not None:
+            total_sent = session.sender.bytes_sent
+            packet_count = session.sender.packets_sent
+            self.logg.info(
+                f"Retransmissões: {session.sender.retransmissions} de "
+                f"{session.sender.packets_sent} pacotes."
+            )
+        self.server._log_transfer(
+            session.file_name,
+            total_sent,
+            time.time() - session.start_time,
+            packet_count,
+            session.buffer_size,
+            session.pacer,
+            session.compressor,
+            session.cpu,
+        )
+        self._close(session)
+
+    def _close(self, session):
+        # Remove a sessão da tabela e do rodízio e fecha o seu arquivo
+        # @session - sessão do cliente
+        if self.sessions.get(session.addr) is session:
+            del self.sessions[session.addr]
+        if session in self.active:
+            self.active.remove(session)
+        if session.counter is not None:
+            self.server.sampler.release(session.counter)
+            session.counter = None
+        if session.file is not None:
+            session.file.close()
+            session.file = None
 
 
 def parse_args(args):
@@ -109,16 +1095,159 @@ def parse_args(args):
     parser = argparse.ArgumentParser(description="Servidor UDP - Envio de Arquivo")
     parser.add_argument("--host", required=True, type=str, help="Endereço IP do host")
     parser.add_argument("--port", required=True, type=int, help="Número da porta")
+    parser.add_argument(
+        "--window",
+        type=int,
+        default=256,
+        help="Pacotes em trânsito sem confirmação no modo confiável",
+    )
+    parser.add_argument(
+        "--engine",
+        choices=ENGINES,
+        default="sequential",
+        help="Motor de atendimento: um cliente por vez ou vários com asyncio",
+    )
+    parser.add_argument(
+        "--io",
+        choices=batchio.SEND_MODES,
+        default="single",
+        help="Envio dos datagramas sem confirmação: um por chamada (single), em "
+        "lote com sendmmsg (mmsg) ou segmentado pelo kernel com UDP_SEGMENT (gso)",
+    )
+    parser.add_argument(
+        "--batch",
+        type=int,
+        default=32,
+        help="Datagramas por chamada de sistema nos modos mmsg e gso",
+    )
+    parser.add_argument(
+        "--pacing",
+        choices=pacing.PACING_MODES,
+        default="none",
+        help="Ritmo do envio sem confirmação: sem controle (none), taxa fixa com "
+        "balde de fichas (fixed) ou taxa adaptativa guiada pelos relatórios de "
+        "perda do cliente (aimd)",
+    )
+    parser.add_argument(
+        "--rate",
+        type=float,
+        default=100,
+        help="Taxa de envio em MB/s (fixa, ou inicial no modo aimd)",
+    )
+    parser.add_argument(
+        "--rate-step",
+        type=float,
+        default=5,
+        help="Aumento da taxa, em MB/s, a cada relatório sem perdas no modo aimd",
+    )
+    parser.add_argument(
+        "--source",
+        choices=SOURCES,
+        default="file",
+        help="Origem dos dados: leitura do disco (file) ou arquivos mapeados em "
+        "memória e mantidos em cache entre as requisições (mmap)",
+    )
+    parser.add_argument(
+        "--cache-size",
+        type=int,
+        default=DEFAULT_CACHE_MB,
+        help="Capacidade do cache de arquivos mapeados em MB (source mmap)",
+    )
+    parser.add_argument(
+        "--tuning",
+        choices=list(tuning.PROFILES),
+        default="default",
+        help="Perfil de ajuste do socket: valores do sistema (default), buffers "
+        "grandes (throughput) ou busy polling (low-latency)",
+    )
+    parser.add_argument(
+        "--processes",
+        type=int,
+        default=1,
+        help="Processos trabalhadores, cada um com o seu socket na mesma porta "
+        "(SO_REUSEPORT); 0 cria um por núcleo",
+    )
+    parser.add_argument(
+        "--metrics-format",
+        nargs="+",
+        choices=metrics.FORMATS,
+        default=["csv"],
+        help="Formatos dos arquivos de métricas: CSV, JSON Lines e/ou colunar binário",
+    )
+    parser.add_argument(
+        "--metrics-dir",
+        default=".",
+        help="Diretório dos arquivos de métricas",
+    )
+    parser.add_argument(
+        "--sample",
+        type=int,
+        nargs="?",
+        const=sampling.DEFAULT_INTERVAL_MS,
+        default=0,
+        metavar="MS",
+        help="Amostrar a taxa de envio a cada N ms (100 por padrão) e gravar a "
+        "série em amostras_servidor_udp",
+    )
+    parser.add_argument(
+        "--live",
+        action="store_true",
+        help="Exibir a taxa amostrada ao vivo no terminal (implica --sample)",
+    )
     parser.add_argument(
         "-v", "--verbose", action="store_true", help="Ativar log detalhado dos pacotes"
     )
-    return parser.parse_args(args)
+    parser.add_argument(
+        "--profile",
+        choices=profiling.MODES,
+        help="Perfilar o servidor até o encerramento: cProfile (todas as chamadas, "
+        "com custo alto) ou amostragem das pilhas de todas as threads (custo baixo)",
+    )
+    parser.add_argument(
+        "--profile-file",
+        help="Arquivo do perfil (padrão: perfil_servidor_udp.prof ou .txt no "
+        "diretório das métricas, com o PID no modo pré-fork)",
+    )
+    parsed = parser.parse_args(args)
+    if parsed.processes < 0:
+        parser.error("--processes não pode ser negativo (0 cria um por núcleo)")
+    if parsed.rate <= 0:
+        parser.error("--rate deve ser maior que zero")
+    if parsed.live and not parsed.sample:
+        parsed.sample = sampling.DEFAULT_INTERVAL_MS
+    return parsed
+
+
+def create_server(args):
+    # Cria o servidor a partir dos argumentos já analisados por parse_args
+    return Server(
+        args.host,
+        args.port,
+        args.verbose,
+        args.window,
+        args.engine,
+        args.io,
+        args.batch,
+        args.pacing,
+        args.rate,
+        args.rate_step,
+        args.source,
+        args.cache_size,
+        args.tuning,
+        args.processes,
+        args.metrics_format,
+        args.metrics_dir,
+        args.sample,
+        args.live,
+        args.profile,
+        args.profile_file,
+    )
 
 
 def main():
     # Função principal que inicializa o servidor com os argumentos fornecidos
     args = parse_args(sys.argv[1:])
-    server = Server(args.host, args.port, args.verbose)
+    server = create_server(args)
     server.run()
 
 
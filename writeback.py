@@ -0,0 +1,283 @@
+import os
+import threading
+import time
+from collections import deque
+
+# Gravação em disco dos dados recebidos pelos clientes (--output). No modo
+# direto, cada bloco é gravado pela própria thread de recepção, que fica
+# parada enquanto o disco não aceita os dados. No modo write-behind, a thread
+# de recepção apenas copia o bloco para uma fila limitada, e uma thread
+# gravadora esvazia a fila em lotes, juntando os blocos contíguos em uma só
+# chamada pwritev. Quando o disco é mais lento que a rede, a fila enche e a
+# recepção passa a esperar por espaço: o tempo dessa espera mostra que o
+# gargalo é o disco, não o socket. Nos dois modos o arquivo é pré-alocado com
+# o tamanho anunciado pelo servidor, e a taxa fim a fim vai da abertura do
+# arquivo até os dados gravados (e sincronizados, com --fsync).
+WRITE_MODES = ("direct", "behind")
+
+# Tamanho máximo da fila do modo write-behind quando não informado, em MB
+DEFAULT_QUEUE_MB = 64
+
+# Buffers por chamada pwritev (limite do sistema para o vetor de E/S)
+try:
+    IOV_MAX = os.sysconf("SC_IOV_MAX")
+except (AttributeError, ValueError, OSError):
+    IOV_MAX = 1024
+
+
+def preallocate(fd, size):
+    # Reserva @size bytes para o arquivo, evitando alocar blocos durante a
+    # gravação; sem posix_fallocate, apenas estende o arquivo
+    # @fd - descritor do arquivo de saída
+    # @size - tamanho anunciado pelo servidor
+    if not size:
+        return
+    try:
+        os.posix_fallocate(fd, 0, size)
+    except (AttributeError, OSError):
+        os.ftruncate(fd, size)
+
+
+def open_output(path, mode, size=0, queue_mb=DEFAULT_QUEUE_MB, sync=False):
+    # Abre o arquivo de saída no modo de gravação pedido
+    # @path - caminho do arquivo de saída
+    # @mode - modo de gravação (um de WRITE_MODES)
+    # @size - tamanho anunciado pelo servidor, pré-alocado
+    # @queue_mb - tamanho máximo da fila do modo write-behind, em MB
+    # @sync - sincroniza os dados com o disco (fsync) ao fechar
+    if mode == "behind":
+        return WriteBehind(path, size, queue_mb * 1024 * 1024, sync)
+    return DirectWriter(path, size, sync)
+
+
+def summary_header():
+    # Colunas da gravação em disco acrescentadas ao CSV de métricas
+    return [
+        "Modo de Escrita",
+        "Bytes Gravados",
+        "Escritas",
+        "Tempo de Escrita (s)",
+        "Espera por Fila Cheia (s)",
+        "Pico da Fila (bytes)",
+        "Tempo de Sincronização (s)",
+        "Tempo Fim a Fim (s)",
+        "Taxa Fim a Fim (MB/s)",
+    ]
+
+
+class _Writer:
+    # Contabilidade comum aos dois modos de gravação
+
+    mode = None
+
+    def __init__(self, sync):
+        # @sync - sincroniza os dados com o disco (fsync) ao fechar
+        self.sync = sync
+        self.opened_at = time.perf_counter()
+        self.closed_at = None  # Instante em que os dados foram gravados
+        self.position = 0  # Posição da próxima gravação sequencial
+        self.written = 0  # Bytes gravados
+        self.writes = 0  # Chamadas de gravação
+        self.write_time = 0.0  # Segundos gastos nas chamadas de gravação
+        self.stall_time = 0.0  # Segundos de recepção parada com a fila cheia
+        self.peak = 0  # Maior ocupação da fila, em bytes
+        self.sync_time = 0.0  # Segundos gastos no fsync
+
+    def seek(self, pos):
+        self.position = pos
+
+    def write(self, data):
+        # Grava @data na posição corrente, como em um arquivo comum
+        self.pwrite(data, self.position)
+        self.position += len(data)
+
+    def _sync(self, fd):
+        # Sincroniza os dados com o disco, se pedido
+        if self.sync:
+            start = time.perf_counter()
+            os.fsync(fd)
+            self.sync_time = time.perf_counter() - start
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+    def summary(self):
+        # Valores das colunas de summary_header
+        elapsed = (self.closed_at or time.perf_counter()) - self.opened_at
+        rate = self.written / elapsed / (1024 * 1024) if elapsed > 0 else 0.0
+        return [
+            self.mode,
+            self.written,
+            self.writes,
+            self.write_time,
+            self.stall_time,
+            self.peak,
+            self.sync_time,
+            elapsed,
+            rate,
+        ]
+
+
+class DirectWriter(_Writer):
+    # Gravação na própria thread de recepção
+
+    mode = "direct"
+
+    def __init__(self, path, size=0, sync=False):
+        # @path - caminho do arquivo de saída
+        # @size - tamanho anunciado pelo servidor, pré-alocado
+        # @sync - sincroniza os dados com o disco (fsync) ao fechar
+        super().__init__(sync)
+        self.fd = os.open(path, os.O_WRONLY | os.O_CREAT | os.O_TRUNC, 0o644)
+        preallocate(self.fd, size)
+        self.lock = threading.Lock()  # As conexões paralelas gravam juntas
+
+    def pwrite(self, data, offset):
+        # Grava @data na posição @offset do arquivo
+        start = time.perf_counter()
+        view = memoryview(data)
+        while view:
+            size = os.pwrite(self.fd, view, offset)
+            view = view[size:]
+            offset += size
+        elapsed = time.perf_counter() - start
+        with self.lock:
+            self.written += len(data)
+            self.writes += 1
+            self.write_time += elapsed
+
+    def close(self):
+        if self.fd is None:
+            return
+        self._sync(self.fd)
+        os.close(self.fd)
+        self.fd = None
+        self.closed_at = time.perf_counter()
+
+
+class WriteBehind(_Writer):
+    # Gravação em uma thread à parte, alimentada por uma fila limitada
+
+    mode = "behind"
+
+    def __init__(
+        self, path, size=0, queue_bytes=DEFAULT_QUEUE_MB * 1024 * 1024, sync=False
+    ):
+        # @path - caminho do arquivo de saída
+        # @size - tamanho anunciado pelo servidor, pré-alocado
+        # @queue_bytes - bytes na fila a partir dos quais a recepção espera
+        # @sync - sincroniza os dados com o disco (fsync) ao fechar
+        super().__init__(sync)
+        self.fd = os.open(path, os.O_WRONLY | os.O_CREAT | os.O_TRUNC, 0o644)
+        preallocate(self.fd, size)
+        self.limit = queue_bytes
+        self.items = deque()  # (posição, bytes) aguardando gravação
+        self.queued = 0  # Bytes na fila ou sendo gravados
+        self.lock = threading.Lock()
+        self.ready = threading.Condition(self.lock)  # Há dados a gravar
+        self.space = threading.Condition(self.lock)  # Há espaço na fila
+        self.closing = False
+        self.error = None  # Erro da thread gravadora, repassado à recepção
+        self.thread = threading.Thread(target=self._run, name="gravador", daemon=True)
+        self.thread.start()
+
+    def pwrite(self, data, offset):
+        # Enfileira @data para gravação na posição @offset do arquivo
+        if not isinstance(data, bytes):
+            data = bytes(data)  # O buffer de recepção é reutilizado
+        size = len(data)
+        with self.lock:
+            if self.queued and self.queued + size > self.limit:
+                start = time.perf_counter()
+                while (
+                    self.queued
+                    and self.queued + size > self.limit
+                    and self.error is None
+                ):
+                    self.space.wait()
+                self.stall_time += time.perf_counter() - start
+            if self.error is not None:
+                raise self.error
+            self.items.append((offset, data))
+            self.queued += size
+            if self.queued > self.peak:
+                self.peak = self.queued
+            self.ready.notify()
+
+    def _run(self):
+        # Esvazia a fila em lotes até o fechamento
+        while True:
+            with self.lock:
+                while not self.items and not self.closing:
+                    self.ready.wait()
+                if not self.items:
+                    return
+                batch = list(self.items)
+                self.items.clear()
+            size = sum(len(data) for _, data in batch)
+            try:
+                start = time.perf_counter()
+                self._write_batch(batch)
+                self.write_time += time.perf_counter() - start
+            except OSError as e:
+                with self.lock:
+                    self.error = e
+                    self.items.clear()
+                    self.space.notify_all()
+                return
+            with self.lock:
+                self.written += size
+                self.queued -= size
+                self.space.notify_all()
+
+    def _write_batch(self, batch):
+        # Grava os blocos de um lote, juntando os contíguos em uma só chamada
+        # @batch - lista de (posição, bytes), na ordem de chegada
+        start, buffers = batch[0][0], [batch[0][1]]
+        end = start + len(buffers[0])
+        for offset, data in batch[1:]:
+            if offset != end or len(buffers) == IOV_MAX:
+                self._write_run(start, buffers)
+                start, buffers, end = offset, [], offset
+            buffers.append(data)
+            end += len(data)
+        self._write_run(start, buffers)
+
+    def _write_run(self, offset, buffers):
+        # Grava buffers contíguos a partir de @offset
+        self.writes += 1
+        if hasattr(os, "pwritev"):
+            written = os.pwritev(self.fd, buffers, offset)
+            total = sum(len(data) for data in buffers)
+            if written == total:
+                return
+            # Gravação parcial: o restante segue com pwrite
+            view = memoryview(b"".join(buffers))[written:]
+            offset += written
+        else:
+            view = memoryview(b"".join(buffers))
+        while view:
+            size = os.pwrite(self.fd, view, offset)
+            view = view[size:]
+            offset += size
+
+    def close(self):
+        # Aguarda a gravação de toda a fila e fecha o arquivo
+        if self.fd is None:
+            return
+        with self.lock:
+            self.closing = True
+            self.ready.notify()
+        self.thread.join()
+        try:
+            if self.error is None:
+                self._sync(self.fd)
+        finally:
+            os.close(self.fd)
+            self.fd = None
+            self.closed_at = time.perf_counter()
+        if self.error is not None:
+            raise self.error